@@ -43,6 +43,10 @@ export class Document {
   @Column('text', { name: 'source_url', nullable: true })
   sourceUrl: string;
 
+  @ApiProperty({ description: 'SHA-256 of the original file, used to deduplicate re-uploads' })
+  @Column({ length: 64, name: 'content_hash', nullable: true })
+  contentHash: string;
+
   @ApiProperty({ description: 'Document metadata' })
   @Column('jsonb', { default: {} })
   metadata: Record<string, any>;
@@ -35,7 +35,7 @@ class TourState(Enum):
 class TourOrchestrator(BaseAgent):
     """Orchestrates all tour agents for seamless experience delivery."""
     
-    def __init__(self):
+    def __init__(self, database=None):
         super().__init__(
             name="TourOrchestrator",
             description="Coordinates all agents for seamless tour experience"
@@ -43,9 +43,9 @@ class TourOrchestrator(BaseAgent):
         
         # Initialize all agents
         self.planner = TourPlannerAgent()
-        self.retriever = KnowledgeRetrieverAgent()
+        self.retriever = KnowledgeRetrieverAgent(database)
         self.narrator = NarratorAgent()
-        self.qa_agent = QAAgent()
+        self.qa_agent = QAAgent(database)
         
         # Tour state management
         self.active_tours: Dict[str, Dict[str, Any]] = {}
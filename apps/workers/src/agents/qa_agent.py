@@ -23,7 +23,7 @@ logger = logging.getLogger(__name__)
 class QAAgent(BaseAgent):
     """Agent responsible for real-time question answering during tours."""
     
-    def __init__(self):
+    def __init__(self, database=None):
         super().__init__(
             name="QAAgent",
             description="Handles real-time Q&A with contextual understanding and citations"
@@ -33,7 +33,7 @@ class QAAgent(BaseAgent):
         self.llm = OpenAI(temperature=0.2)  # Lower temperature for factual accuracy
         
         # Initialize retriever for knowledge lookup
-        self.retriever = KnowledgeRetrieverAgent()
+        self.retriever = KnowledgeRetrieverAgent(database)
         
         # Conversation memory
         self.memory = ConversationBufferWindowMemory(k=5)  # Remember last 5 exchanges
@@ -6,11 +6,14 @@ Retrieves relevant information from the knowledge base using hybrid search
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+import os
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime
 
 from langchain.llms import OpenAI
-from langchain.embeddings import OpenAIEmbeddings
+from langchain.embeddings import CacheBackedEmbeddings, HuggingFaceEmbeddings, OpenAIEmbeddings
+from langchain.embeddings.base import Embeddings
+from langchain.storage import LocalFileStore
 from langchain.schema import Document
 from langchain.vectorstores import FAISS
 from langchain.retrievers import BM25Retriever, EnsembleRetriever
@@ -19,13 +22,74 @@ from langchain.retrievers import ContextualCompressionRetriever
 
 from .base import BaseAgent, TourContext
 
+try:
+    from workers.shared.database import HAS_DATABASE, get_database
+except ImportError:
+    HAS_DATABASE = False
+
 logger = logging.getLogger(__name__)
 
+# Embedding backend: "local" runs a small in-process model, "openai" calls the API
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "local")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# On-disk embedding cache (keyed by content hash) so restarts don't re-embed unchanged docs
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "/var/cache/embeddings")
+
+# Source-type lookup tables (replace per-result if/elif chains)
+_SOURCE_TYPE_SCORES = {
+    "academic": 0.3,
+    "official": 0.3,
+    "museum": 0.3,
+    "expert": 0.3,
+    "news": 0.2,
+    "educational": 0.2,
+}
+_SOURCE_TYPE_LABELS = {
+    "academic": "authoritative_source",
+    "official": "authoritative_source",
+    "museum": "authoritative_source",
+    "expert": "authoritative_source",
+    "news": "reliable_source",
+    "educational": "reliable_source",
+}
+_SOURCE_TYPE_FACTORS = {
+    "academic": 1.15,
+    "official": 1.15,
+    "expert": 1.15,
+}
+
+# Verification status indexed by int(credibility_score * 10), scores clamped to [0, 1]
+_STATUS_BUCKETS = ["unverified"] * 6 + ["likely_reliable"] * 2 + ["verified"] * 3
+
+
+def _create_embeddings() -> Embeddings:
+    """Create the configured embedder wrapped in the on-disk cache."""
+    if EMBEDDING_BACKEND == "openai":
+        base_embeddings = OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL)
+        namespace = OPENAI_EMBEDDING_MODEL
+    else:
+        # 384-D local model: no network round-trip per query and a 4x smaller index
+        base_embeddings = HuggingFaceEmbeddings(
+            model_name=LOCAL_EMBEDDING_MODEL,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True}
+        )
+        namespace = LOCAL_EMBEDDING_MODEL
+    
+    # Namespace by model so vectors of different dimensions never mix
+    return CacheBackedEmbeddings.from_bytes_store(
+        base_embeddings,
+        LocalFileStore(EMBEDDING_CACHE_DIR),
+        namespace=namespace
+    )
+
 
 class KnowledgeRetrieverAgent(BaseAgent):
     """Agent responsible for retrieving relevant knowledge with citations."""
     
-    def __init__(self):
+    def __init__(self, database=None):
         super().__init__(
             name="KnowledgeRetriever",
             description="Retrieves relevant information using hybrid search with source verification"
@@ -33,7 +97,11 @@ class KnowledgeRetrieverAgent(BaseAgent):
         
         # Initialize components
         self.llm = OpenAI(temperature=0.1)
-        self.embeddings = OpenAIEmbeddings()
+        self.embeddings = _create_embeddings()
+        
+        # Database for site chunks; the shared one is used when none is given, mock documents without one
+        self.database = database
+        self.load_batch_size = 4096
         
         # Retrieval components (will be initialized with site data)
         self.vector_store = None
@@ -92,13 +160,22 @@ class KnowledgeRetrieverAgent(BaseAgent):
     async def _ensure_retrievers_initialized(self, site_id: str, tenant_id: str):
         """Ensure retrievers are initialized for the site."""
         if self.vector_store is None:
-            # Load site documents
-            documents = await self._load_site_documents(site_id, tenant_id)
+            # Stream site documents and index each batch as it arrives
+            documents = []
+            async for batch in self._iter_site_document_batches(site_id, tenant_id):
+                # Precompute per-document flags once so query-time scoring stays cheap
+                for doc in batch:
+                    doc.metadata["_has_reference"] = "reference" in doc.page_content.lower()
+                
+                if self.vector_store is None:
+                    self.vector_store = FAISS.from_documents(batch, self.embeddings)
+                else:
+                    self.vector_store.add_documents(batch)
+                
+                # BM25 scores over the whole corpus, so it keeps the text
+                documents.extend(batch)
             
             if documents:
-                # Initialize vector store
-                self.vector_store = FAISS.from_documents(documents, self.embeddings)
-                
                 # Initialize BM25 retriever
                 self.bm25_retriever = BM25Retriever.from_documents(documents)
                 
@@ -202,11 +279,9 @@ class KnowledgeRetrieverAgent(BaseAgent):
         
         # Consider document metadata
         metadata = document.metadata or {}
-        metadata_boost = 1.0
         
         # Boost authoritative sources
-        if metadata.get("source_type") in ["academic", "official", "expert"]:
-            metadata_boost = 1.15
+        metadata_boost = _SOURCE_TYPE_FACTORS.get(metadata.get("source_type"), 1.0)
         
         # Boost recent content
         if metadata.get("date"):
@@ -257,12 +332,10 @@ class KnowledgeRetrieverAgent(BaseAgent):
         
         # Check source type
         source_type = metadata.get("source_type", "unknown")
-        if source_type in ["academic", "official", "museum", "expert"]:
-            credibility_score += 0.3
-            verification_factors.append("authoritative_source")
-        elif source_type in ["news", "educational"]:
-            credibility_score += 0.2
-            verification_factors.append("reliable_source")
+        credibility_score += _SOURCE_TYPE_SCORES.get(source_type, 0.0)
+        source_label = _SOURCE_TYPE_LABELS.get(source_type)
+        if source_label:
+            verification_factors.append(source_label)
         
         # Check for author credentials
         if metadata.get("author"):
@@ -274,22 +347,18 @@ class KnowledgeRetrieverAgent(BaseAgent):
             credibility_score += 0.1
             verification_factors.append("dated_content")
         
-        # Check for citations/references
-        if metadata.get("references") or "reference" in result.get("content", "").lower():
+        # Check for citations/references (flag precomputed at load time)
+        if metadata.get("references") or metadata.get("_has_reference"):
             credibility_score += 0.1
             verification_factors.append("contains_references")
         
         # Determine verification status
-        if credibility_score >= 0.8:
-            status = "verified"
-        elif credibility_score >= 0.6:
-            status = "likely_reliable"
-        else:
-            status = "unverified"
+        credibility_score = min(1.0, credibility_score)
+        status = _STATUS_BUCKETS[int(credibility_score * 10)]
         
         return {
             "status": status,
-            "credibility_score": min(1.0, credibility_score),
+            "credibility_score": credibility_score,
             "verification_factors": verification_factors,
             "verification_date": datetime.utcnow().isoformat()
         }
@@ -386,6 +455,33 @@ Key Information:
         
         return min(1.0, confidence)
     
+    async def _get_database(self):
+        """The given Database, else the shared worker Database; None when database libraries are missing."""
+        if self.database is None and HAS_DATABASE:
+            self.database = await get_database()
+        return self.database
+    
+    async def _iter_site_document_batches(self, site_id: str, tenant_id: str) -> AsyncIterator[List[Document]]:
+        """Yield site documents in batches without materializing the full result set."""
+        database = await self._get_database()
+        if database is None:
+            yield await self._load_site_documents(site_id, tenant_id)
+            return
+        
+        async for rows in database.stream_site_chunks(site_id, tenant_id, batch_size=self.load_batch_size):
+            yield [
+                Document(
+                    page_content=row["content"],
+                    metadata={
+                        **row["metadata"],
+                        "document_id": str(row["document_id"]),
+                        "title": row["title"],
+                        "chunk_index": row["chunk_index"]
+                    }
+                )
+                for row in rows
+            ]
+    
     async def _load_site_documents(self, site_id: str, tenant_id: str) -> List[Document]:
         """Load documents for a site from the knowledge base."""
         # This would query the database for site documents
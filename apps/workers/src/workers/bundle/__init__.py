@@ -13,15 +13,22 @@ Handles asset compression, optimization, and tour bundle generation:
 from .main import app
 from .processor import BundleProcessor
 from .asset_compressor import AssetCompressor
-from .navmesh_baker import NavmeshBaker
+from .navmesh_baker import NavmeshBaker, NavmeshTriangles
 from .lightmap_baker import LightmapBaker
 from .format_exporter import FormatExporter
+from .assets import MeshAsset, LightAsset, parse_assets
+from .bvh import build_bvh
 
 __all__ = [
     "app",
     "BundleProcessor",
     "AssetCompressor",
     "NavmeshBaker", 
+    "NavmeshTriangles",
     "LightmapBaker",
     "FormatExporter",
+    "MeshAsset",
+    "LightAsset",
+    "parse_assets",
+    "build_bvh",
 ]
@@ -3,7 +3,9 @@ Asset compression and optimization for different platforms.
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +19,11 @@ class AssetCompressor:
             "mesh": ["draco", "meshopt"],
             "audio": ["ogg", "aac", "opus"]
         }
+        self._batch_optimizers = {
+            "texture": self._optimize_textures,
+            "mesh": self._optimize_meshes,
+            "audio": self._optimize_audio
+        }
         
     async def initialize(self):
         """Initialize the asset compressor."""
@@ -24,71 +31,99 @@ class AssetCompressor:
         
     async def optimize_asset(self, asset: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize a single asset based on settings."""
-        try:
-            asset_type = asset.get("type", "unknown")
+        optimized = (await self.optimize_assets_batch([asset], settings))[0]
+        return optimized if optimized is not None else asset
+        
+    async def optimize_assets_batch(
+        self,
+        assets: List[Dict[str, Any]],
+        settings: Dict[str, Any]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Optimize assets grouped by type; entries whose optimization failed are None."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(assets)
+        
+        groups: Dict[str, List[int]] = {}
+        for i, asset in enumerate(assets):
+            groups.setdefault(asset.get("type", "unknown"), []).append(i)
+        
+        for asset_type, indices in groups.items():
+            group = [assets[i] for i in indices]
+            optimizer = self._batch_optimizers.get(asset_type)
             
-            if asset_type == "texture":
-                return await self._optimize_texture(asset, settings)
-            elif asset_type == "mesh":
-                return await self._optimize_mesh(asset, settings)
-            elif asset_type == "audio":
-                return await self._optimize_audio(asset, settings)
-            else:
+            if optimizer is None:
                 logger.warning(f"Unknown asset type: {asset_type}")
-                return asset
-                
-        except Exception as e:
-            logger.error(f"Error optimizing asset {asset.get('id')}: {str(e)}")
-            return asset
+                optimized = group
+            else:
+                try:
+                    optimized = optimizer(group, settings)
+                except Exception as e:
+                    logger.error(f"Error optimizing {len(group)} {asset_type} assets: {str(e)}")
+                    continue
             
-    async def _optimize_texture(self, asset: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Any]:
-        """Optimize texture asset."""
-        optimized = asset.copy()
+            for i, optimized_asset in zip(indices, optimized):
+                results[i] = optimized_asset
         
+        return results
+        
+    def _sizes(self, assets: List[Dict[str, Any]]) -> np.ndarray:
+        """Original sizes of a group of assets as one float array."""
+        return np.fromiter((asset.get("size_mb", 0) for asset in assets), dtype=np.float64, count=len(assets))
+        
+    def _optimize_textures(self, assets: List[Dict[str, Any]], settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Optimize texture assets."""
         # Apply texture compression
         compression = settings.get("texture_compression", "medium")
         max_size = settings.get("max_texture_size", 2048)
         
         # Simulate optimization
-        original_size = asset.get("size_mb", 0)
         compression_factors = {"low": 0.9, "medium": 0.7, "high": 0.5}
         factor = compression_factors.get(compression, 0.7)
+        sizes = self._sizes(assets) * factor
         
-        optimized["size_mb"] = original_size * factor
-        optimized["optimized"] = True
-        optimized["compression_level"] = compression
-        optimized["max_resolution"] = max_size
-        
-        return optimized
-        
-    async def _optimize_mesh(self, asset: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Any]:
-        """Optimize mesh asset."""
-        optimized = asset.copy()
+        return [
+            {
+                **asset,
+                "size_mb": size,
+                "optimized": True,
+                "compression_level": compression,
+                "max_resolution": max_size
+            }
+            for asset, size in zip(assets, sizes.tolist())
+        ]
         
+    def _optimize_meshes(self, assets: List[Dict[str, Any]], settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Optimize mesh assets."""
         # Apply mesh decimation
         decimation = settings.get("mesh_decimation", 0.8)
         
         # Simulate optimization
-        original_size = asset.get("size_mb", 0)
-        optimized["size_mb"] = original_size * decimation
-        optimized["optimized"] = True
-        optimized["decimation_factor"] = decimation
-        
-        return optimized
+        sizes = self._sizes(assets) * decimation
         
-    async def _optimize_audio(self, asset: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Any]:
-        """Optimize audio asset."""
-        optimized = asset.copy()
+        return [
+            {
+                **asset,
+                "size_mb": size,
+                "optimized": True,
+                "decimation_factor": decimation
+            }
+            for asset, size in zip(assets, sizes.tolist())
+        ]
         
+    def _optimize_audio(self, assets: List[Dict[str, Any]], settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Optimize audio assets."""
         # Apply audio compression
         bitrate = settings.get("audio_bitrate", 192)
         
         # Simulate optimization
-        original_size = asset.get("size_mb", 0)
         compression_factor = min(1.0, bitrate / 320.0)  # Normalize to 320kbps
+        sizes = self._sizes(assets) * compression_factor
         
-        optimized["size_mb"] = original_size * compression_factor
-        optimized["optimized"] = True
-        optimized["bitrate"] = bitrate
-        
-        return optimized
+        return [
+            {
+                **asset,
+                "size_mb": size,
+                "optimized": True,
+                "bitrate": bitrate
+            }
+            for asset, size in zip(assets, sizes.tolist())
+        ]
@@ -0,0 +1,73 @@
+"""
+Typed asset records parsed once from raw site asset dicts.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+_EMPTY_VEC3 = np.zeros((0, 3), dtype=np.float32)
+_EMPTY_VEC2 = np.zeros((0, 2), dtype=np.float32)
+_EMPTY_FACES = np.zeros((0, 3), dtype=np.uint32)
+
+
+@dataclass(slots=True, frozen=True)
+class MeshAsset:
+    """Mesh asset with geometry stored as contiguous NumPy arrays."""
+    id: str
+    name: Optional[str]
+    vertices: np.ndarray  # (N, 3) float32
+    faces: np.ndarray  # (M, 3) uint32
+    normals: np.ndarray  # (N, 3) float32, empty if not provided
+    uv: np.ndarray  # (N, 2) float32, empty if not provided
+    static: bool
+    material: str
+
+
+@dataclass(slots=True, frozen=True)
+class LightAsset:
+    """Light source asset."""
+    type: str
+    position: Tuple[float, float, float]
+    direction: Tuple[float, float, float]
+    color: Tuple[float, float, float]
+    intensity: float
+
+
+def _as_array(values: Any, dtype: Any, width: int, empty: np.ndarray) -> np.ndarray:
+    """Convert a nested list to a contiguous (N, width) array."""
+    if values is None or len(values) == 0:
+        return empty
+    return np.ascontiguousarray(values, dtype=dtype).reshape(-1, width)
+
+
+def parse_assets(assets: List[Dict[str, Any]]) -> Tuple[List[MeshAsset], List[LightAsset]]:
+    """Partition raw asset dicts into typed meshes and lights in a single pass."""
+    meshes: List[MeshAsset] = []
+    lights: List[LightAsset] = []
+
+    for asset in assets:
+        asset_type = asset.get("type")
+
+        if asset_type == "mesh":
+            meshes.append(MeshAsset(
+                id=asset.get("id", f"mesh_{len(meshes)}"),
+                name=asset.get("name"),
+                vertices=_as_array(asset.get("vertices"), np.float32, 3, _EMPTY_VEC3),
+                faces=_as_array(asset.get("faces"), np.uint32, 3, _EMPTY_FACES),
+                normals=_as_array(asset.get("normals"), np.float32, 3, _EMPTY_VEC3),
+                uv=_as_array(asset.get("uv_coordinates"), np.float32, 2, _EMPTY_VEC2),
+                static=asset.get("static", True),
+                material=asset.get("material", "default")
+            ))
+        elif asset_type == "light":
+            lights.append(LightAsset(
+                type=asset.get("light_type", "point"),
+                position=tuple(asset.get("position", (0.0, 0.0, 0.0))),
+                direction=tuple(asset.get("direction", (0.0, -1.0, 0.0))),
+                color=tuple(asset.get("color", (1.0, 1.0, 1.0))),
+                intensity=float(asset.get("intensity", 1.0))
+            ))
+
+    return meshes, lights
@@ -0,0 +1,137 @@
+"""
+Flat AABB bounding volume hierarchy over indexed triangles.
+"""
+
+from typing import Dict, Any, Tuple
+
+import numpy as np
+
+from .utils_numba import tri_bounds
+
+# Morton codes use 10 bits per axis
+_MORTON_SCALE = 1023.0
+
+
+def _expand_bits(v: np.ndarray) -> np.ndarray:
+    """Spread the low 10 bits of v so two zero bits follow each one."""
+    v = v.astype(np.uint32)
+    v = (v * np.uint32(0x00010001)) & np.uint32(0xFF0000FF)
+    v = (v * np.uint32(0x00000101)) & np.uint32(0x0F00F00F)
+    v = (v * np.uint32(0x00000011)) & np.uint32(0xC30C30C3)
+    v = (v * np.uint32(0x00000005)) & np.uint32(0x49249249)
+    return v
+
+
+def _morton_codes(points: np.ndarray) -> np.ndarray:
+    """30-bit Morton codes for (N, 3) points normalized to their bounding box."""
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1e-8)
+    cells = np.clip((points - lo) / extent * _MORTON_SCALE, 0, _MORTON_SCALE)
+    return (
+        (_expand_bits(cells[:, 0]) << np.uint32(2))
+        | (_expand_bits(cells[:, 1]) << np.uint32(1))
+        | _expand_bits(cells[:, 2])
+    )
+
+
+def build_bvh(vertices: np.ndarray, indices: np.ndarray, leaf_size: int = 4) -> Dict[str, np.ndarray]:
+    """Build a linear BVH over indexed triangles; node 0 is the root.
+    
+    Triangles are sorted along a Morton curve and grouped into leaves of
+    leaf_size, then adjacent nodes are merged pairwise level by level.
+    Leaves have left == right == -1 and cover
+    prim_indices[first_prim:first_prim + prim_count].
+    """
+    tri_count = len(indices)
+    if tri_count == 0:
+        return {
+            "aabb_min": np.zeros((0, 3), dtype=np.float32),
+            "aabb_max": np.zeros((0, 3), dtype=np.float32),
+            "left": np.zeros(0, dtype=np.int32),
+            "right": np.zeros(0, dtype=np.int32),
+            "first_prim": np.zeros(0, dtype=np.int32),
+            "prim_count": np.zeros(0, dtype=np.int32),
+            "prim_indices": np.zeros(0, dtype=np.int32)
+        }
+    
+    tri_min, tri_max, centers = tri_bounds(vertices, indices)
+    order = np.argsort(_morton_codes(centers), kind="stable")
+    tri_min = tri_min[order]
+    tri_max = tri_max[order]
+    
+    # Leaves: contiguous runs of leaf_size triangles in Morton order
+    starts = np.arange(0, tri_count, leaf_size)
+    level_min = np.minimum.reduceat(tri_min, starts, axis=0)
+    level_max = np.maximum.reduceat(tri_max, starts, axis=0)
+    level_ids = np.arange(len(starts))
+    
+    mins, maxs = [level_min], [level_max]
+    lefts = [np.full(len(starts), -1)]
+    rights = [np.full(len(starts), -1)]
+    firsts = [starts]
+    counts = [np.diff(np.append(starts, tri_count))]
+    node_count = len(starts)
+    
+    # Merge adjacent nodes pairwise until only the root is left; an odd node carries up a level
+    while len(level_ids) > 1:
+        pairs = len(level_ids) // 2
+        parent_min = np.minimum(level_min[0:2 * pairs:2], level_min[1:2 * pairs:2])
+        parent_max = np.maximum(level_max[0:2 * pairs:2], level_max[1:2 * pairs:2])
+        parent_ids = node_count + np.arange(pairs)
+        
+        mins.append(parent_min)
+        maxs.append(parent_max)
+        lefts.append(level_ids[0:2 * pairs:2])
+        rights.append(level_ids[1:2 * pairs:2])
+        firsts.append(np.zeros(pairs, dtype=np.int64))
+        counts.append(np.zeros(pairs, dtype=np.int64))
+        node_count += pairs
+        
+        if len(level_ids) % 2:
+            parent_ids = np.append(parent_ids, level_ids[-1])
+            parent_min = np.concatenate([parent_min, level_min[-1:]])
+            parent_max = np.concatenate([parent_max, level_max[-1:]])
+        level_ids, level_min, level_max = parent_ids, parent_min, parent_max
+    
+    # Nodes were appended bottom-up; reverse so the root comes first
+    left = np.concatenate(lefts)[::-1]
+    right = np.concatenate(rights)[::-1]
+    left = np.where(left >= 0, node_count - 1 - left, -1)
+    right = np.where(right >= 0, node_count - 1 - right, -1)
+    
+    return {
+        "aabb_min": np.ascontiguousarray(np.concatenate(mins)[::-1], dtype=np.float32),
+        "aabb_max": np.ascontiguousarray(np.concatenate(maxs)[::-1], dtype=np.float32),
+        "left": left.astype(np.int32),
+        "right": right.astype(np.int32),
+        "first_prim": np.concatenate(firsts)[::-1].astype(np.int32),
+        "prim_count": np.concatenate(counts)[::-1].astype(np.int32),
+        "prim_indices": order.astype(np.int32)
+    }
+
+
+def pack_bvh(bvh: Dict[str, np.ndarray]) -> Tuple[bytes, Dict[str, Any]]:
+    """Pack BVH arrays into one little-endian blob plus its layout."""
+    blob = bytearray()
+    layout = {
+        "node_count": len(bvh["left"]),
+        "primitive_count": len(bvh["prim_indices"]),
+        "attributes": {}
+    }
+    
+    for name, dtype in (
+        ("aabb_min", "<f4"), ("aabb_max", "<f4"),
+        ("left", "<i4"), ("right", "<i4"),
+        ("first_prim", "<i4"), ("prim_count", "<i4"),
+        ("prim_indices", "<i4")
+    ):
+        array = np.ascontiguousarray(bvh[name], dtype=dtype)
+        layout["attributes"][name] = {
+            "byte_offset": len(blob),
+            "byte_length": array.nbytes,
+            "component_type": "float32" if dtype == "<f4" else "int32",
+            "components": array.shape[1] if array.ndim > 1 else 1
+        }
+        blob += array.tobytes()
+    
+    return bytes(blob), layout
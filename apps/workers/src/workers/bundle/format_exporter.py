@@ -2,27 +2,445 @@
 3D format exporter for cross-platform compatibility.
 """
 
+import asyncio
+import hashlib
+import io
 import logging
 import json
-from typing import Dict, Any, List
+import struct
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .assets import MeshAsset
+from ..shared.config import pool_workers
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
 
 logger = logging.getLogger(__name__)
 
+# Binary glTF container constants
+_GLB_MAGIC = b"glTF"
+_GLB_VERSION = 2
+_GLB_CHUNK_JSON = 0x4E4F534A
+_GLB_CHUNK_BIN = 0x004E4942
+
+# glTF accessor component types and buffer view targets
+_COMPONENT_FLOAT = 5126
+_COMPONENT_UNSIGNED_INT = 5125
+_TARGET_ARRAY_BUFFER = 34962
+_TARGET_ELEMENT_ARRAY_BUFFER = 34963
+_MODE_POINTS = 0
+_ACCESSOR_TYPES = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4"}
+
+# Compression is fed in slices so the compressor never copies the whole payload at once
+_COMPRESS_CHUNK_SIZE = 1024 * 1024
+_GZIP_WBITS = 31  # zlib with gzip header/trailer
+
+# Placeholder quad used for meshes without geometry
+_PLACEHOLDER_VERTICES = np.array([[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1]], dtype=np.float32)
+_PLACEHOLDER_FACES = np.array([[0, 1, 2], [0, 2, 3]], dtype=np.uint32)
+
+# Per-line/per-block templates, %-formatted as bytes; %.9g round-trips float32, so site-scale
+# vertex coordinates keep full precision (%g keeps only 6 significant digits)
+_OBJ_VERTEX_FMT = b"v %.9g %.9g %.9g\n"
+_OBJ_FACE_FMT = b"f %d %d %d\n"
+_USD_MESH_BLOCK = b"""
+    def Mesh "Mesh_%d"
+    {
+        int[] faceVertexCounts = [3, 3, 3, 3]
+        int[] faceVertexIndices = [0, 1, 2, 0, 2, 3]
+        point3f[] points = [(0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1)]
+    }
+"""
+
+# Shared default material; only ever serialized, never mutated
+_DEFAULT_MATERIAL = {
+    "name": "DefaultMaterial",
+    "pbrMetallicRoughness": {
+        "baseColorFactor": [1.0, 1.0, 1.0, 1.0],
+        "metallicFactor": 0.0,
+        "roughnessFactor": 0.5
+    }
+}
+
+
+def _dumps_json(data: Dict[str, Any]) -> bytes:
+    """Serialize to compact UTF-8 JSON, using orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode('utf-8')
+
+
+def _dumps_canonical(data: Dict[str, Any]) -> bytes:
+    """Serialize with sorted keys so equal dicts hash identically."""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode('utf-8')
+
+
+def _export_fingerprint(meshes: List[MeshAsset], options: Dict[str, Any]) -> str:
+    """Hash export inputs (mesh data + options) into a cache key component."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_dumps_canonical({k: v for k, v in options.items() if k != "nocache"}))
+    for mesh in meshes:
+        h.update(_dumps_canonical({
+            "id": mesh.id,
+            "name": mesh.name,
+            "static": mesh.static,
+            "material": mesh.material
+        }))
+        for array in (mesh.vertices, mesh.faces, mesh.normals, mesh.uv):
+            h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def _format_rows(fmt: bytes, rows: np.ndarray) -> bytes:
+    """Format every row of a 2D array with a single bytes %-formatting call."""
+    return (fmt * len(rows)) % tuple(rows.ravel().tolist())
+
+
+def _pad4(length: int) -> int:
+    """Number of padding bytes needed to reach 4-byte alignment."""
+    return -length % 4
+
+
+def _append_accessor(
+    gltf_data: Dict[str, Any],
+    bin_chunk: bytearray,
+    array: np.ndarray,
+    component_type: int,
+    target: int,
+    with_bounds: bool = False
+) -> int:
+    """Append array to the binary chunk with its bufferView and accessor; return accessor index."""
+    bin_chunk += b"\0" * _pad4(len(bin_chunk))
+    data = array.tobytes()
+    
+    gltf_data["bufferViews"].append({
+        "buffer": 0,
+        "byteOffset": len(bin_chunk),
+        "byteLength": len(data),
+        "target": target
+    })
+    bin_chunk += data
+    
+    components = array.shape[1] if array.ndim > 1 else 1
+    accessor = {
+        "bufferView": len(gltf_data["bufferViews"]) - 1,
+        "componentType": component_type,
+        "count": array.shape[0] if components > 1 else array.size,
+        "type": _ACCESSOR_TYPES[components]
+    }
+    if with_bounds:
+        accessor["min"] = array.min(axis=0).tolist()
+        accessor["max"] = array.max(axis=0).tolist()
+    
+    gltf_data["accessors"].append(accessor)
+    return len(gltf_data["accessors"]) - 1
+
+
+def _pack_glb(gltf_data: Dict[str, Any], bin_chunk: bytearray) -> bytearray:
+    """Pack glTF JSON and binary buffer into a single pre-sized GLB container."""
+    json_bytes = _dumps_json(gltf_data)
+    json_length = len(json_bytes) + _pad4(len(json_bytes))
+    bin_length = len(bin_chunk) + _pad4(len(bin_chunk))
+    
+    total_length = 12 + 8 + json_length
+    if bin_chunk:
+        total_length += 8 + bin_length
+    
+    # One allocation; padding bytes are pre-filled and each section is slice-assigned
+    out = bytearray(total_length)
+    struct.pack_into("<4sIIII", out, 0, _GLB_MAGIC, _GLB_VERSION, total_length, json_length, _GLB_CHUNK_JSON)
+    offset = 20
+    out[offset:offset + json_length] = json_bytes.ljust(json_length, b" ")
+    offset += json_length
+    if bin_chunk:
+        struct.pack_into("<II", out, offset, bin_length, _GLB_CHUNK_BIN)
+        offset += 8
+        out[offset:offset + len(bin_chunk)] = bin_chunk
+    
+    return out
+
+
+def _export_gltf_sync(site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Export to binary glTF (.glb) format."""
+    include_animations = options.get("include_animations", True)
+    include_materials = options.get("include_materials", True)
+    embed_textures = options.get("embed_textures", False)
+    
+    # Create glTF structure
+    gltf_data = {
+        "asset": {
+            "version": "2.0",
+            "generator": "AI VR Tour Guide Bundle Worker"
+        },
+        "scene": 0,
+        "scenes": [
+            {
+                "name": f"Site_{site_id}",
+                "nodes": []
+            }
+        ],
+        "nodes": [],
+        "meshes": [],
+        "materials": [],
+        "textures": [],
+        "images": [],
+        "accessors": [],
+        "bufferViews": [],
+        "buffers": []
+    }
+    
+    # Vertex attributes and indices for all meshes share one binary buffer
+    bin_chunk = bytearray()
+    
+    # Process meshes
+    node_index = 0
+    for mesh in meshes:
+        # Meshes without geometry get the placeholder quad; faces without vertices index nothing
+        if len(mesh.vertices):
+            positions, indices = mesh.vertices, mesh.faces.ravel()
+        else:
+            positions, indices = _PLACEHOLDER_VERTICES, _PLACEHOLDER_FACES.ravel()
+        
+        normals = mesh.normals
+        if len(normals) != len(positions):
+            normals = np.tile(np.array([0, 1, 0], dtype=np.float32), (len(positions), 1))
+        uvs = mesh.uv
+        if len(uvs) != len(positions):
+            uvs = np.zeros((len(positions), 2), dtype=np.float32)
+        
+        primitive = {
+            "attributes": {
+                "POSITION": _append_accessor(
+                    gltf_data, bin_chunk, positions, _COMPONENT_FLOAT, _TARGET_ARRAY_BUFFER, with_bounds=True
+                ),
+                "NORMAL": _append_accessor(
+                    gltf_data, bin_chunk, normals, _COMPONENT_FLOAT, _TARGET_ARRAY_BUFFER
+                ),
+                "TEXCOORD_0": _append_accessor(
+                    gltf_data, bin_chunk, uvs, _COMPONENT_FLOAT, _TARGET_ARRAY_BUFFER
+                )
+            }
+        }
+        
+        # glTF accessors need count >= 1, so vertices without faces are drawn as points
+        if len(indices):
+            primitive["indices"] = _append_accessor(
+                gltf_data, bin_chunk, indices, _COMPONENT_UNSIGNED_INT, _TARGET_ELEMENT_ARRAY_BUFFER
+            )
+        else:
+            primitive["mode"] = _MODE_POINTS
+        if include_materials:
+            primitive["material"] = 0
+        
+        # Add mesh node
+        mesh_name = mesh.name or f"Mesh_{node_index}"
+        gltf_data["nodes"].append({
+            "name": mesh_name,
+            "mesh": len(gltf_data["meshes"])
+        })
+        gltf_data["scenes"][0]["nodes"].append(node_index)
+        
+        # Add mesh data
+        gltf_data["meshes"].append({
+            "name": mesh_name,
+            "primitives": [primitive]
+        })
+        
+        node_index += 1
+    
+    # Add default material if materials are included
+    if include_materials:
+        gltf_data["materials"].append(_DEFAULT_MATERIAL)
+    
+    if bin_chunk:
+        gltf_data["buffers"].append({"byteLength": len(bin_chunk)})
+    
+    # glTF forbids empty arrays, including the node list of an empty scene
+    if not gltf_data["scenes"][0]["nodes"]:
+        del gltf_data["scenes"][0]["nodes"]
+    gltf_data = {key: value for key, value in gltf_data.items() if value != []}
+    
+    glb_bytes = _pack_glb(gltf_data, bin_chunk)
+    
+    return {
+        "file_data": glb_bytes,
+        "content_type": "model/gltf-binary",
+        "file_extension": "glb",
+        "size_bytes": len(glb_bytes)
+    }
+
+
+def _export_usdz_sync(site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Export to USDZ format (Apple's AR format)."""
+    # USDZ is a zip archive containing USD files
+    # This is a simplified implementation
+    
+    buf = bytearray()
+    buf += f"""#usda 1.0
+(
+    defaultPrim = "Site_{site_id}"
+    metersPerUnit = 1
+    upAxis = "Y"
+)
+
+def Xform "Site_{site_id}"
+{{
+""".encode('utf-8')
+    
+    # Add meshes
+    for i, mesh in enumerate(meshes):
+        buf += _USD_MESH_BLOCK % i
+    
+    buf += b"}\n"
+    
+    return {
+        "file_data": buf,
+        "content_type": "model/vnd.usdz+zip",
+        "file_extension": "usdz",
+        "size_bytes": len(buf)
+    }
+
+
+def _export_fbx_sync(site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Export to FBX format."""
+    # FBX is a binary format - this is a placeholder
+    # Real implementation would use FBX SDK or similar
+    
+    fbx_placeholder = f"FBX Binary Data for Site {site_id}".encode('utf-8')
+    
+    return {
+        "file_data": fbx_placeholder,
+        "content_type": "application/octet-stream",
+        "file_extension": "fbx",
+        "size_bytes": len(fbx_placeholder)
+    }
+
+
+def _export_obj_sync(site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Export to OBJ format."""
+    buf = bytearray(b"# OBJ file for Site ")
+    buf += site_id.encode('utf-8')
+    buf += b"\n# Generated by AI VR Tour Guide Bundle Worker\n\n"
+    
+    vertex_offset = 1  # OBJ indices start at 1
+    
+    for mesh in meshes:
+        buf += b"o %s\n" % (mesh.name or 'Mesh').encode('utf-8')
+        
+        if len(mesh.vertices):
+            vertices, faces = mesh.vertices, mesh.faces
+        else:
+            vertices, faces = _PLACEHOLDER_VERTICES, _PLACEHOLDER_FACES
+        
+        # Add vertices and faces in bulk
+        buf += _format_rows(_OBJ_VERTEX_FMT, vertices)
+        buf += _format_rows(_OBJ_FACE_FMT, faces.astype(np.int64) + vertex_offset)
+        
+        vertex_offset += len(vertices)
+        buf += b"\n"
+    
+    return {
+        "file_data": buf,
+        "content_type": "text/plain",
+        "file_extension": "obj",
+        "size_bytes": len(buf)
+    }
+
+
+def _compress_export(result: Dict[str, Any], encoding: Any) -> Dict[str, Any]:
+    """Stream-compress an export's file data with brotli or gzip."""
+    if encoding is True:
+        encoding = "br" if HAS_BROTLI else "gzip"
+    if encoding == "br" and not HAS_BROTLI:
+        logger.warning("brotli not available, falling back to gzip")
+        encoding = "gzip"
+    if encoding not in ("br", "gzip"):
+        raise ValueError(f"Unsupported compression: {encoding}")
+    
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        compress, flush = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP_WBITS)
+        compress, flush = compressor.compress, compressor.flush
+    
+    data = memoryview(result["file_data"])
+    out = io.BytesIO()
+    for offset in range(0, len(data), _COMPRESS_CHUNK_SIZE):
+        out.write(compress(data[offset:offset + _COMPRESS_CHUNK_SIZE]))
+    out.write(flush())
+    compressed = out.getvalue()
+    
+    return {
+        **result,
+        "file_data": compressed,
+        "content_encoding": encoding,
+        "uncompressed_size_bytes": result["size_bytes"],
+        "size_bytes": len(compressed)
+    }
+
+
+def _run_export(export_func, site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run an exporter and apply the requested compression in the same worker."""
+    result = export_func(site_id, meshes, options)
+    if options.get("compress"):
+        result = _compress_export(result, options["compress"])
+    return result
+
 
 class FormatExporter:
     """Exports 3D scenes to various formats."""
     
-    def __init__(self):
-        self.supported_formats = ["gltf", "usdz", "fbx", "obj"]
+    def __init__(self, max_workers: Optional[int] = None):
+        self._dispatch = {
+            "gltf": self._export_gltf,
+            "usdz": self._export_usdz,
+            "fbx": self._export_fbx,
+            "obj": self._export_obj
+        }
+        self.supported_formats = tuple(self._dispatch)
+        self.max_workers = max_workers or pool_workers()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        
+        # LRU of export results keyed by (site_id, format, input fingerprint), bounded by entries and payload bytes
+        self.cache_size = 128
+        self.cache_max_bytes = 256 * 1024 * 1024
+        self._cache: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._cache_bytes = 0
         
     async def initialize(self):
         """Initialize the format exporter."""
+        # Exports are pure CPU work; keep them off the event loop
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
         logger.info("Format exporter initialized")
         
+    async def cleanup(self):
+        """Shut down the export process pool."""
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        
     async def export_format(
         self, 
         site_id: str, 
-        assets: List[Dict[str, Any]], 
+        meshes: List[MeshAsset], 
         format: str,
         options: Dict[str, Any] = None
     ) -> Dict[str, Any]:
@@ -30,185 +448,88 @@ class FormatExporter:
         try:
             logger.info(f"Exporting site {site_id} to {format.upper()}")
             
-            if format not in self.supported_formats:
+            handler = self._dispatch.get(format)
+            if handler is None:
                 raise ValueError(f"Unsupported format: {format}")
             
             opts = options or {}
             
-            if format == "gltf":
-                return await self._export_gltf(site_id, assets, opts)
-            elif format == "usdz":
-                return await self._export_usdz(site_id, assets, opts)
-            elif format == "fbx":
-                return await self._export_fbx(site_id, assets, opts)
-            elif format == "obj":
-                return await self._export_obj(site_id, assets, opts)
-            else:
-                raise ValueError(f"Format {format} not implemented")
+            use_cache = not opts.get("nocache")
+            if use_cache:
+                # Hashing every mesh buffer is CPU work too; hashlib releases the GIL for large buffers
+                cache_key = (site_id, format, await asyncio.to_thread(_export_fingerprint, meshes, opts))
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    self._cache.move_to_end(cache_key)
+                    logger.info(f"Serving cached {format.upper()} export for site {site_id}")
+                    return cached
+            
+            result = await handler(site_id, meshes, opts)
+            
+            # Exporters return their output bytearray as-is; share it as a read-only
+            # view so cached results can't be mutated by callers
+            result["file_data"] = memoryview(result["file_data"]).toreadonly()
+            
+            if use_cache:
+                self._cache_result(cache_key, result)
+            
+            return result
                 
         except Exception as e:
             logger.error(f"Error exporting to {format}: {str(e)}")
             raise e
             
-    async def _export_gltf(self, site_id: str, assets: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
-        """Export to glTF format."""
-        include_animations = options.get("include_animations", True)
-        include_materials = options.get("include_materials", True)
-        embed_textures = options.get("embed_textures", False)
-        
-        # Create glTF structure
-        gltf_data = {
-            "asset": {
-                "version": "2.0",
-                "generator": "AI VR Tour Guide Bundle Worker"
-            },
-            "scene": 0,
-            "scenes": [
-                {
-                    "name": f"Site_{site_id}",
-                    "nodes": []
-                }
-            ],
-            "nodes": [],
-            "meshes": [],
-            "materials": [],
-            "textures": [],
-            "images": [],
-            "accessors": [],
-            "bufferViews": [],
-            "buffers": []
-        }
+    def _cache_result(self, cache_key: Tuple[str, str, str], result: Dict[str, Any]):
+        """Cache an export result, evicting the least recently used ones past the entry or byte limit."""
+        size = result["size_bytes"]
+        if size > self.cache_max_bytes:
+            return
         
-        # Process assets
-        node_index = 0
-        for asset in assets:
-            if asset.get("type") == "mesh":
-                # Add mesh node
-                gltf_data["nodes"].append({
-                    "name": asset.get("name", f"Mesh_{node_index}"),
-                    "mesh": len(gltf_data["meshes"])
-                })
-                gltf_data["scenes"][0]["nodes"].append(node_index)
-                
-                # Add mesh data
-                gltf_data["meshes"].append({
-                    "name": asset.get("name", f"Mesh_{node_index}"),
-                    "primitives": [
-                        {
-                            "attributes": {
-                                "POSITION": 0,  # Accessor index
-                                "NORMAL": 1,
-                                "TEXCOORD_0": 2
-                            },
-                            "indices": 3,
-                            "material": 0 if include_materials else None
-                        }
-                    ]
-                })
-                
-                node_index += 1
+        previous = self._cache.pop(cache_key, None)
+        if previous is not None:
+            self._cache_bytes -= previous["size_bytes"]
+        self._cache[cache_key] = result
+        self._cache_bytes += size
         
-        # Add default material if materials are included
-        if include_materials:
-            gltf_data["materials"].append({
-                "name": "DefaultMaterial",
-                "pbrMetallicRoughness": {
-                    "baseColorFactor": [1.0, 1.0, 1.0, 1.0],
-                    "metallicFactor": 0.0,
-                    "roughnessFactor": 0.5
-                }
-            })
-        
-        # Convert to JSON
-        gltf_json = json.dumps(gltf_data, indent=2)
-        
-        return {
-            "file_data": gltf_json.encode('utf-8'),
-            "content_type": "model/gltf+json",
-            "file_extension": "gltf",
-            "size_bytes": len(gltf_json.encode('utf-8'))
-        }
+        while len(self._cache) > self.cache_size or self._cache_bytes > self.cache_max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted["size_bytes"]
         
-    async def _export_usdz(self, site_id: str, assets: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
-        """Export to USDZ format (Apple's AR format)."""
-        # USDZ is a zip archive containing USD files
-        # This is a simplified implementation
+    async def export_all(
+        self,
+        site_id: str,
+        meshes: List[MeshAsset],
+        options: Dict[str, Any] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Export site to every supported format concurrently."""
+        logger.info(f"Exporting site {site_id} to all formats")
         
-        usd_content = f"""#usda 1.0
-(
-    defaultPrim = "Site_{site_id}"
-    metersPerUnit = 1
-    upAxis = "Y"
-)
-
-def Xform "Site_{site_id}"
-{{
-"""
+        tasks = [
+            asyncio.create_task(self.export_format(site_id, meshes, format, options))
+            for format in self.supported_formats
+        ]
+        results = await asyncio.gather(*tasks)
         
-        # Add meshes
-        for i, asset in enumerate(assets):
-            if asset.get("type") == "mesh":
-                usd_content += f"""
-    def Mesh "Mesh_{i}"
-    {{
-        int[] faceVertexCounts = [3, 3, 3, 3]
-        int[] faceVertexIndices = [0, 1, 2, 0, 2, 3]
-        point3f[] points = [(0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1)]
-    }}
-"""
-        
-        usd_content += "}\n"
+        return dict(zip(self.supported_formats, results))
+            
+    async def _run(self, func, *args):
+        """Run a CPU-bound export function in the process pool."""
+        if self._pool is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+            
+    async def _export_gltf(self, site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
+        """Export to binary glTF (.glb) format."""
+        return await self._run(_run_export, _export_gltf_sync, site_id, meshes, options)
         
-        return {
-            "file_data": usd_content.encode('utf-8'),
-            "content_type": "model/vnd.usdz+zip",
-            "file_extension": "usdz",
-            "size_bytes": len(usd_content.encode('utf-8'))
-        }
+    async def _export_usdz(self, site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
+        """Export to USDZ format (Apple's AR format)."""
+        return await self._run(_run_export, _export_usdz_sync, site_id, meshes, options)
         
-    async def _export_fbx(self, site_id: str, assets: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+    async def _export_fbx(self, site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
         """Export to FBX format."""
-        # FBX is a binary format - this is a placeholder
-        # Real implementation would use FBX SDK or similar
-        
-        fbx_placeholder = f"FBX Binary Data for Site {site_id}".encode('utf-8')
-        
-        return {
-            "file_data": fbx_placeholder,
-            "content_type": "application/octet-stream",
-            "file_extension": "fbx",
-            "size_bytes": len(fbx_placeholder)
-        }
+        return await self._run(_run_export, _export_fbx_sync, site_id, meshes, options)
         
-    async def _export_obj(self, site_id: str, assets: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+    async def _export_obj(self, site_id: str, meshes: List[MeshAsset], options: Dict[str, Any]) -> Dict[str, Any]:
         """Export to OBJ format."""
-        obj_content = f"# OBJ file for Site {site_id}\n"
-        obj_content += f"# Generated by AI VR Tour Guide Bundle Worker\n\n"
-        
-        vertex_offset = 1  # OBJ indices start at 1
-        
-        for asset in assets:
-            if asset.get("type") == "mesh":
-                obj_content += f"o {asset.get('name', 'Mesh')}\n"
-                
-                # Add vertices (placeholder)
-                vertices = [
-                    [0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1]
-                ]
-                
-                for vertex in vertices:
-                    obj_content += f"v {vertex[0]} {vertex[1]} {vertex[2]}\n"
-                
-                # Add faces
-                obj_content += f"f {vertex_offset} {vertex_offset+1} {vertex_offset+2}\n"
-                obj_content += f"f {vertex_offset} {vertex_offset+2} {vertex_offset+3}\n"
-                
-                vertex_offset += len(vertices)
-                obj_content += "\n"
-        
-        return {
-            "file_data": obj_content.encode('utf-8'),
-            "content_type": "text/plain",
-            "file_extension": "obj",
-            "size_bytes": len(obj_content.encode('utf-8'))
-        }
+        return await self._run(_run_export, _export_obj_sync, site_id, meshes, options)
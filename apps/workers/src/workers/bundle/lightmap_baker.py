@@ -2,27 +2,158 @@
 Lightmap and light probe baking for realistic lighting.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .assets import LightAsset, MeshAsset
+from .utils_numba import single_threaded_kernels
+from ..shared.config import pool_workers
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
 
 logger = logging.getLogger(__name__)
 
+# Real L2 spherical harmonics basis constants
+_SH_C0 = 0.282095
+_SH_C1 = 0.488603
+_SH_C2 = 1.092548
+_SH_C3 = 0.315392
+_SH_C4 = 0.546274
+
+# Default lighting used when a site has no light assets
+_DEFAULT_LIGHTS = (
+    LightAsset(
+        type="directional",
+        position=(0.0, 10.0, 0.0),
+        direction=(0.0, -1.0, 0.0),
+        color=(1.0, 1.0, 1.0),
+        intensity=1.0
+    ),
+    LightAsset(
+        type="ambient",
+        position=(0.0, 0.0, 0.0),
+        direction=(0.0, -1.0, 0.0),
+        color=(0.2, 0.2, 0.3),
+        intensity=0.3
+    )
+)
+
+# Rec. 709 luminance weights for collapsing light colors to scalar radiance
+_LUMINANCE = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+
+# Light probe grid layout: horizontal spacing and heights above the scene floor
+_PROBE_SPACING = 5.0  # 5 meter spacing
+_PROBE_HEIGHTS = np.array([0.5, 2.0, 3.5], dtype=np.float32)
+
+
+def _sh_basis(x, y, z):
+    """Evaluate the 9 L2 SH basis functions for unit direction(s)."""
+    return (
+        np.full_like(x, _SH_C0),
+        _SH_C1 * y,
+        _SH_C1 * z,
+        _SH_C1 * x,
+        _SH_C2 * x * y,
+        _SH_C2 * y * z,
+        _SH_C3 * (3.0 * z * z - 1.0),
+        _SH_C2 * x * z,
+        _SH_C4 * (x * x - y * y)
+    )
+
+
+def _bake_sh_numpy(
+    positions: np.ndarray,
+    l_pos: np.ndarray,
+    l_dir: np.ndarray,
+    l_weight: np.ndarray,
+    l_directional: np.ndarray,
+    out: np.ndarray
+) -> None:
+    """Vectorized NumPy fallback for the SH baking kernel."""
+    # (N, L, 3) vectors from each probe to each point light
+    delta = l_pos[None, :, :] - positions[:, None, :]
+    dist2 = np.maximum(np.einsum("nlk,nlk->nl", delta, delta), 1e-8)
+    directions = delta / np.sqrt(dist2)[:, :, None]
+    weights = l_weight[None, :] / dist2
+    
+    # Directional lights arrive from the same direction everywhere, without falloff
+    directions = np.where(l_directional[None, :, None], -l_dir[None, :, :], directions)
+    weights = np.where(l_directional[None, :], l_weight[None, :], weights)
+    
+    basis = _sh_basis(directions[..., 0], directions[..., 1], directions[..., 2])
+    for k in range(9):
+        out[:, k] += (basis[k] * weights).sum(axis=1)
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _bake_sh_kernel(positions, l_pos, l_dir, l_weight, l_directional, out):
+        """Accumulate SH projections of all lights into out (N, 9), parallel over probes."""
+        for i in prange(positions.shape[0]):
+            for j in range(l_weight.shape[0]):
+                if l_directional[j]:
+                    x = -l_dir[j, 0]
+                    y = -l_dir[j, 1]
+                    z = -l_dir[j, 2]
+                    w = l_weight[j]
+                else:
+                    dx = l_pos[j, 0] - positions[i, 0]
+                    dy = l_pos[j, 1] - positions[i, 1]
+                    dz = l_pos[j, 2] - positions[i, 2]
+                    d2 = max(dx * dx + dy * dy + dz * dz, 1e-8)
+                    inv = 1.0 / np.sqrt(d2)
+                    x = dx * inv
+                    y = dy * inv
+                    z = dz * inv
+                    w = l_weight[j] / d2
+                
+                out[i, 0] += w * _SH_C0
+                out[i, 1] += w * _SH_C1 * y
+                out[i, 2] += w * _SH_C1 * z
+                out[i, 3] += w * _SH_C1 * x
+                out[i, 4] += w * _SH_C2 * x * y
+                out[i, 5] += w * _SH_C2 * y * z
+                out[i, 6] += w * _SH_C3 * (3.0 * z * z - 1.0)
+                out[i, 7] += w * _SH_C2 * x * z
+                out[i, 8] += w * _SH_C4 * (x * x - y * y)
+else:
+    _bake_sh_kernel = _bake_sh_numpy
+
 
 class LightmapBaker:
     """Bakes lightmaps and light probes for realistic lighting."""
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
         self.default_resolution = 512
         self.default_samples = 256
+        self.max_workers = max_workers or pool_workers()
+        self._pool: Optional[ProcessPoolExecutor] = None
         
     async def initialize(self):
         """Initialize the lightmap baker."""
+        # Baking is pure CPU work; keep it off the event loop
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=single_threaded_kernels)
         logger.info("Lightmap baker initialized")
         
+    async def cleanup(self):
+        """Shut down the baking process pool."""
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        
     async def bake_lightmaps(
         self, 
         site_id: str, 
-        assets: List[Dict[str, Any]], 
+        meshes: List[MeshAsset],
+        lights: List[LightAsset],
         parameters: Dict[str, Any] = None
     ) -> Dict[str, Any]:
         """Bake lightmaps for a site."""
@@ -30,104 +161,78 @@ class LightmapBaker:
             logger.info(f"Baking lightmaps for site {site_id}")
             
             params = parameters or {}
-            quality = params.get("quality", "medium")
-            resolution = params.get("resolution", self.default_resolution)
-            samples = params.get("samples", self.default_samples)
-            
-            # Extract light sources
-            lights = self._extract_lights(assets)
-            
-            # Extract geometry for lightmapping
-            geometry = self._extract_lightmap_geometry(assets)
+            if self._pool is None:
+                lightmap_data = _bake_lightmaps_sync(site_id, meshes, lights, params)
+            else:
+                lightmap_data = await asyncio.get_running_loop().run_in_executor(
+                    self._pool, _bake_lightmaps_sync, site_id, meshes, lights, params
+                )
             
-            # Bake lightmaps
-            lightmaps = self._bake_lightmaps(geometry, lights, resolution, samples)
-            
-            # Generate light probes
-            light_probes = self._generate_light_probes(geometry, lights)
-            
-            lightmap_data = {
-                "site_id": site_id,
-                "quality": quality,
-                "resolution": resolution,
-                "samples": samples,
-                "lightmaps": lightmaps,
-                "light_probes": light_probes,
-                "light_count": len(lights),
-                "size_mb": len(lightmaps) * (resolution * resolution * 4) / (1024 * 1024),  # Rough estimate
-                "bake_time": "2024-01-01T00:00:00Z"
-            }
-            
-            logger.info(f"Baked {len(lightmaps)} lightmaps with {len(light_probes)} light probes")
+            logger.info(
+                f"Baked {len(lightmap_data['lightmaps'])} lightmaps with "
+                f"{lightmap_data['light_probe_count']} light probes"
+            )
             return lightmap_data
             
         except Exception as e:
             logger.error(f"Error baking lightmaps: {str(e)}")
             return {"error": str(e)}
             
-    def _extract_lights(self, assets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract light sources from assets."""
-        lights = []
-        
-        for asset in assets:
-            if asset.get("type") == "light":
-                lights.append(asset)
+    def _bake(
+        self,
+        site_id: str,
+        meshes: List[MeshAsset],
+        lights: List[LightAsset],
+        params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Run the full bake synchronously."""
+        quality = params.get("quality", "medium")
+        resolution = params.get("resolution", self.default_resolution)
+        samples = params.get("samples", self.default_samples)
         
         # Add default lighting if no lights found
-        if not lights:
-            lights = [
-                {
-                    "type": "directional",
-                    "position": [0, 10, 0],
-                    "direction": [0, -1, 0],
-                    "color": [1, 1, 1],
-                    "intensity": 1.0
-                },
-                {
-                    "type": "ambient",
-                    "color": [0.2, 0.2, 0.3],
-                    "intensity": 0.3
-                }
-            ]
-        
-        return lights
-        
-    def _extract_lightmap_geometry(self, assets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract geometry that should receive lightmaps."""
-        geometry = []
-        
-        for asset in assets:
-            if asset.get("type") == "mesh" and asset.get("static", True):
-                # Only static geometry gets lightmapped
-                geometry.append({
-                    "id": asset["id"],
-                    "vertices": asset.get("vertices", []),
-                    "faces": asset.get("faces", []),
-                    "uv_coordinates": asset.get("uv_coordinates", []),
-                    "material": asset.get("material", "default")
-                })
-        
-        return geometry
+        lights = lights or list(_DEFAULT_LIGHTS)
+        
+        # Only static geometry gets lightmapped
+        geometry = [mesh for mesh in meshes if mesh.static]
+        
+        # Bake lightmaps
+        lightmaps = self._bake_lightmaps(geometry, lights, resolution, samples)
         
+        # Generate light probes
+        light_probes = self._generate_light_probes(geometry, lights)
+        
+        return {
+            "site_id": site_id,
+            "quality": quality,
+            "resolution": resolution,
+            "samples": samples,
+            "lightmaps": lightmaps,
+            "lightmap_file_size": resolution * resolution * 4,  # RGBA bytes per lightmap
+            "light_probes": light_probes,
+            "light_probe_count": light_probes["positions"].shape[0],
+            "light_count": len(lights),
+            "size_mb": sum(len(lightmap["data"]) for lightmap in lightmaps) / (1024 * 1024),
+            "bake_time": "2024-01-01T00:00:00Z"
+        }
+            
     def _bake_lightmaps(
         self, 
-        geometry: List[Dict[str, Any]], 
-        lights: List[Dict[str, Any]],
+        geometry: List[MeshAsset], 
+        lights: List[LightAsset],
         resolution: int,
         samples: int
     ) -> List[Dict[str, Any]]:
-        """Bake lightmaps for geometry."""
+        """Bake lightmaps for geometry; pixel data is raw RGBA8 bytes."""
         lightmaps = []
         
         for geom in geometry:
-            # Simulate lightmap baking
+            # Simulate lightmap baking with a blank RGBA8 image of the final size
             lightmap = {
-                "geometry_id": geom["id"],
+                "geometry_id": geom.id,
                 "resolution": resolution,
                 "format": "rgba8",
-                "data": f"lightmap_data_{geom['id']}",  # Placeholder
-                "file_size": resolution * resolution * 4,  # RGBA bytes
-                "samples_used": samples
+                "data": bytes(resolution * resolution * 4)  # Placeholder pixels
             }
             lightmaps.append(lightmap)
         
@@ -135,49 +240,113 @@ class LightmapBaker:
         
     def _generate_light_probes(
         self, 
-        geometry: List[Dict[str, Any]], 
-        lights: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
-        """Generate light probes for dynamic objects."""
-        light_probes = []
-        
+        geometry: List[MeshAsset], 
+        lights: List[LightAsset]
+    ) -> Dict[str, np.ndarray]:
+        """Generate light probes for dynamic objects as SoA float32 arrays."""
         # Generate probes in a grid pattern
         bounds = self._calculate_scene_bounds(geometry)
-        probe_spacing = 5.0  # 5 meter spacing
         
         x_min, x_max = bounds["x"]
         y_min, y_max = bounds["y"] 
         z_min, z_max = bounds["z"]
         
-        x = x_min
-        while x <= x_max:
-            z = z_min
-            while z <= z_max:
-                # Place probes at different heights
-                for y_offset in [0.5, 2.0, 3.5]:
-                    y = y_min + y_offset
-                    if y <= y_max:
-                        probe = {
-                            "position": [x, y, z],
-                            "spherical_harmonics": self._calculate_sh_coefficients([x, y, z], lights),
-                            "irradiance": [0.5, 0.5, 0.5]  # Placeholder
-                        }
-                        light_probes.append(probe)
-                z += probe_spacing
-            x += probe_spacing
-        
-        return light_probes
-        
-    def _calculate_scene_bounds(self, geometry: List[Dict[str, Any]]) -> Dict[str, tuple]:
+        # Place probes at different heights
+        ys = y_min + _PROBE_HEIGHTS
+        ys = ys[ys <= y_max]
+        
+        xs = self._grid_axis(x_min, x_max, _PROBE_SPACING)
+        zs = self._grid_axis(z_min, z_max, _PROBE_SPACING)
+        
+        # Build the whole grid at once, ordered x -> z -> y
+        X, Z, Y = np.meshgrid(xs, zs, ys, indexing="ij")
+        positions = np.stack([X.ravel(), Y.ravel(), Z.ravel()], axis=1)
+        
+        sh = self._calculate_sh_coefficients(positions, lights)
+        irradiance = np.full((positions.shape[0], 3), 0.5, dtype=np.float32)  # Placeholder
+        
+        return {
+            "positions": positions,
+            "sh": sh,
+            "irradiance": irradiance
+        }
+        
+    def pack_light_probes(self, light_probes: Dict[str, np.ndarray]) -> Tuple[bytes, Dict[str, Any]]:
+        """Pack SoA light probe arrays into one little-endian float32 blob plus its layout."""
+        blob = bytearray()
+        layout = {"count": light_probes["positions"].shape[0], "component_type": "float32", "attributes": {}}
+        
+        for name in ("positions", "sh", "irradiance"):
+            array = np.ascontiguousarray(light_probes[name], dtype="<f4")
+            layout["attributes"][name] = {
+                "byte_offset": len(blob),
+                "byte_length": array.nbytes,
+                "components": array.shape[1]
+            }
+            blob += array.tobytes()
+        
+        return bytes(blob), layout
+        
+    def _grid_axis(self, start: float, stop: float, spacing: float) -> np.ndarray:
+        """Evenly spaced grid coordinates from start up to and including stop."""
+        count = int(np.floor((stop - start) / spacing + 1e-6)) + 1
+        return start + np.arange(max(count, 0), dtype=np.float32) * np.float32(spacing)
+        
+    def _calculate_scene_bounds(self, geometry: List[MeshAsset]) -> Dict[str, tuple]:
         """Calculate bounding box of the scene."""
-        if not geometry:
+        vertex_sets = [mesh.vertices for mesh in geometry if mesh.vertices.shape[0] > 0]
+        if not vertex_sets:
             return {"x": (-10, 10), "y": (0, 5), "z": (-10, 10)}
         
-        # Simplified bounds calculation
-        return {"x": (-20, 20), "y": (0, 10), "z": (-20, 20)}
+        # Reduce each mesh separately to avoid copying every vertex into one buffer
+        mins = np.min([vertices.min(axis=0) for vertices in vertex_sets], axis=0)
+        maxs = np.max([vertices.max(axis=0) for vertices in vertex_sets], axis=0)
+        
+        return {
+            "x": (float(mins[0]), float(maxs[0])),
+            "y": (float(mins[1]), float(maxs[1])),
+            "z": (float(mins[2]), float(maxs[2]))
+        }
         
-    def _calculate_sh_coefficients(self, position: List[float], lights: List[Dict[str, Any]]) -> List[float]:
-        """Calculate spherical harmonics coefficients for a position."""
-        # Simplified SH calculation
-        # Real implementation would sample lighting from all directions
-        return [0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]  # 9 SH coefficients
+    def _calculate_sh_coefficients(self, positions: np.ndarray, lights: List[LightAsset]) -> np.ndarray:
+        """Calculate spherical harmonics coefficients for an (N, 3) array of positions."""
+        sh = np.zeros((positions.shape[0], 9), dtype=np.float32)  # 9 SH coefficients
+        
+        # Stack lights into SoA arrays; ambient light only contributes to the DC band
+        l_pos, l_dir, l_weight, l_directional = [], [], [], []
+        ambient = 0.0
+        for light in lights:
+            weight = float(np.dot(_LUMINANCE, light.color)) * light.intensity
+            if light.type == "ambient":
+                ambient += weight
+                continue
+            
+            direction = np.asarray(light.direction, dtype=np.float32)
+            l_dir.append(direction / max(float(np.linalg.norm(direction)), 1e-8))
+            l_pos.append(light.position)
+            l_weight.append(weight)
+            l_directional.append(light.type == "directional")
+        
+        if l_weight:
+            _bake_sh_kernel(
+                np.ascontiguousarray(positions, dtype=np.float32),
+                np.asarray(l_pos, dtype=np.float32),
+                np.asarray(l_dir, dtype=np.float32),
+                np.asarray(l_weight, dtype=np.float32),
+                np.asarray(l_directional, dtype=np.bool_),
+                sh
+            )
+        
+        # Constant radiance projects onto Y00 as c * Y00 * 4pi
+        sh[:, 0] += ambient * _SH_C0 * 4.0 * np.pi
+        return sh
+
+
+def _bake_lightmaps_sync(
+    site_id: str,
+    meshes: List[MeshAsset],
+    lights: List[LightAsset],
+    params: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Picklable entry point for baking in a worker process."""
+    return LightmapBaker()._bake(site_id, meshes, lights, params)
@@ -6,17 +6,20 @@ Handles asset compression, optimization, and tour bundle generation.
 
 import logging
 from contextlib import asynccontextmanager
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 from .processor import BundleProcessor
 from ..shared.database import get_database
 from ..shared.nats_client import get_nats_client
 from ..shared.storage import get_storage_client
+from ..shared.redis_client import get_redis_client
 from ..shared.config import get_settings
+from ..shared.app_factory import run_worker_app
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -36,9 +39,10 @@ async def lifespan(app: FastAPI):
     db = await get_database()
     nats = await get_nats_client()
     storage = get_storage_client()
+    redis = get_redis_client()
     
     # Initialize processor
-    processor = BundleProcessor(db, nats, storage, settings)
+    processor = BundleProcessor(db, nats, storage, settings, redis)
     await processor.initialize()
     
     logger.info("Bundle worker started successfully")
@@ -47,6 +51,7 @@ async def lifespan(app: FastAPI):
     # Cleanup
     if processor:
         await processor.cleanup()
+    await redis.disconnect()
     logger.info("Bundle worker stopped")
 
 
@@ -55,7 +60,8 @@ app = FastAPI(
     title="AI VR Tour Guide - Bundle Worker",
     description="Asset compression and tour bundle generation",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -243,6 +249,47 @@ async def bake_lightmaps(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/export/all")
+async def export_all_formats(
+    background_tasks: BackgroundTasks,
+    site_id: str,
+    tenant_id: str,
+    include_animations: bool = True,
+    include_materials: bool = True,
+    embed_textures: bool = False,
+    compress: Optional[str] = None  # "gzip", "br"
+):
+    """
+    Export site to every supported 3D format concurrently.
+    
+    Produces glTF, USDZ, FBX and OBJ from a single asset load.
+    """
+    try:
+        # Start export in background
+        background_tasks.add_task(
+            processor.export_all_formats,
+            site_id,
+            tenant_id,
+            {
+                "include_animations": include_animations,
+                "include_materials": include_materials,
+                "embed_textures": embed_textures,
+                "compress": compress
+            }
+        )
+        
+        return {
+            "status": "accepted",
+            "message": "Export to all formats started",
+            "site_id": site_id,
+            "formats": ["GLTF", "USDZ", "FBX", "OBJ"]
+        }
+        
+    except Exception as e:
+        logger.error(f"Error exporting to all formats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/export/{format}")
 async def export_format(
     background_tasks: BackgroundTasks,
@@ -251,7 +298,8 @@ async def export_format(
     tenant_id: str,
     include_animations: bool = True,
     include_materials: bool = True,
-    embed_textures: bool = False
+    embed_textures: bool = False,
+    compress: Optional[str] = None  # "gzip", "br"
 ):
     """
     Export site to different 3D formats.
@@ -259,7 +307,7 @@ async def export_format(
     Supports glTF, USDZ, FBX, OBJ for cross-platform compatibility.
     """
     try:
-        if format.lower() not in ["gltf", "usdz", "fbx", "obj"]:
+        if format.lower() not in processor.format_exporter.supported_formats:
             raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
         
         # Start export in background
@@ -271,7 +319,8 @@ async def export_format(
             {
                 "include_animations": include_animations,
                 "include_materials": include_materials,
-                "embed_textures": embed_textures
+                "embed_textures": embed_textures,
+                "compress": compress
             }
         )
         
@@ -357,5 +406,4 @@ async def delete_bundle(bundle_id: str, tenant_id: str):
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8005)
+    run_worker_app("workers.bundle.main:app", port=8005)
@@ -2,24 +2,73 @@
 Navigation mesh generation for VR locomotion.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import mapbox_earcut
+    HAS_EARCUT = True
+except ImportError:
+    HAS_EARCUT = False
+
+from .bvh import build_bvh, pack_bvh
+from .utils_numba import single_threaded_kernels, tri_areas
+from ..shared.config import pool_workers
 
 logger = logging.getLogger(__name__)
 
+# Only triangles larger than this (m^2) get a teleport point
+_TELEPORT_MIN_AREA = 1.0
+
+# Floors are faces whose normal is within max_slope of this up axis
+_UP = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+
+# Vertices closer than this (m) on every axis are merged into one
+_WELD_TOLERANCE = 1e-4
+
+# Packed positions are quantized to normalized uint16 over the navmesh bounding box
+_QUANTIZE_MAX = 65535
+
+
+@dataclass(slots=True, frozen=True)
+class NavmeshTriangles:
+    """Navmesh triangles as SoA arrays; a triangle's id is its row index."""
+    vertices: np.ndarray  # (V, 3) float32 shared vertex buffer
+    indices: np.ndarray  # (N, 3) int64 rows into vertices
+    normals: np.ndarray  # (N, 3) float32
+    areas: np.ndarray  # (N,) float32
+    
+    def __len__(self) -> int:
+        return self.indices.shape[0]
+
 
 class NavmeshBaker:
     """Generates navigation meshes for VR movement."""
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
         self.default_agent_radius = 0.3
         self.default_agent_height = 1.8
         self.default_max_slope = 45.0
+        self.max_workers = max_workers or pool_workers()
+        self._pool: Optional[ProcessPoolExecutor] = None
         
     async def initialize(self):
         """Initialize the navmesh baker."""
+        # Navmesh generation is pure CPU work; keep it off the event loop
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=single_threaded_kernels)
         logger.info("Navmesh baker initialized")
         
+    async def cleanup(self):
+        """Shut down the navmesh process pool."""
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        
     async def generate_navmesh(
         self, 
         site_id: str, 
@@ -31,54 +80,89 @@ class NavmeshBaker:
             logger.info(f"Generating navmesh for site {site_id}")
             
             params = parameters or {}
-            agent_radius = params.get("agent_radius", self.default_agent_radius)
-            agent_height = params.get("agent_height", self.default_agent_height)
-            max_slope = params.get("max_slope", self.default_max_slope)
-            
-            # Extract walkable geometry from assets
-            walkable_surfaces = self._extract_walkable_surfaces(assets)
+            if self._pool is None:
+                navmesh_data = _generate_navmesh_sync(site_id, assets, params)
+            else:
+                navmesh_data = await asyncio.get_running_loop().run_in_executor(
+                    self._pool, _generate_navmesh_sync, site_id, assets, params
+                )
             
-            # Generate navmesh triangles (simplified)
-            navmesh_triangles = self._generate_navmesh_triangles(
-                walkable_surfaces, agent_radius, max_slope
-            )
-            
-            # Generate teleport points
-            teleport_points = self._generate_teleport_points(navmesh_triangles)
-            
-            navmesh_data = {
-                "site_id": site_id,
-                "agent_radius": agent_radius,
-                "agent_height": agent_height,
-                "max_slope": max_slope,
-                "triangles": navmesh_triangles,
-                "teleport_points": teleport_points,
-                "triangle_count": len(navmesh_triangles),
-                "size_mb": len(navmesh_triangles) * 0.001,  # Rough estimate
-                "generation_time": "2024-01-01T00:00:00Z"
-            }
-            
-            logger.info(f"Generated navmesh with {len(navmesh_triangles)} triangles")
+            logger.info(f"Generated navmesh with {navmesh_data['triangle_count']} triangles")
             return navmesh_data
             
         except Exception as e:
             logger.error(f"Error generating navmesh: {str(e)}")
             return {"error": str(e)}
             
-    def _extract_walkable_surfaces(self, assets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _generate(self, site_id: str, assets: List[Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the full navmesh pipeline synchronously."""
+        agent_radius = params.get("agent_radius", self.default_agent_radius)
+        agent_height = params.get("agent_height", self.default_agent_height)
+        max_slope = params.get("max_slope", self.default_max_slope)
+        
+        # Extract walkable geometry from assets
+        walkable_surfaces = self._extract_walkable_surfaces(assets, max_slope)
+        
+        # Generate navmesh triangles (simplified)
+        triangles = self._generate_navmesh_triangles(
+            walkable_surfaces, agent_radius, max_slope
+        )
+        
+        # Generate teleport points
+        teleport_points = self._generate_teleport_points(triangles)
+        
+        # Spatial index for closest-point queries at runtime
+        bvh_blob, bvh_layout = pack_bvh(build_bvh(triangles.vertices, triangles.indices))
+        
+        # Geometry and teleport points travel as one binary blob instead of per-triangle JSON
+        geometry_blob, geometry_layout = self.pack_navmesh(triangles, teleport_points)
+        
+        navmesh_data = {
+            "site_id": site_id,
+            "agent_radius": agent_radius,
+            "agent_height": agent_height,
+            "max_slope": max_slope,
+            "geometry": {**geometry_layout, "data": geometry_blob},
+            "bvh": {**bvh_layout, "data": bvh_blob},
+            "triangle_count": len(triangles),
+            "teleport_point_count": len(teleport_points["triangle_ids"]),
+            "size_mb": (len(geometry_blob) + len(bvh_blob)) / (1024 * 1024),
+            "generation_time": "2024-01-01T00:00:00Z"
+        }
+        
+        return navmesh_data
+        
+    def _extract_walkable_surfaces(self, assets: List[Dict[str, Any]], max_slope: float) -> List[Dict[str, Any]]:
         """Extract walkable surfaces from scene assets."""
         walkable_surfaces = []
+        slope_cos = float(np.cos(np.radians(max_slope)))
         
         for asset in assets:
             if asset.get("type") == "mesh" and asset.get("walkable", True):
                 # Extract floor/ground surfaces
-                surfaces = self._identify_floor_surfaces(asset)
+                surfaces = self._identify_floor_surfaces(asset, slope_cos)
                 walkable_surfaces.extend(surfaces)
         
         return walkable_surfaces
         
-    def _identify_floor_surfaces(self, asset: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _identify_floor_surfaces(self, asset: Dict[str, Any], slope_cos: float) -> List[Dict[str, Any]]:
         """Identify floor surfaces in a mesh asset."""
+        if asset.get("vertices") and asset.get("faces"):
+            # Real geometry: keep the already-triangulated faces that face up
+            vertices = np.asarray(asset["vertices"], dtype=np.float32).reshape(-1, 3)
+            faces = np.asarray(asset["faces"], dtype=np.int64).reshape(-1, 3)
+            indices, normals = _classify_walkable(vertices, faces, _UP, slope_cos)
+            if not len(indices):
+                return []
+            return [
+                {
+                    "vertices": vertices,
+                    "indices": indices,
+                    "normals": normals,
+                    "material": asset.get("material", "walkable")
+                }
+            ]
+        
         # Simplified floor detection
         return [
             {
@@ -93,64 +177,151 @@ class NavmeshBaker:
         walkable_surfaces: List[Dict[str, Any]], 
         agent_radius: float,
         max_slope: float
-    ) -> List[Dict[str, Any]]:
-        """Generate navmesh triangles from walkable surfaces."""
-        triangles = []
-        
-        # Simplified navmesh generation
-        for i, surface in enumerate(walkable_surfaces):
-            vertices = surface.get("vertices", [])
-            if len(vertices) >= 3:
-                # Create triangles from surface vertices
-                for j in range(len(vertices) - 2):
-                    triangle = {
-                        "id": f"tri_{i}_{j}",
-                        "vertices": [vertices[0], vertices[j+1], vertices[j+2]],
-                        "center": self._calculate_triangle_center([vertices[0], vertices[j+1], vertices[j+2]]),
-                        "normal": surface.get("normal", [0, 1, 0]),
-                        "area": self._calculate_triangle_area([vertices[0], vertices[j+1], vertices[j+2]])
-                    }
-                    triangles.append(triangle)
-        
-        return triangles
-        
-    def _generate_teleport_points(self, navmesh_triangles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    ) -> NavmeshTriangles:
+        """Generate navmesh triangles from walkable surfaces as SoA arrays."""
+        # Triangulate every surface into one shared vertex buffer and (N, 3) index array
+        vertex_blocks, index_blocks, normal_blocks = [], [], []
+        vertex_offset = 0
+        for surface in walkable_surfaces:
+            vertices = np.asarray(surface.get("vertices", []), dtype=np.float32).reshape(-1, 3)
+            if len(vertices) < 3:
+                continue
+            
+            if "indices" in surface:
+                # Mesh faces already classified as walkable carry their own triangles and normals
+                indices = surface["indices"] + vertex_offset
+                normals = surface["normals"]
+            else:
+                normal = np.asarray(surface.get("normal", [0, 1, 0]), dtype=np.float32)
+                indices = self._triangulate(vertices, normal) + vertex_offset
+                normals = np.broadcast_to(normal, (len(indices), 3))
+            vertex_blocks.append(vertices)
+            index_blocks.append(indices)
+            normal_blocks.append(normals)
+            vertex_offset += len(vertices)
+        
+        if not index_blocks:
+            vertices = np.zeros((0, 3), dtype=np.float32)
+            indices = np.zeros((0, 3), dtype=np.int64)
+            normals = np.zeros((0, 3), dtype=np.float32)
+        else:
+            vertices, indices = self._weld_vertices(
+                np.concatenate(vertex_blocks), np.concatenate(index_blocks)
+            )
+            normals = np.concatenate(normal_blocks)
+        
+        return NavmeshTriangles(
+            vertices=vertices,
+            indices=indices,
+            normals=normals,
+            areas=tri_areas(vertices, indices)
+        )
+        
+    def _generate_teleport_points(self, triangles: NavmeshTriangles) -> Dict[str, np.ndarray]:
         """Generate teleport points on the navmesh."""
-        teleport_points = []
+        # Only create teleport points for larger triangles; centers are gathered for those alone
+        triangle_ids = np.flatnonzero(triangles.areas > _TELEPORT_MIN_AREA)
         
-        for triangle in navmesh_triangles:
-            center = triangle.get("center", [0, 0, 0])
-            area = triangle.get("area", 0)
-            
-            # Only create teleport points for larger triangles
-            if area > 1.0:
-                teleport_points.append({
-                    "position": center,
-                    "triangle_id": triangle["id"],
-                    "valid": True
-                })
-        
-        return teleport_points
-        
-    def _calculate_triangle_center(self, vertices: List[List[float]]) -> List[float]:
-        """Calculate the center point of a triangle."""
-        if len(vertices) != 3:
-            return [0, 0, 0]
-        
-        center = [0, 0, 0]
-        for vertex in vertices:
-            for i in range(3):
-                center[i] += vertex[i]
-        
-        for i in range(3):
-            center[i] /= 3
-        
-        return center
-        
-    def _calculate_triangle_area(self, vertices: List[List[float]]) -> float:
-        """Calculate the area of a triangle."""
-        if len(vertices) != 3:
-            return 0.0
-        
-        # Simplified area calculation
-        return 1.0  # Placeholder
+        return {
+            "positions": triangles.vertices[triangles.indices[triangle_ids]].mean(axis=1),
+            "triangle_ids": triangle_ids
+        }
+        
+    def pack_navmesh(
+        self,
+        triangles: NavmeshTriangles,
+        teleport_points: Dict[str, np.ndarray]
+    ) -> Tuple[bytes, Dict[str, Any]]:
+        """Pack navmesh SoA arrays into one little-endian blob plus its layout.
+        
+        Vertex and teleport positions are stored as uint16 q; decode with
+        position = bbox_min + q / 65535 * (bbox_max - bbox_min).
+        """
+        if len(triangles.vertices):
+            bbox_min = triangles.vertices.min(axis=0)
+            bbox_max = triangles.vertices.max(axis=0)
+        else:
+            bbox_min = bbox_max = np.zeros(3, dtype=np.float32)
+        
+        blob = bytearray()
+        layout = {
+            "vertex_count": triangles.vertices.shape[0],
+            "triangle_count": len(triangles),
+            "teleport_point_count": len(teleport_points["triangle_ids"]),
+            "bbox_min": bbox_min.tolist(),
+            "bbox_max": bbox_max.tolist(),
+            "attributes": {}
+        }
+        
+        for name, array, dtype, component_type in (
+            ("vertices", self._quantize(triangles.vertices, bbox_min, bbox_max), "<u2", "uint16"),
+            ("indices", triangles.indices, "<u4", "uint32"),
+            ("normals", triangles.normals, "<f4", "float32"),
+            ("areas", triangles.areas, "<f4", "float32"),
+            ("teleport_positions", self._quantize(teleport_points["positions"], bbox_min, bbox_max), "<u2", "uint16"),
+            ("teleport_triangle_ids", teleport_points["triangle_ids"], "<u4", "uint32")
+        ):
+            array = np.ascontiguousarray(array, dtype=dtype)
+            layout["attributes"][name] = {
+                "byte_offset": len(blob),
+                "byte_length": array.nbytes,
+                "component_type": component_type,
+                "components": array.shape[1] if array.ndim > 1 else 1
+            }
+            blob += array.tobytes()
+        
+        return bytes(blob), layout
+        
+    def _quantize(self, points: np.ndarray, bbox_min: np.ndarray, bbox_max: np.ndarray) -> np.ndarray:
+        """Quantize (N, 3) positions to normalized uint16 over a bounding box."""
+        extent = bbox_max - bbox_min
+        # Flat axes (zero extent) quantize to 0 and decode back to bbox_min
+        scale = np.divide(_QUANTIZE_MAX, extent, out=np.zeros_like(extent), where=extent > 0)
+        q = np.rint((points - bbox_min) * scale)
+        return np.clip(q, 0, _QUANTIZE_MAX).astype(np.uint16)
+        
+    def _weld_vertices(self, vertices: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Merge coincident vertices and drop unreferenced ones; returns the compact buffer and remapped indices."""
+        # Key every referenced corner by its position snapped to the weld grid
+        keys = np.rint(vertices[indices.ravel()] / _WELD_TOLERANCE).astype(np.int64)
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        return vertices[indices.ravel()[first]], inverse.reshape(-1, 3).astype(np.int64)
+        
+    def _triangulate(self, vertices: np.ndarray, normal: np.ndarray) -> np.ndarray:
+        """Triangulate a planar polygon into (M, 3) indices; handles concave outlines."""
+        if not HAS_EARCUT:
+            return self._fan_triangulate(len(vertices))
+        
+        # Project onto the polygon plane by dropping the dominant normal axis (Y for floors)
+        drop = int(np.argmax(np.abs(normal)))
+        verts_2d = np.ascontiguousarray(np.delete(vertices, drop, axis=1), dtype=np.float32)
+        rings = np.array([len(verts_2d)], dtype=np.uint32)
+        
+        tris = mapbox_earcut.triangulate_float32(verts_2d, rings)
+        return tris.astype(np.int64).reshape(-1, 3)
+        
+    def _fan_triangulate(self, vertex_count: int) -> np.ndarray:
+        """Fan-triangulate a polygon around its first vertex into (N-2, 3) indices."""
+        j = np.arange(1, vertex_count - 1)
+        return np.stack([np.zeros_like(j), j, j + 1], axis=1)
+
+
+def _classify_walkable(
+    vertices: np.ndarray,
+    indices: np.ndarray,
+    up: np.ndarray,
+    slope_cos: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Select faces sloped no more than acos(slope_cos) from up; returns their indices and unit normals."""
+    v0 = vertices[indices[:, 0]]
+    n = np.cross(vertices[indices[:, 1]] - v0, vertices[indices[:, 2]] - v0)
+    length = np.linalg.norm(n, axis=1, keepdims=True)
+    # Degenerate faces keep a zero normal and are never walkable
+    n = np.divide(n, length, out=np.zeros_like(n), where=length > 0)
+    mask = n @ up >= slope_cos
+    return indices[mask], n[mask].astype(np.float32)
+
+
+def _generate_navmesh_sync(site_id: str, assets: List[Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Picklable entry point for navmesh generation in a worker process."""
+    return NavmeshBaker()._generate(site_id, assets, params)
@@ -5,49 +5,140 @@ Core bundle processor that orchestrates asset compression and bundle generation.
 import asyncio
 import logging
 import json
+import os
+import tempfile
+import time
 import zipfile
-from datetime import datetime
-from typing import Dict, Any, List, Optional
-from uuid import uuid4
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID, uuid4
 from pathlib import Path
 
+import numpy as np
+
+from .assets import parse_assets
 from .asset_compressor import AssetCompressor
 from .navmesh_baker import NavmeshBaker
 from .lightmap_baker import LightmapBaker
 from .format_exporter import FormatExporter
 from ..shared.database import Database
 from ..shared.nats_client import NATSClient
-from ..shared.storage import StorageClient
-from ..shared.config import Settings
+from ..shared.storage import StorageClient, MULTIPART_PART_SIZE
+from ..shared.redis_client import RedisClient
+from ..shared.config import Settings, pool_workers
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 logger = logging.getLogger(__name__)
 
+# Bundle archives are spooled in memory up to this size, then spill to disk
+_BUNDLE_SPOOL_SIZE = 64 * 1024 * 1024
+
+# Oldest bundle statuses are evicted from the local cache beyond this many entries
+_MAX_BUNDLE_STATUS = 10_000
+
+# Bundle statuses shared through Redis expire after a day
+_BUNDLE_STATUS_TTL_SECONDS = 24 * 60 * 60
+
+# Inbound NATS messages beyond this many queued per topic are dropped
+_MESSAGE_QUEUE_SIZE = 1024
+
+# Server processes and replicas share one queue group, so each bundle job runs once
+_NATS_QUEUE_GROUP = "bundle-workers"
+
+# Navmesh, lightmap and export pools can all be busy at once, so they split the process's cores
+_CPU_POOLS = 3
+
+# Site asset listings are reused across stages and requests for this long
+_SITE_ASSETS_TTL_SECONDS = 30.0
+
+# Optimization presets; treat as read-only and copy before adjusting
+_BASE_SETTINGS = {
+    "quality": {
+        "texture_compression": "low",
+        "mesh_decimation": 0.95,
+        "max_texture_size": 4096,
+        "audio_bitrate": 320
+    },
+    "balanced": {
+        "texture_compression": "medium",
+        "mesh_decimation": 0.8,
+        "max_texture_size": 2048,
+        "audio_bitrate": 192
+    },
+    "performance": {
+        "texture_compression": "high",
+        "mesh_decimation": 0.6,
+        "max_texture_size": 1024,
+        "audio_bitrate": 128
+    }
+}
+
+
+def _dumps_manifest(manifest: Dict[str, Any]) -> bytes:
+    """Serialize a bundle manifest to compact UTF-8 JSON, using orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(manifest, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(manifest, separators=(",", ":"), default=str).encode('utf-8')
+
+
+def _uuid_batch(n: int) -> List[str]:
+    """Generate n random (version 4) UUID strings from a single urandom call."""
+    buf = os.urandom(16 * n)
+    return [str(UUID(bytes=buf[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
+
+
+def _write_bundle_archive(archive, manifest_bytes: bytes, binary_files: Dict[str, Any]):
+    """Write the manifest and binary files as uncompressed zip entries."""
+    # Payloads are already compressed or raw GPU data; storing avoids a deflate pass
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as bundle_zip:
+        bundle_zip.writestr("bundle.json", manifest_bytes)
+        for file_name, content in binary_files.items():
+            bundle_zip.writestr(file_name, content)
+    archive.seek(0)
+
 
 class BundleProcessor:
     """Main processor for bundle generation and asset optimization."""
     
-    def __init__(self, db: Database, nats: NATSClient, storage: StorageClient, settings: Settings):
+    def __init__(self, db: Database, nats: NATSClient, storage: StorageClient, settings: Settings,
+                 redis: Optional[RedisClient] = None):
         self.db = db
         self.nats = nats
         self.storage = storage
         self.settings = settings
+        self.redis = redis
         
         # Initialize specialized processors
         self.asset_compressor = AssetCompressor()
-        self.navmesh_baker = NavmeshBaker()
-        self.lightmap_baker = LightmapBaker()
-        self.format_exporter = FormatExporter()
+        pool_size = pool_workers(_CPU_POOLS)
+        self.navmesh_baker = NavmeshBaker(max_workers=pool_size)
+        self.lightmap_baker = LightmapBaker(max_workers=pool_size)
+        self.format_exporter = FormatExporter(max_workers=pool_size)
         
-        # Processing status cache
-        self.bundle_status: Dict[str, Dict[str, Any]] = {}
+        # Processing status of bundles built by this replica, bounded LRU; mirrored to Redis
+        self.bundle_status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        
+        # Short-lived cache of site asset listings: (site_id, tenant_id) -> (expires_at, assets)
+        self._site_assets_cache: Dict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]] = {}
+        
+        # NATS messages are queued per topic and drained by a fixed set of consumer tasks
+        self._message_queues: Dict[str, asyncio.Queue] = {}
+        self._consumers: List[asyncio.Task] = []
+        self.dropped_messages: Dict[str, int] = {}
         
     async def initialize(self):
         """Initialize the processor."""
         logger.info("Initializing bundle processor")
         
         # Subscribe to NATS topics
-        await self.nats.subscribe("bundle.create", self._handle_bundle_message)
-        await self.nats.subscribe("asset.optimize", self._handle_asset_message)
+        await self._subscribe_queued("bundle.create", self._handle_bundle_message)
+        await self._subscribe_queued("asset.optimize", self._handle_asset_message)
         
         # Initialize sub-processors
         await self.asset_compressor.initialize()
@@ -59,50 +150,74 @@ class BundleProcessor:
         """Cleanup resources."""
         logger.info("Cleaning up bundle processor")
         
+        # Stop message consumers
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers.clear()
+        
+        # Shut down CPU worker pools
+        await self.format_exporter.cleanup()
+        await self.navmesh_baker.cleanup()
+        await self.lightmap_baker.cleanup()
+        
     async def create_bundle(self, request) -> Dict[str, Any]:
         """Create a tour bundle with optimized assets."""
         bundle_id = str(uuid4())
-        start_time = datetime.utcnow()
+        # Wall-clock start for display; durations come from the monotonic clock
+        start_time = datetime.now(timezone.utc)
+        start_ns = time.monotonic_ns()
         
         try:
             logger.info(f"Creating {request.bundle_type} bundle {bundle_id} for site {request.site_id}")
             
             # Update status
-            self.bundle_status[bundle_id] = {
+            await self._set_bundle_status(bundle_id, {
                 "status": "processing",
                 "stage": "initialization",
                 "start_time": start_time,
                 "site_id": request.site_id,
                 "bundle_type": request.bundle_type
-            }
+            })
             
             # Get site assets
             assets = await self._get_site_assets(request.site_id, request.tenant_id)
+            meshes, lights = parse_assets(assets)
             
-            # Optimize assets for target platforms
-            self.bundle_status[bundle_id]["stage"] = "asset_optimization"
-            optimized_assets = await self._optimize_assets_for_bundle(
-                assets, request.target_platforms, request.compression_level
-            )
-            
-            # Generate navmesh if requested
-            navmesh_data = None
+            # Optimization, navmesh generation and lightmap baking only read the
+            # assets, so run them concurrently on their own worker pools
+            stages = {
+                "asset_optimization": self._optimize_assets_for_bundle(
+                    assets, request.target_platforms, request.compression_level
+                )
+            }
             if request.include_navmesh:
-                self.bundle_status[bundle_id]["stage"] = "navmesh_generation"
-                navmesh_data = await self.navmesh_baker.generate_navmesh(
+                stages["navmesh_generation"] = self.navmesh_baker.generate_navmesh(
                     request.site_id, assets
                 )
-            
-            # Bake lightmaps if requested
-            lightmap_data = None
             if request.include_lightmaps:
-                self.bundle_status[bundle_id]["stage"] = "lightmap_baking"
-                lightmap_data = await self.lightmap_baker.bake_lightmaps(
-                    request.site_id, assets
+                stages["lightmap_baking"] = self.lightmap_baker.bake_lightmaps(
+                    request.site_id, meshes, lights
                 )
             
+            # Start every stage as a task up front and let all of them finish before
+            # surfacing the first failure, so no stage is left running unobserved
+            tasks = {stage: asyncio.create_task(coro) for stage, coro in stages.items()}
+            outcomes = await asyncio.gather(*(
+                self._run_stage(bundle_id, stage, task) for stage, task in tasks.items()
+            ), return_exceptions=True)
+            # A failed status update can abandon its stage task, so wait for those too
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            results = dict(zip(tasks, outcomes))
+            optimized_assets = results["asset_optimization"]
+            navmesh_data = results.get("navmesh_generation")
+            lightmap_data = results.get("lightmap_baking")
+            
             # Create bundle package
-            self.bundle_status[bundle_id]["stage"] = "packaging"
+            await self._update_bundle_status(bundle_id, stage="packaging")
             bundle_data = await self._create_bundle_package(
                 bundle_id,
                 request,
@@ -112,24 +227,24 @@ class BundleProcessor:
             )
             
             # Upload bundle to storage
-            self.bundle_status[bundle_id]["stage"] = "uploading"
+            await self._update_bundle_status(bundle_id, stage="uploading")
             bundle_url = await self._upload_bundle(bundle_id, bundle_data, request.tenant_id)
             
             # Save bundle metadata
             await self._save_bundle_metadata(bundle_id, request, bundle_data, bundle_url)
             
             # Update final status
-            processing_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-            self.bundle_status[bundle_id] = {
+            processing_time = (time.monotonic_ns() - start_ns) // 1_000_000
+            await self._set_bundle_status(bundle_id, {
                 "status": "completed",
                 "stage": "done",
                 "start_time": start_time,
-                "end_time": datetime.utcnow(),
+                "end_time": start_time + timedelta(milliseconds=processing_time),
                 "processing_time_ms": processing_time,
                 "bundle_size_mb": bundle_data["size_mb"],
                 "asset_count": len(optimized_assets),
                 "download_url": bundle_url
-            }
+            })
             
             # Publish completion event
             await self.nats.publish("bundle.completed", {
@@ -154,13 +269,13 @@ class BundleProcessor:
             logger.error(f"Error creating bundle {bundle_id}: {str(e)}")
             
             # Update error status
-            self.bundle_status[bundle_id] = {
+            await self._set_bundle_status(bundle_id, {
                 "status": "error",
                 "stage": "failed",
                 "start_time": start_time,
-                "end_time": datetime.utcnow(),
+                "end_time": start_time + timedelta(milliseconds=(time.monotonic_ns() - start_ns) // 1_000_000),
                 "error": str(e)
-            }
+            })
             
             raise e
             
@@ -182,13 +297,17 @@ class BundleProcessor:
                 request.target_platforms
             )
             
+            optimized_assets = await self.asset_compressor.optimize_assets_batch(
+                assets, optimization_settings
+            )
+            
             optimized_count = 0
-            for asset in assets:
+            for asset, optimized_asset in zip(assets, optimized_assets):
+                if optimized_asset is None:
+                    logger.warning(f"Failed to optimize asset {asset['id']}")
+                    continue
+                
                 try:
-                    optimized_asset = await self.asset_compressor.optimize_asset(
-                        asset, optimization_settings
-                    )
-                    
                     # Update asset in storage
                     await self._update_asset(asset["id"], optimized_asset)
                     optimized_count += 1
@@ -210,13 +329,57 @@ class BundleProcessor:
             logger.error(f"Error optimizing assets: {str(e)}")
             raise e
             
-    async def generate_navmesh(self, site_id: str, tenant_id: str, parameters: Dict[str, Any]):
-        """Generate navigation mesh for a site."""
+    async def _set_bundle_status(self, bundle_id: str, status: Dict[str, Any]):
+        """Store a bundle's status, evicting the least recently updated beyond the cap."""
+        self.bundle_status[bundle_id] = status
+        self.bundle_status.move_to_end(bundle_id)
+        while len(self.bundle_status) > _MAX_BUNDLE_STATUS:
+            self.bundle_status.popitem(last=False)
+        await self._store_bundle_status(bundle_id, status, replace=True)
+        
+    async def _update_bundle_status(self, bundle_id: str, **fields):
+        """Update some fields of a bundle's status."""
+        if bundle_id in self.bundle_status:
+            self.bundle_status[bundle_id].update(fields)
+        await self._store_bundle_status(bundle_id, fields)
+        
+    async def _store_bundle_status(self, bundle_id: str, fields: Dict[str, Any], replace: bool = False):
+        """Mirror status fields to Redis so any replica can answer status queries."""
+        if not self.redis:
+            return
+        
+        # Status is best effort; a Redis outage must not fail the bundle
+        try:
+            await self.redis.set_hash(
+                f"bundle:{bundle_id}", fields, ttl=_BUNDLE_STATUS_TTL_SECONDS, replace=replace
+            )
+        except Exception as e:
+            logger.warning(f"Could not store status of bundle {bundle_id}: {str(e)}")
+        
+    async def _run_stage(self, bundle_id: str, stage: str, task: asyncio.Task):
+        """Await one bundle stage task while tracking it in the bundle's active stages."""
+        active = self.bundle_status[bundle_id].setdefault("active_stages", [])
+        active.append(stage)
+        await self._update_bundle_status(bundle_id, stage=",".join(active), active_stages=active)
+        try:
+            return await task
+        finally:
+            active.remove(stage)
+            await self._update_bundle_status(bundle_id, stage=",".join(active), active_stages=active)
+        
+    async def generate_navmesh(
+        self,
+        site_id: str,
+        tenant_id: str,
+        parameters: Dict[str, Any],
+        assets: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Generate navigation mesh for a site, reusing already fetched assets if given."""
         try:
             logger.info(f"Generating navmesh for site {site_id}")
             
             # Get site geometry
-            site_assets = await self._get_site_assets(site_id, tenant_id)
+            site_assets = assets if assets is not None else await self._get_site_assets(site_id, tenant_id)
             
             # Generate navmesh
             navmesh_data = await self.navmesh_baker.generate_navmesh(
@@ -239,17 +402,24 @@ class BundleProcessor:
             logger.error(f"Error generating navmesh: {str(e)}")
             raise e
             
-    async def bake_lightmaps(self, site_id: str, tenant_id: str, parameters: Dict[str, Any]):
-        """Bake lightmaps for a site."""
+    async def bake_lightmaps(
+        self,
+        site_id: str,
+        tenant_id: str,
+        parameters: Dict[str, Any],
+        assets: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Bake lightmaps for a site, reusing already fetched assets if given."""
         try:
             logger.info(f"Baking lightmaps for site {site_id}")
             
             # Get site assets
-            site_assets = await self._get_site_assets(site_id, tenant_id)
+            site_assets = assets if assets is not None else await self._get_site_assets(site_id, tenant_id)
+            meshes, lights = parse_assets(site_assets)
             
             # Bake lightmaps
             lightmap_data = await self.lightmap_baker.bake_lightmaps(
-                site_id, site_assets, parameters
+                site_id, meshes, lights, parameters
             )
             
             # Save lightmap data
@@ -275,20 +445,22 @@ class BundleProcessor:
             
             # Get site assets
             site_assets = await self._get_site_assets(site_id, tenant_id)
+            meshes, _ = parse_assets(site_assets)
             
             # Export to format
             exported_data = await self.format_exporter.export_format(
-                site_id, site_assets, format, options
+                site_id, meshes, format, options
             )
             
             # Save exported file
             export_id = str(uuid4())
-            file_key = f"exports/{tenant_id}/{site_id}/{export_id}.{format}"
+            file_key = f"exports/{tenant_id}/{site_id}/{export_id}.{exported_data['file_extension']}"
             
             await self.storage.upload_file(
                 file_key, 
                 exported_data["file_data"], 
-                exported_data["content_type"]
+                exported_data["content_type"],
+                content_encoding=exported_data.get("content_encoding")
             )
             
             # Publish export complete event
@@ -297,7 +469,7 @@ class BundleProcessor:
                 "tenant_id": tenant_id,
                 "format": format,
                 "export_id": export_id,
-                "file_size": len(exported_data["file_data"])
+                "file_size": exported_data["size_bytes"]
             })
             
             logger.info(f"Site {site_id} exported to {format.upper()}")
@@ -306,6 +478,46 @@ class BundleProcessor:
             logger.error(f"Error exporting to {format}: {str(e)}")
             raise e
             
+    async def export_all_formats(self, site_id: str, tenant_id: str, options: Dict[str, Any]):
+        """Export site to all supported 3D formats in one pass."""
+        try:
+            logger.info(f"Exporting site {site_id} to all formats")
+            
+            # Get site assets once for every format
+            site_assets = await self._get_site_assets(site_id, tenant_id)
+            meshes, _ = parse_assets(site_assets)
+            
+            exports = await self.format_exporter.export_all(site_id, meshes, options)
+            
+            # Upload every format concurrently over the storage client's connection pool
+            export_ids = {format: str(uuid4()) for format in exports}
+            await asyncio.gather(*(
+                self.storage.upload_file(
+                    f"exports/{tenant_id}/{site_id}/{export_ids[format]}.{exported_data['file_extension']}",
+                    exported_data["file_data"],
+                    exported_data["content_type"],
+                    content_encoding=exported_data.get("content_encoding")
+                )
+                for format, exported_data in exports.items()
+            ))
+            
+            await self.nats.publish_many("format.exported", [
+                {
+                    "site_id": site_id,
+                    "tenant_id": tenant_id,
+                    "format": format,
+                    "export_id": export_ids[format],
+                    "file_size": exported_data["size_bytes"]
+                }
+                for format, exported_data in exports.items()
+            ])
+            
+            logger.info(f"Site {site_id} exported to {len(exports)} formats")
+            
+        except Exception as e:
+            logger.error(f"Error exporting to all formats: {str(e)}")
+            raise e
+            
     async def prepare_streaming(self, site_id: str, tenant_id: str, parameters: Dict[str, Any]):
         """Prepare assets for streaming delivery."""
         try:
@@ -338,7 +550,25 @@ class BundleProcessor:
     # Helper methods
     
     async def _get_site_assets(self, site_id: str, tenant_id: str) -> List[Dict[str, Any]]:
-        """Get all assets for a site."""
+        """Get all assets for a site, served from a short TTL cache when fresh."""
+        key = (site_id, tenant_id)
+        now = time.monotonic()
+        
+        cached = self._site_assets_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        
+        assets = await self._load_site_assets(site_id, tenant_id)
+        
+        # Drop expired entries so the cache only holds recently used sites
+        self._site_assets_cache = {
+            cache_key: entry for cache_key, entry in self._site_assets_cache.items() if entry[0] > now
+        }
+        self._site_assets_cache[key] = (now + _SITE_ASSETS_TTL_SECONDS, assets)
+        return assets
+        
+    async def _load_site_assets(self, site_id: str, tenant_id: str) -> List[Dict[str, Any]]:
+        """Load all assets for a site."""
         # This would query the database for site assets
         # For now, return mock data
         return [
@@ -375,52 +605,29 @@ class BundleProcessor:
         compression_level: str
     ) -> List[Dict[str, Any]]:
         """Optimize assets for bundle creation."""
-        optimized_assets = []
-        
         optimization_settings = self._get_optimization_settings(
             compression_level, target_platforms
         )
         
-        for asset in assets:
-            try:
-                optimized_asset = await self.asset_compressor.optimize_asset(
-                    asset, optimization_settings
-                )
-                optimized_assets.append(optimized_asset)
-            except Exception as e:
-                logger.warning(f"Failed to optimize asset {asset['id']}: {str(e)}")
-                # Include original asset if optimization fails
-                optimized_assets.append(asset)
+        optimized_assets = await self.asset_compressor.optimize_assets_batch(
+            assets, optimization_settings
+        )
+        
+        # Include original asset if optimization fails
+        for i, optimized_asset in enumerate(optimized_assets):
+            if optimized_asset is None:
+                logger.warning(f"Failed to optimize asset {assets[i]['id']}")
+                optimized_assets[i] = assets[i]
         
         return optimized_assets
         
     def _get_optimization_settings(self, preset: str, target_platforms: List[str]) -> Dict[str, Any]:
         """Get optimization settings for a preset and platforms."""
-        base_settings = {
-            "quality": {
-                "texture_compression": "low",
-                "mesh_decimation": 0.95,
-                "max_texture_size": 4096,
-                "audio_bitrate": 320
-            },
-            "balanced": {
-                "texture_compression": "medium",
-                "mesh_decimation": 0.8,
-                "max_texture_size": 2048,
-                "audio_bitrate": 192
-            },
-            "performance": {
-                "texture_compression": "high",
-                "mesh_decimation": 0.6,
-                "max_texture_size": 1024,
-                "audio_bitrate": 128
-            }
-        }
-        
-        settings = base_settings.get(preset, base_settings["balanced"])
+        settings = _BASE_SETTINGS.get(preset, _BASE_SETTINGS["balanced"])
         
         # Adjust for mobile platforms
         if "quest" in target_platforms:
+            settings = settings.copy()
             settings["max_texture_size"] = min(settings["max_texture_size"], 1024)
             settings["mesh_decimation"] = min(settings["mesh_decimation"], 0.7)
         
@@ -435,6 +642,38 @@ class BundleProcessor:
         lightmap_data: Optional[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """Create the bundle package."""
+        # Lightmap pixels and light probes travel as raw binary files referenced from the manifest
+        binary_files = {}
+        lightmap_manifest = lightmap_data
+        if lightmap_data and "light_probes" in lightmap_data:
+            lightmap_entries = []
+            for lightmap in lightmap_data["lightmaps"]:
+                uri = f"lightmaps/{lightmap['geometry_id']}.{lightmap['format']}"
+                binary_files[uri] = lightmap["data"]
+                lightmap_entries.append({
+                    key: value for key, value in lightmap.items() if key != "data"
+                } | {"uri": uri})
+            
+            probe_blob, probe_layout = self.lightmap_baker.pack_light_probes(
+                lightmap_data["light_probes"]
+            )
+            binary_files["light_probes.bin"] = probe_blob
+            lightmap_manifest = {
+                **lightmap_data,
+                "lightmaps": lightmap_entries,
+                "light_probes": {**probe_layout, "uri": "light_probes.bin"}
+            }
+        
+        # Navmesh geometry and BVH blobs also travel as binary files
+        navmesh_manifest = navmesh_data
+        if navmesh_data and "geometry" in navmesh_data:
+            navmesh_manifest = dict(navmesh_data)
+            for section, uri in (("geometry", "navmesh.bin"), ("bvh", "navmesh_bvh.bin")):
+                binary_files[uri] = navmesh_data[section]["data"]
+                navmesh_manifest[section] = {
+                    key: value for key, value in navmesh_data[section].items() if key != "data"
+                } | {"uri": uri}
+        
         # Create bundle manifest
         manifest = {
             "bundle_id": bundle_id,
@@ -442,39 +681,51 @@ class BundleProcessor:
             "site_id": request.site_id,
             "bundle_type": request.bundle_type,
             "target_platforms": request.target_platforms,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
             "assets": assets,
-            "navmesh": navmesh_data,
-            "lightmaps": lightmap_data,
+            "navmesh": navmesh_manifest,
+            "lightmaps": lightmap_manifest,
             "metadata": request.metadata
         }
         
-        # Calculate total size
-        total_size_mb = sum(asset.get("size_mb", 0) for asset in assets)
-        if navmesh_data:
-            total_size_mb += navmesh_data.get("size_mb", 0)
-        if lightmap_data:
-            total_size_mb += lightmap_data.get("size_mb", 0)
+        # Serialize the manifest once; its size and the binary files are known exactly
+        manifest_bytes = _dumps_manifest(manifest)
+        packaged_bytes = len(manifest_bytes) + sum(len(content) for content in binary_files.values())
+        total_size_mb = sum(asset.get("size_mb", 0) for asset in assets) + packaged_bytes / (1024 * 1024)
         
         return {
             "manifest": manifest,
+            "manifest_bytes": manifest_bytes,
+            "binary_files": binary_files,
             "size_mb": total_size_mb,
             "asset_count": len(assets)
         }
         
     async def _upload_bundle(self, bundle_id: str, bundle_data: Dict[str, Any], tenant_id: str) -> str:
         """Upload bundle to storage."""
-        # Create bundle archive (simplified)
-        bundle_json = json.dumps(bundle_data["manifest"], indent=2)
-        bundle_bytes = bundle_json.encode('utf-8')
-        
-        # Upload to storage
-        file_key = f"bundles/{tenant_id}/{bundle_id}/bundle.json"
-        bundle_url = await self.storage.upload_file(
-            file_key, bundle_bytes, "application/json"
-        )
-        
-        return bundle_url
+        file_key = f"bundles/{tenant_id}/{bundle_id}/bundle.zip"
+        
+        with tempfile.SpooledTemporaryFile(max_size=_BUNDLE_SPOOL_SIZE) as archive:
+            # Build the archive off the event loop; manifest uris resolve to entries in the zip
+            await asyncio.to_thread(
+                _write_bundle_archive,
+                archive,
+                bundle_data["manifest_bytes"],
+                bundle_data.get("binary_files", {})
+            )
+            
+            part = await asyncio.to_thread(archive.read, MULTIPART_PART_SIZE)
+            next_part = await asyncio.to_thread(archive.read, MULTIPART_PART_SIZE)
+            if not next_part:
+                return await self.storage.upload_file(file_key, part, "application/zip")
+            
+            # Stream large archives part by part instead of holding them in memory
+            async with self.storage.upload_multipart(file_key, "application/zip") as upload:
+                while part:
+                    await upload.write_part(part)
+                    part, next_part = next_part, await asyncio.to_thread(archive.read, MULTIPART_PART_SIZE)
+            
+            return upload.url
         
     async def _save_bundle_metadata(self, bundle_id: str, request, bundle_data: Dict[str, Any], bundle_url: str):
         """Save bundle metadata to database."""
@@ -484,52 +735,50 @@ class BundleProcessor:
     async def _create_streaming_chunks(self, assets: List[Dict[str, Any]], parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Create streaming chunks from assets."""
         chunk_size_mb = parameters.get("chunk_size_mb", 10.0)
-        chunks = []
-        
-        current_chunk = []
-        current_size = 0.0
-        
-        for asset in assets:
-            asset_size = asset.get("size_mb", 0)
-            
-            if current_size + asset_size > chunk_size_mb and current_chunk:
-                # Create chunk
-                chunks.append({
-                    "id": str(uuid4()),
-                    "assets": current_chunk,
-                    "size_mb": current_size,
-                    "priority": len(chunks)  # Earlier chunks have higher priority
-                })
-                
-                current_chunk = [asset]
-                current_size = asset_size
-            else:
-                current_chunk.append(asset)
-                current_size += asset_size
-        
-        # Add final chunk
-        if current_chunk:
-            chunks.append({
-                "id": str(uuid4()),
-                "assets": current_chunk,
-                "size_mb": current_size,
-                "priority": len(chunks)
-            })
+        if not assets:
+            return {"chunks": [], "total_size_mb": 0.0, "chunk_count": 0}
+        
+        sizes = np.fromiter((asset.get("size_mb", 0) for asset in assets), dtype=np.float64, count=len(assets))
+        cum = np.concatenate(([0.0], np.cumsum(sizes)))
+        
+        # Greedy packing, one binary search per chunk: extend each chunk to the last asset
+        # that still fits; an asset larger than a whole chunk ships in a chunk of its own
+        bounds = [0]
+        while bounds[-1] < len(assets):
+            start = bounds[-1]
+            end = int(np.searchsorted(cum, cum[start] + chunk_size_mb, side="right")) - 1
+            bounds.append(max(end, start + 1))
+        
+        chunk_sizes = np.diff(cum[bounds]).tolist()
+        chunk_ids = _uuid_batch(len(chunk_sizes))
+        chunks = [
+            {
+                "id": chunk_ids[i],
+                "assets": assets[bounds[i]:bounds[i + 1]],
+                "size_mb": chunk_sizes[i],
+                "priority": i  # Earlier chunks have higher priority
+            }
+            for i in range(len(chunk_sizes))
+        ]
         
         return {
             "chunks": chunks,
-            "total_size_mb": sum(chunk["size_mb"] for chunk in chunks),
+            "total_size_mb": float(cum[-1]),
             "chunk_count": len(chunks)
         }
         
     async def get_bundle_status(self, bundle_id: str) -> Dict[str, Any]:
         """Get bundle processing status."""
-        return self.bundle_status.get(bundle_id, {"status": "not_found"})
+        status = self.bundle_status.get(bundle_id)
+        if status is None and self.redis:
+            # The bundle may have been built by another replica
+            status = await self.redis.get_hash(f"bundle:{bundle_id}") or None
+        return status or {"status": "not_found"}
         
     async def get_bundle_download(self, bundle_id: str, tenant_id: str) -> Dict[str, Any]:
         """Get bundle download information."""
-        status = self.bundle_status.get(bundle_id)
-        if not status or status["status"] != "completed":
+        status = await self.get_bundle_status(bundle_id)
+        if status["status"] != "completed":
             raise ValueError("Bundle not ready for download")
         
         return {
@@ -544,6 +793,8 @@ class BundleProcessor:
         # Remove from cache
         if bundle_id in self.bundle_status:
             del self.bundle_status[bundle_id]
+        if self.redis:
+            await self.redis.delete(f"bundle:{bundle_id}")
         
         # Delete from storage
         file_key = f"bundles/{tenant_id}/{bundle_id}/"
@@ -571,12 +822,41 @@ class BundleProcessor:
         """Save streaming manifest."""
         logger.info(f"Saved streaming manifest for site {site_id}")
         
+    async def _subscribe_queued(self, subject: str, handler):
+        """Subscribe to a subject through a bounded queue drained by consumer tasks."""
+        queue = asyncio.Queue(maxsize=_MESSAGE_QUEUE_SIZE)
+        self._message_queues[subject] = queue
+        self.dropped_messages[subject] = 0
+        
+        async def enqueue(message: Dict[str, Any]):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.dropped_messages[subject] += 1
+                logger.warning(f"Message queue for {subject} is full, dropping message")
+        
+        async def consume():
+            while True:
+                message = await queue.get()
+                try:
+                    await handler(message)
+                except Exception as e:
+                    logger.error(f"Error handling message from {subject}: {str(e)}")
+                finally:
+                    queue.task_done()
+        
+        self._consumers.extend(
+            asyncio.create_task(consume()) for _ in range(self.settings.bundle_workers)
+        )
+        await self.nats.subscribe(subject, enqueue, queue=_NATS_QUEUE_GROUP)
+        
     async def _handle_bundle_message(self, message: Dict[str, Any]):
         """Handle bundle creation messages from NATS."""
-        # Handle async bundle requests
-        pass
+        # Request models live with the API; import here to avoid a circular import
+        from .main import BundleRequest
+        await self.create_bundle(BundleRequest(**message))
         
     async def _handle_asset_message(self, message: Dict[str, Any]):
         """Handle asset optimization messages from NATS."""
-        # Handle async asset optimization requests
-        pass
+        from .main import AssetOptimizationRequest
+        await self.optimize_assets(AssetOptimizationRequest(**message))
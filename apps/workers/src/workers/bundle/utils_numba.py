@@ -0,0 +1,80 @@
+"""
+Numba kernels for navmesh geometry and BVH builds, with NumPy fallbacks.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange, set_num_threads
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def single_threaded_kernels():
+    """Process pool initializer: run parallel kernels on one thread, as the pool already fills the cores."""
+    if HAS_NUMBA:
+        set_num_threads(1)
+
+
+def _tri_areas_numpy(V: np.ndarray, I: np.ndarray) -> np.ndarray:
+    """Areas of indexed triangles (V: (N, 3) vertices, I: (M, 3) indices)."""
+    a = V[I[:, 1]] - V[I[:, 0]]
+    b = V[I[:, 2]] - V[I[:, 0]]
+    return (0.5 * np.linalg.norm(np.cross(a, b), axis=1)).astype(np.float32)
+
+
+
+def _tri_bounds_numpy(V: np.ndarray, I: np.ndarray):
+    """Per-triangle AABB min, max and centroid, each (M, 3) float32."""
+    tris = V[I]
+    return (
+        tris.min(axis=1).astype(np.float32),
+        tris.max(axis=1).astype(np.float32),
+        tris.mean(axis=1).astype(np.float32)
+    )
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def tri_areas(V, I):
+        """Areas of indexed triangles (V: (N, 3) vertices, I: (M, 3) indices), parallel over triangles."""
+        areas = np.empty(I.shape[0], dtype=np.float32)
+        for k in prange(I.shape[0]):
+            i0 = I[k, 0]
+            i1 = I[k, 1]
+            i2 = I[k, 2]
+            ax = V[i1, 0] - V[i0, 0]
+            ay = V[i1, 1] - V[i0, 1]
+            az = V[i1, 2] - V[i0, 2]
+            bx = V[i2, 0] - V[i0, 0]
+            by = V[i2, 1] - V[i0, 1]
+            bz = V[i2, 2] - V[i0, 2]
+            cx = ay * bz - az * by
+            cy = az * bx - ax * bz
+            cz = ax * by - ay * bx
+            areas[k] = 0.5 * np.sqrt(cx * cx + cy * cy + cz * cz)
+        return areas
+    
+    @njit(parallel=True, fastmath=True, cache=True)
+    def tri_bounds(V, I):
+        """Per-triangle AABB min, max and centroid in one pass, without a gathered (M, 3, 3) copy."""
+        m = I.shape[0]
+        mins = np.empty((m, 3), dtype=np.float32)
+        maxs = np.empty((m, 3), dtype=np.float32)
+        centers = np.empty((m, 3), dtype=np.float32)
+        for k in prange(m):
+            i0 = I[k, 0]
+            i1 = I[k, 1]
+            i2 = I[k, 2]
+            for axis in range(3):
+                a = V[i0, axis]
+                b = V[i1, axis]
+                c = V[i2, axis]
+                mins[k, axis] = min(a, b, c)
+                maxs[k, axis] = max(a, b, c)
+                centers[k, axis] = (a + b + c) / 3.0
+        return mins, maxs, centers
+else:
+    tri_areas = _tri_areas_numpy
+    tri_bounds = _tri_bounds_numpy
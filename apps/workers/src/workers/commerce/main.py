@@ -5,55 +5,34 @@ Handles tour monetization, licensing, and access control.
 """
 
 import logging
-from contextlib import asynccontextmanager
 from typing import Dict, Any, List
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import HTTPException, BackgroundTasks
 from pydantic import BaseModel
 
 from .processor import CommerceProcessor
-from ..shared.database import get_database
-from ..shared.nats_client import get_nats_client
-from ..shared.storage import get_storage_client
-from ..shared.config import get_settings
+from ..shared.app_factory import create_worker_app, run_worker_app
+from ..shared.redis_client import get_redis_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Access decisions are cached briefly and dropped when the user makes a purchase
+_ACCESS_CACHE_PREFIX = "vr-tour:access"
+_ACCESS_CACHE_TTL_SECONDS = 60
+
 processor: CommerceProcessor = None
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+async def _on_startup(worker_processor: CommerceProcessor, settings):
     global processor
-    settings = get_settings()
-    db = await get_database()
-    nats = await get_nats_client()
-    storage = get_storage_client()
-    
-    processor = CommerceProcessor(db, nats, storage, settings)
-    await processor.initialize()
-    
-    logger.info("Commerce worker started successfully")
-    yield
-    
-    if processor:
-        await processor.cleanup()
-    logger.info("Commerce worker stopped")
+    processor = worker_processor
 
-app = FastAPI(
-    title="AI VR Tour Guide - Commerce Worker",
+app = create_worker_app(
+    name="commerce",
+    title="Commerce Worker",
     description="Tour monetization and access control",
-    version="1.0.0",
-    lifespan=lifespan
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    processor_cls=CommerceProcessor,
+    on_startup=_on_startup
 )
 
 class PurchaseRequest(BaseModel):
@@ -63,14 +42,16 @@ class PurchaseRequest(BaseModel):
     payment_method: str
     billing_info: Dict[str, Any]
 
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "service": "commerce-worker"}
-
 @app.post("/purchase")
 async def process_purchase(request: PurchaseRequest):
     try:
         result = await processor.process_purchase(request)
+        
+        # The purchase has gone through; a stale cache entry expires on its own, so Redis errors must not fail it
+        try:
+            await get_redis_client().delete(f"{_ACCESS_CACHE_PREFIX}:{request.user_id}")
+        except Exception as e:
+            logger.warning(f"Could not invalidate access cache for {request.user_id}: {str(e)}")
         return result
     except Exception as e:
         logger.error(f"Error processing purchase: {str(e)}")
@@ -79,12 +60,17 @@ async def process_purchase(request: PurchaseRequest):
 @app.get("/access/check")
 async def check_access(user_id: str, site_id: str, feature: str = None):
     try:
-        result = await processor.check_access(user_id, site_id, feature)
+        # One hash per user, so a purchase drops all of the user's decisions with a single DEL
+        result = await get_redis_client().cached_field(
+            f"{_ACCESS_CACHE_PREFIX}:{user_id}",
+            f"{site_id}:{feature}",
+            _ACCESS_CACHE_TTL_SECONDS,
+            lambda: processor.check_access(user_id, site_id, feature)
+        )
         return result
     except Exception as e:
         logger.error(f"Error checking access: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8009)
+    run_worker_app("workers.commerce.main:app", port=8009)
@@ -5,55 +5,29 @@ Provides content safety, cultural sensitivity, and citation enforcement.
 """
 
 import logging
-from contextlib import asynccontextmanager
 from typing import Dict, Any, List
 
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import HTTPException
 from pydantic import BaseModel
 
 from .processor import GuardrailsProcessor
-from ..shared.database import get_database
-from ..shared.nats_client import get_nats_client
-from ..shared.storage import get_storage_client
-from ..shared.config import get_settings
+from ..shared.app_factory import create_worker_app, run_worker_app
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 processor: GuardrailsProcessor = None
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+async def _on_startup(worker_processor: GuardrailsProcessor, settings):
     global processor
-    settings = get_settings()
-    db = await get_database()
-    nats = await get_nats_client()
-    storage = get_storage_client()
-    
-    processor = GuardrailsProcessor(db, nats, storage, settings)
-    await processor.initialize()
-    
-    logger.info("Guardrails worker started successfully")
-    yield
-    
-    if processor:
-        await processor.cleanup()
-    logger.info("Guardrails worker stopped")
+    processor = worker_processor
 
-app = FastAPI(
-    title="AI VR Tour Guide - Guardrails Worker",
+app = create_worker_app(
+    name="guardrails",
+    title="Guardrails Worker",
     description="Content safety and citation enforcement",
-    version="1.0.0",
-    lifespan=lifespan
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    processor_cls=GuardrailsProcessor,
+    on_startup=_on_startup
 )
 
 class ContentCheckRequest(BaseModel):
@@ -63,10 +37,6 @@ class ContentCheckRequest(BaseModel):
     cultural_context: str = "general"
     strictness_level: str = "medium"
 
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "service": "guardrails-worker"}
-
 @app.post("/check-content")
 async def check_content(request: ContentCheckRequest):
     try:
@@ -90,5 +60,4 @@ async def enforce_citations(
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8007)
+    run_worker_app("workers.guardrails.main:app", port=8007)
@@ -5,93 +5,115 @@ Handles document and media ingestion for the AI VR Tour Guide platform.
 """
 
 import asyncio
+import hashlib
 import logging
-from contextlib import asynccontextmanager
-from typing import Dict, Any
+from typing import Optional, Tuple
+from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+import orjson
+from fastapi import HTTPException, BackgroundTasks, Depends, UploadFile, File, Form
 
-from .processor import IngestProcessor
-from ..shared.database import get_database
-from ..shared.nats_client import get_nats_client
-from ..shared.storage import get_storage_client
-from ..shared.config import get_settings
+from .models import IngestRequest, IngestResponse
+from .processor import IN_MEMORY_UPLOAD_MAX_BYTES, IngestProcessor, hash_chunk
+from ..shared.app_factory import create_worker_app, run_worker_app
+from ..shared.redis_client import get_redis_client
+
+try:
+    from prometheus_client import Gauge, make_asgi_app
+    HAS_PROMETHEUS = True
+except ImportError:
+    HAS_PROMETHEUS = False
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Uploads are streamed to storage in chunks of this size instead of read whole
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Status polling comes in bursts; a short TTL absorbs it while keeping status fresh
+_STATUS_CACHE_PREFIX = "vr-tour:ingest-status"
+_STATUS_CACHE_TTL_SECONDS = 2
+
+# Seconds clients are told to wait when every upload slot is taken
+_RETRY_AFTER_SECONDS = 2
+
 # Global processor instance
 processor: IngestProcessor = None
 
+# Bounds concurrent uploads; created at startup from settings.ingest_max_inflight
+_ingest_slots: asyncio.Semaphore = None
+
+if HAS_PROMETHEUS:
+    _inflight_gauge = Gauge("ingest_inflight_uploads", "Uploads currently being accepted")
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan manager."""
-    global processor
-    
-    # Initialize services
-    settings = get_settings()
-    db = await get_database()
-    nats = await get_nats_client()
-    storage = get_storage_client()
-    
-    # Initialize processor
-    processor = IngestProcessor(db, nats, storage, settings)
-    await processor.initialize()
-    
-    logger.info("Ingest worker started successfully")
-    yield
-    
-    # Cleanup
-    if processor:
-        await processor.cleanup()
-    logger.info("Ingest worker stopped")
+
+async def _on_startup(worker_processor: IngestProcessor, settings):
+    """Keep the processor for the routes and size the upload gate."""
+    global processor, _ingest_slots
+    processor = worker_processor
+    _ingest_slots = asyncio.Semaphore(settings.ingest_max_inflight)
 
 
 # Create FastAPI app
-app = FastAPI(
-    title="AI VR Tour Guide - Ingest Worker",
+app = create_worker_app(
+    name="ingest",
+    title="Ingest Worker",
     description="Document and media ingestion pipeline",
-    version="1.0.0",
-    lifespan=lifespan
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    processor_cls=IngestProcessor,
+    on_startup=_on_startup
 )
 
+# Expose metrics for autoscaling on upload concurrency
+if HAS_PROMETHEUS:
+    app.mount("/metrics", make_asgi_app())
 
-class IngestRequest(BaseModel):
-    """Request model for document ingestion."""
-    site_id: str
-    tenant_id: str
-    title: str
-    source_url: str = None
-    content_type: str = None
-    metadata: Dict[str, Any] = {}
 
-
-class IngestResponse(BaseModel):
-    """Response model for ingestion requests."""
-    document_id: str
-    status: str
-    message: str
-    chunks_created: int = 0
-    processing_time_ms: int = 0
+async def _acquire_ingest_slot():
+    """Hold an upload slot for the request, shedding load with 503 when none is free."""
+    if _ingest_slots.locked():
+        raise HTTPException(
+            status_code=503,
+            detail="Ingest worker is at capacity",
+            headers={"Retry-After": str(_RETRY_AFTER_SECONDS)}
+        )
+    
+    await _ingest_slots.acquire()
+    if HAS_PROMETHEUS:
+        _inflight_gauge.inc()
+    try:
+        yield
+    finally:
+        _ingest_slots.release()
+        if HAS_PROMETHEUS:
+            _inflight_gauge.dec()
 
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy", "service": "ingest-worker"}
+async def _stream_upload(file: UploadFile, prefix: str, tenant_id: str) -> Tuple[str, str, int, Optional[bytes]]:
+    """Stream an upload to storage chunk by chunk; returns its key, SHA-256, size and, without storage, its content."""
+    file_key = f"{prefix}/{tenant_id}/{uuid4().hex}/{file.filename}"
+    digest = hashlib.sha256()
+    size = 0
+    
+    if not processor.storage.available:
+        # Nothing could be downloaded later, so the job is handed the bytes themselves
+        content = bytearray()
+        while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+            await hash_chunk(digest, chunk)
+            content += chunk
+            if len(content) > IN_MEMORY_UPLOAD_MAX_BYTES:
+                raise ValueError(f"Storage is not configured; uploads over {IN_MEMORY_UPLOAD_MAX_BYTES} bytes need S3")
+        return file_key, digest.hexdigest(), len(content), bytes(content)
+    
+    async def chunks():
+        nonlocal size
+        while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+            await hash_chunk(digest, chunk)
+            size += len(chunk)
+            yield chunk
+    
+    await processor.storage.upload_stream(file_key, chunks(), file.content_type)
+    return file_key, digest.hexdigest(), size, None
 
 
 @app.post("/ingest/document", response_model=IngestResponse)
@@ -102,7 +124,8 @@ async def ingest_document(
     tenant_id: str = Form(...),
     title: str = Form(...),
     source_url: str = Form(None),
-    metadata: str = Form("{}")  # JSON string
+    metadata: str = Form("{}"),  # JSON string
+    _slot: None = Depends(_acquire_ingest_slot)
 ):
     """
     Ingest a document file.
@@ -110,8 +133,7 @@ async def ingest_document(
     Supports: PDF, DOCX, TXT, HTML, MD
     """
     try:
-        import json
-        metadata_dict = json.loads(metadata) if metadata else {}
+        metadata_dict = orjson.loads(metadata) if metadata else {}
         
         request = IngestRequest(
             site_id=site_id,
@@ -122,16 +144,19 @@ async def ingest_document(
             metadata=metadata_dict
         )
         
-        # Read file content
-        content = await file.read()
+        # Stream the file to storage; the job gets its key, or its bytes when storage is unavailable
+        file_key, content_hash, file_size, content = await _stream_upload(file, "documents", tenant_id)
         
-        # Process document in background
-        background_tasks.add_task(
-            processor.process_document,
-            request,
-            content,
-            file.filename
-        )
+        # Queue the document for the ingest consumers
+        await processor.submit_job("ingest.document", {
+            "request": request.dict(),
+            "args": {
+                "file_key": file_key,
+                "filename": file.filename,
+                "content_hash": content_hash,
+                "file_size": file_size
+            }
+        }, background_tasks, content=content)
         
         return IngestResponse(
             document_id="pending",  # Will be updated when processing completes
@@ -152,7 +177,8 @@ async def ingest_media(
     tenant_id: str = Form(...),
     title: str = Form(...),
     media_type: str = Form(...),  # image, audio, video
-    metadata: str = Form("{}")
+    metadata: str = Form("{}"),
+    _slot: None = Depends(_acquire_ingest_slot)
 ):
     """
     Ingest a media file.
@@ -160,8 +186,7 @@ async def ingest_media(
     Supports: Images (JPG, PNG, WEBP), Audio (MP3, WAV, M4A), Video (MP4, WEBM)
     """
     try:
-        import json
-        metadata_dict = json.loads(metadata) if metadata else {}
+        metadata_dict = orjson.loads(metadata) if metadata else {}
         
         request = IngestRequest(
             site_id=site_id,
@@ -171,16 +196,19 @@ async def ingest_media(
             metadata={**metadata_dict, "media_type": media_type}
         )
         
-        # Read file content
-        content = await file.read()
+        # Stream the file to storage; the job gets its key, or its bytes when storage is unavailable
+        file_key, content_hash, file_size, content = await _stream_upload(file, "media", tenant_id)
         
-        # Process media in background
-        background_tasks.add_task(
-            processor.process_media,
-            request,
-            content,
-            file.filename
-        )
+        # Queue the media file for the ingest consumers
+        await processor.submit_job("ingest.media", {
+            "request": request.dict(),
+            "args": {
+                "file_key": file_key,
+                "filename": file.filename,
+                "content_hash": content_hash,
+                "file_size": file_size
+            }
+        }, background_tasks, content=content)
         
         return IngestResponse(
             document_id="pending",
@@ -207,11 +235,8 @@ async def ingest_from_url(
         if not request.source_url:
             raise HTTPException(status_code=400, detail="source_url is required")
         
-        # Process URL in background
-        background_tasks.add_task(
-            processor.process_url,
-            request
-        )
+        # Queue the URL for the ingest consumers
+        await processor.submit_job("ingest.url", {"request": request.dict()}, background_tasks)
         
         return IngestResponse(
             document_id="pending",
@@ -228,7 +253,11 @@ async def ingest_from_url(
 async def get_ingest_status(document_id: str):
     """Get the status of a document ingestion."""
     try:
-        status = await processor.get_processing_status(document_id)
+        status = await get_redis_client().cached(
+            f"{_STATUS_CACHE_PREFIX}:{document_id}",
+            _STATUS_CACHE_TTL_SECONDS,
+            lambda: processor.get_processing_status(document_id)
+        )
         return status
     except Exception as e:
         logger.error(f"Error getting status: {str(e)}")
@@ -240,6 +269,7 @@ async def delete_document(document_id: str, tenant_id: str):
     """Delete a document and its associated data."""
     try:
         await processor.delete_document(document_id, tenant_id)
+        await get_redis_client().delete(f"{_STATUS_CACHE_PREFIX}:{document_id}")
         return {"status": "deleted", "document_id": document_id}
     except Exception as e:
         logger.error(f"Error deleting document: {str(e)}")
@@ -247,5 +277,4 @@ async def delete_document(document_id: str, tenant_id: str):
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    run_worker_app("workers.ingest.main:app", port=8001, processes=1, limit_concurrency=200, backlog=2048)
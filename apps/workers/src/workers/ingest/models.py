@@ -0,0 +1,26 @@
+"""
+Request and response models shared by the ingest API and job processor.
+"""
+
+from typing import Dict, Any
+
+from pydantic import BaseModel
+
+
+class IngestRequest(BaseModel):
+    """Request model for document ingestion."""
+    site_id: str
+    tenant_id: str
+    title: str
+    source_url: str = None
+    content_type: str = None
+    metadata: Dict[str, Any] = {}
+
+
+class IngestResponse(BaseModel):
+    """Response model for ingestion requests."""
+    document_id: str
+    status: str
+    message: str
+    chunks_created: int = 0
+    processing_time_ms: int = 0
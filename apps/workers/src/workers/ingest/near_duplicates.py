@@ -0,0 +1,238 @@
+"""
+Near-duplicate chunk suppression for the ingest pipeline.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+try:
+    from datasketch import MinHash, MinHashLSH
+    HAS_DATASKETCH = True
+except ImportError:
+    HAS_DATASKETCH = False
+    logging.warning("datasketch not available. Only exact duplicate chunks will be dropped.")
+
+from ..shared.redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# Chunks whose estimated Jaccard similarity to an indexed chunk reaches this threshold are dropped
+_NEAR_DUPLICATE_THRESHOLD = 0.85
+_NUM_PERM = 64
+
+# Chunks are compared as sets of word 5-grams over lowercase alphanumeric tokens
+_SHINGLE_WORDS = 5
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Without datasketch, chunks are fingerprinted by the SHA-1 of this many normalized characters
+_FINGERPRINT_CHARS = 4000
+
+# Redis keys: per-site LSH index, per-site fingerprints, and the entries each document added
+_LSH_PREFIX = "vr-tour:chunk-lsh"
+_FINGERPRINT_PREFIX = "vr-tour:chunk-fp"
+_DOCUMENT_ENTRIES_PREFIX = "vr-tour:chunk-entries"
+
+# Separates the index scope from the entry key in a document's entry set
+_SCOPE_SEPARATOR = "|"
+
+
+def _tokens(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of a chunk."""
+    return _TOKEN.findall(text.lower())
+
+
+def _shingles(tokens: List[str]) -> Set[bytes]:
+    """Word n-grams of a token list; short chunks form a single shingle."""
+    if len(tokens) <= _SHINGLE_WORDS:
+        return {" ".join(tokens).encode()} if tokens else set()
+    return {" ".join(tokens[i:i + _SHINGLE_WORDS]).encode() for i in range(len(tokens) - _SHINGLE_WORDS + 1)}
+
+
+def _redis_params(redis_url: str) -> Dict[str, Any]:
+    """redis-py connection arguments for a redis:// or rediss:// URL."""
+    parsed = urlparse(redis_url)
+    return {
+        "host": parsed.hostname or "localhost",
+        "port": parsed.port or 6379,
+        "db": int(parsed.path.lstrip("/") or 0),
+        "password": parsed.password,
+        "ssl": parsed.scheme == "rediss",
+    }
+
+
+def _scope(tenant_id: str, site_id: Optional[str]) -> str:
+    """Chunks are deduplicated within a site, matching retrieval and document deduplication."""
+    return f"{tenant_id}:{site_id or '-'}"
+
+
+def _entry_key(content_hash: str, document_id: str, chunk_index: int) -> str:
+    """Index entry for a chunk, naming the content and document it came from."""
+    return f"{content_hash}:{document_id}:{chunk_index}"
+
+
+def _same_source(entry: str, content_hash: str, document_id: str) -> bool:
+    """Whether an index entry came from the same content or document, e.g. an earlier attempt of this job."""
+    entry_hash, entry_document, _ = entry.split(":", 2)
+    return entry_hash == content_hash or entry_document == document_id
+
+
+class ChunkDeduplicator:
+    """Drops chunks that nearly duplicate chunks already indexed for the same site.
+    
+    filter_chunks only reads the index; index_chunks records the kept chunks once they are stored,
+    so a job that fails in between leaves nothing behind to suppress its retry.
+    """
+    
+    def __init__(self, redis_url: str, redis: RedisClient):
+        self.redis = redis
+        self._redis_params = _redis_params(redis_url)
+        
+        # MinHash LSH indexes stored in Redis, one per site
+        self._indexes: Dict[str, Any] = {}
+    
+    def _index(self, scope: str):
+        """Get the scope's LSH index, connecting to it on first use."""
+        index = self._indexes.get(scope)
+        if index is None:
+            index = self._indexes[scope] = MinHashLSH(
+                threshold=_NEAR_DUPLICATE_THRESHOLD,
+                num_perm=_NUM_PERM,
+                storage_config={
+                    "type": "redis",
+                    "basename": f"{_LSH_PREFIX}:{scope}".encode(),
+                    "redis": self._redis_params,
+                }
+            )
+        return index
+    
+    async def filter_chunks(self, chunks: List[Dict[str, Any]], document_id: str, content_hash: str,
+                            tenant_id: str, site_id: Optional[str]) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Any]]]:
+        """Drop chunks that nearly duplicate indexed ones; returns the kept chunks and their pending index entries.
+        
+        Keeps everything if Redis fails.
+        """
+        if not chunks:
+            return chunks, []
+        
+        scope = _scope(tenant_id, site_id)
+        try:
+            if HAS_DATASKETCH:
+                # The LSH index talks to Redis through the blocking redis-py client
+                kept, pending = await asyncio.to_thread(self._filter_lsh, chunks, document_id, content_hash, scope)
+            else:
+                kept, pending = await self._filter_fingerprints(chunks, document_id, content_hash, scope)
+        except Exception as e:
+            logger.warning(f"Near-duplicate filtering failed for {document_id}, keeping all chunks: {str(e)}")
+            return chunks, []
+        
+        if len(kept) < len(chunks):
+            logger.info(f"Dropped {len(chunks) - len(kept)} near-duplicate chunks from {document_id}")
+        return kept, pending
+    
+    def _filter_lsh(self, chunks: List[Dict[str, Any]], document_id: str, content_hash: str,
+                    scope: str) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Any]]]:
+        """Query each chunk's MinHash against the site index and the document's earlier chunks."""
+        index = self._index(scope)
+        # Repeated passages within the document are caught without touching Redis
+        local = MinHashLSH(threshold=_NEAR_DUPLICATE_THRESHOLD, num_perm=_NUM_PERM)
+        kept = []
+        pending = []
+        for chunk in chunks:
+            shingles = _shingles(_tokens(chunk["content"]))
+            if not shingles:
+                kept.append(chunk)
+                continue
+            
+            minhash = MinHash(num_perm=_NUM_PERM)
+            minhash.update_batch(shingles)
+            if local.query(minhash):
+                continue
+            matches = index.query(minhash)
+            if matches and not any(_same_source(match, content_hash, document_id) for match in matches):
+                continue
+            
+            key = _entry_key(content_hash, document_id, chunk["chunk_index"])
+            local.insert(key, minhash)
+            kept.append(chunk)
+            pending.append((key, minhash))
+        
+        return kept, pending
+    
+    async def _filter_fingerprints(self, chunks: List[Dict[str, Any]], document_id: str, content_hash: str,
+                                   scope: str) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Any]]]:
+        """Look up each chunk's fingerprint for the site, dropping chunks claimed by other content."""
+        keys = []
+        for chunk in chunks:
+            normalized = " ".join(_tokens(chunk["content"]))[:_FINGERPRINT_CHARS]
+            keys.append(f"{_FINGERPRINT_PREFIX}:{scope}:{hashlib.sha1(normalized.encode()).hexdigest()}" if normalized else None)
+        
+        owners = await self.redis.get_many([key for key in keys if key])
+        owners = iter(owners)
+        
+        kept = []
+        pending = []
+        seen = set()
+        for chunk, key in zip(chunks, keys):
+            if key is None:
+                kept.append(chunk)
+                continue
+            
+            owner = next(owners)
+            if key in seen or (owner is not None and not _same_source(owner, content_hash, document_id)):
+                continue
+            
+            seen.add(key)
+            kept.append(chunk)
+            pending.append((key, _entry_key(content_hash, document_id, chunk["chunk_index"])))
+        
+        return kept, pending
+    
+    async def index_chunks(self, pending: List[Tuple[str, Any]], document_id: str,
+                           tenant_id: str, site_id: Optional[str]):
+        """Record stored chunks so later documents of the site skip them; best effort."""
+        if not pending:
+            return
+        
+        scope = _scope(tenant_id, site_id)
+        try:
+            if HAS_DATASKETCH:
+                index = self._index(scope)
+                
+                def insert():
+                    for key, minhash in pending:
+                        if key not in index:
+                            index.insert(key, minhash)
+                
+                await asyncio.to_thread(insert)
+                entries = [f"{scope}{_SCOPE_SEPARATOR}{key}" for key, _ in pending]
+            else:
+                # Only fingerprints this document claimed are released when it is deleted
+                entries = [key for key, owner in pending if await self.redis.set_if_absent(key, owner)]
+            await self.redis.add_members(f"{_DOCUMENT_ENTRIES_PREFIX}:{document_id}", entries)
+        except Exception as e:
+            logger.warning(f"Could not index chunks of {document_id}: {str(e)}")
+    
+    async def remove_document(self, document_id: str):
+        """Forget a deleted document's chunks so the same content can be indexed again."""
+        try:
+            entries = await self.redis.pop_members(f"{_DOCUMENT_ENTRIES_PREFIX}:{document_id}")
+            if not entries:
+                return
+            
+            if HAS_DATASKETCH:
+                def remove():
+                    for entry in entries:
+                        scope, key = entry.split(_SCOPE_SEPARATOR, 1)
+                        index = self._index(scope)
+                        if key in index:
+                            index.remove(key)
+                
+                await asyncio.to_thread(remove)
+            else:
+                await self.redis.delete(*entries)
+        except Exception as e:
+            logger.warning(f"Could not remove chunk entries of {document_id}: {str(e)}")
@@ -2,44 +2,314 @@
 OCR (Optical Character Recognition) processor for extracting text from images and scanned documents.
 """
 
+import asyncio
+import functools
+import importlib.util
 import io
 import logging
-from typing import Optional
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 try:
-    import pytesseract
     from PIL import Image
-    HAS_TESSERACT = True
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+try:
+    import cv2
+    HAS_CV2 = True
 except ImportError:
-    HAS_TESSERACT = False
-    logging.warning("Tesseract OCR not available. Install pytesseract and tesseract-ocr.")
+    HAS_CV2 = False
 
 try:
-    import easyocr
-    HAS_EASYOCR = True
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+    HAS_TURBOJPEG = True
+except (ImportError, OSError, RuntimeError):
+    # Also raised when the libjpeg-turbo shared library is missing
+    HAS_TURBOJPEG = False
+
+try:
+    import tesserocr
+    from tesserocr import PyTessBaseAPI, PSM, OEM
+    HAS_TESSEROCR = True
+except ImportError:
+    HAS_TESSEROCR = False
+
+try:
+    import pytesseract
+    HAS_PYTESSERACT = True
 except ImportError:
-    HAS_EASYOCR = False
+    HAS_PYTESSERACT = False
+
+# tesserocr runs Tesseract in-process; pytesseract shells out to the CLI
+HAS_TESSERACT = HAS_TESSEROCR or HAS_PYTESSERACT
+if not HAS_TESSERACT:
+    logging.warning("Tesseract OCR not available. Install tesserocr or pytesseract and tesseract-ocr.")
+
+# easyocr pulls in torch, so it is only imported when the reader is first built
+HAS_EASYOCR = importlib.util.find_spec("easyocr") is not None
+if not HAS_EASYOCR:
     logging.warning("EasyOCR not available. Install easyocr for better OCR results.")
 
+from ..shared.config import pool_workers
+
 logger = logging.getLogger(__name__)
 
+# Runs of whitespace, including line breaks, collapse to a single space in OCR output
+_WS_RE = re.compile(r'\s+')
+
+# Images are downscaled so their longest edge is at most this many pixels before OCR
+_DEFAULT_MAX_LONG_EDGE = 2000
+
+# Languages loaded into the shared EasyOCR reader
+_EASYOCR_LANGUAGES = ['en', 'es', 'fr', 'de', 'it']
+
+# Languages EasyOCR can recognize, reported by get_supported_languages
+_EASYOCR_SUPPORTED_LANGUAGES = ('en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'ja', 'ko', 'zh')
+
+# Concurrent EasyOCR requests are batched up to this size, waiting at most this long to fill a batch
+_OCR_MAX_BATCH = 8
+_OCR_MAX_WAIT_SECONDS = 0.01
+
+# EasyOCR output is accepted outright with at least this many regions at this mean confidence;
+# Tesseract only runs when the mean confidence is below the fallback threshold
+_EASYOCR_MIN_REGIONS = 3
+_EASYOCR_ACCEPT_CONFIDENCE = 0.6
+_EASYOCR_FALLBACK_CONFIDENCE = 0.4
+
+# One EasyOCR reader per process; its detector and recognizer weights are shared by all requests
+_reader = None
+_reader_lock = threading.Lock()
+
+# Downscale limit inside page pool processes, set by _init_page_worker
+_page_max_long_edge = _DEFAULT_MAX_LONG_EDGE
+
+# One Tesseract handle per OCR thread; the API is not thread-safe but keeps its language data loaded
+_tesseract_local = threading.local()
+
+
+def get_reader(quantize: bool = True):
+    """Get the process-wide EasyOCR reader, building it on first use.
+    
+    On CPU, quantize makes EasyOCR run torch.quantization.quantize_dynamic over both
+    the detector and the recognizer, storing their Linear and LSTM weights as INT8.
+    Conv2d layers have no dynamically quantized kernel and stay FP32.
+    """
+    global _reader
+    
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                import easyocr
+                import torch
+                gpu = torch.cuda.is_available()
+                try:
+                    # Skip the model download check when the weights are already on disk
+                    _reader = easyocr.Reader(_EASYOCR_LANGUAGES, gpu=gpu, quantize=quantize, download_enabled=False)
+                except FileNotFoundError:
+                    _reader = easyocr.Reader(_EASYOCR_LANGUAGES, gpu=gpu, quantize=quantize)
+                device = 'GPU' if gpu else ('CPU, INT8' if quantize else 'CPU')
+                logger.info(f"EasyOCR initialized successfully ({device})")
+    
+    return _reader
+
+
+@functools.lru_cache(maxsize=1)
+def _tesseract_langs() -> Tuple[str, ...]:
+    """Installed Tesseract languages; listed once since they only change with the install."""
+    try:
+        if HAS_TESSEROCR:
+            _, langs = tesserocr.get_languages()
+        else:
+            # Spawns `tesseract --list-langs`
+            langs = pytesseract.get_languages()
+        return tuple(langs)
+    except Exception:
+        return ()
+
+
+def _tesseract_api():
+    """Get this thread's Tesseract API handle, creating it on first use."""
+    api = getattr(_tesseract_local, "api", None)
+    if api is None:
+        api = PyTessBaseAPI(psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY)
+        api.SetVariable("tessedit_do_invert", "0")
+        _tesseract_local.api = api
+    return api
+
+
+def _tesseract_image_to_string(image: np.ndarray) -> str:
+    """Run Tesseract on an RGB array, in-process when tesserocr is installed."""
+    if HAS_TESSEROCR:
+        api = _tesseract_api()
+        api.SetImage(Image.fromarray(image))
+        return api.GetUTF8Text()
+    return pytesseract.image_to_string(image, config='--oem 1 --psm 6 -c tessedit_do_invert=0')
+
+
+def _init_page_worker(max_long_edge: int):
+    """Configure a page pool process."""
+    global _page_max_long_edge
+    _page_max_long_edge = max_long_edge
+
+
+def _ocr_page(content: bytes) -> str:
+    """Run Tesseract on one page image inside a page pool process."""
+    image, _ = _downscale(_decode_to_rgb(content), _page_max_long_edge)
+    return _WS_RE.sub(' ', _tesseract_image_to_string(image)).strip()
+
+
+def _decode_to_rgb(content: bytes) -> np.ndarray:
+    """Decode image bytes straight to an (H, W, 3) uint8 RGB array."""
+    # JPEG: libjpeg-turbo decodes to RGB in one pass
+    if HAS_TURBOJPEG and content[:3] == b"\xff\xd8\xff":
+        return _turbojpeg.decode(content, pixel_format=TJPF_RGB)
+    
+    if HAS_CV2:
+        image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+        if image is not None:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    
+    with Image.open(io.BytesIO(content)) as image:
+        return np.asarray(image.convert('RGB'))
+
+
+def _downscale(image: np.ndarray, max_long_edge: int) -> Tuple[np.ndarray, float]:
+    """Shrink an image so its longest edge fits max_long_edge; returns it and the scale applied."""
+    height, width = image.shape[:2]
+    long_edge = max(height, width)
+    if not max_long_edge or long_edge <= max_long_edge:
+        return image, 1.0
+    
+    scale = max_long_edge / long_edge
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    if HAS_CV2:
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+    return np.asarray(Image.fromarray(image).resize(size, Image.BOX)), scale
+
 
 class OCRProcessor:
     """Processor for extracting text from images using OCR."""
     
-    def __init__(self):
+    def __init__(self, max_long_edge: int = _DEFAULT_MAX_LONG_EDGE, enable_easyocr: bool = True,
+                 quantize: bool = True, max_workers: Optional[int] = None):
+        self.max_long_edge = max_long_edge
+        self.max_workers = max_workers or pool_workers()
+        self.quantize = quantize
         self.tesseract_available = HAS_TESSERACT
-        self.easyocr_available = HAS_EASYOCR
+        self.easyocr_available = HAS_EASYOCR and enable_easyocr
         self.easyocr_reader = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        
+        # Images sent to EasyOCR, and how many of them also needed a Tesseract pass
+        self.easyocr_count = 0
+        self.tesseract_fallback_count = 0
+        self._supported_languages: Optional[List[str]] = None
+        
+        # Tesseract-only page batches run one page per core, each process with its own handle
+        self._page_pool: Optional[ProcessPoolExecutor] = None
+        
+        # OCR engines block (EasyOCR in torch, Tesseract in C++ or a subprocess); run them off the event loop
+        self._ocr_executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr")
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking OCR call on the OCR thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._ocr_executor, functools.partial(func, *args, **kwargs)
+        )
+    
+    async def initialize(self):
+        """Load the shared EasyOCR reader so the first request does not pay for it."""
+        if self.tesseract_available:
+            self._page_pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_page_worker,
+                initargs=(self.max_long_edge,)
+            )
         
         if self.easyocr_available:
             try:
-                # Initialize EasyOCR reader with common languages
-                self.easyocr_reader = easyocr.Reader(['en', 'es', 'fr', 'de', 'it'])
-                logger.info("EasyOCR initialized successfully")
+                self.easyocr_reader = await self._run_blocking(get_reader, self.quantize)
             except Exception as e:
                 logger.warning(f"Failed to initialize EasyOCR: {e}")
                 self.easyocr_available = False
+                return
+            
+            self._queue = asyncio.Queue()
+            self._batch_task = asyncio.create_task(self._batch_loop())
+    
+    async def cleanup(self):
+        """Stop the EasyOCR batching loop and the OCR pools."""
+        if self._batch_task:
+            self._batch_task.cancel()
+            await asyncio.gather(self._batch_task, return_exceptions=True)
+            self._batch_task = None
+        if self._page_pool:
+            self._page_pool.shutdown(wait=False, cancel_futures=True)
+            self._page_pool = None
+        self._ocr_executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _prepare_image(self, content: bytes) -> Tuple[np.ndarray, float]:
+        """Decode image bytes to RGB and downscale oversized images; returns the array and its scale."""
+        return _downscale(_decode_to_rgb(content), self.max_long_edge)
+    
+    async def _readtext(self, image_array) -> list:
+        """Run EasyOCR on one image, batched with other images queued at the same time."""
+        if self._queue is None:
+            return await self._run_blocking(self.easyocr_reader.readtext, image_array)
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_array, future))
+        return await future
+    
+    async def _batch_loop(self):
+        """Drain queued images into batches of up to _OCR_MAX_BATCH and recognize them together."""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + _OCR_MAX_WAIT_SECONDS
+            while len(items) < _OCR_MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                results = await self._run_blocking(self._readtext_batch, [image for image, _ in items])
+                for (_, future), result in zip(items, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    def _readtext_batch(self, images: list) -> list:
+        """Recognize a list of images; same-sized images share one batched forward pass."""
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for i, image in enumerate(images):
+            groups.setdefault(image.shape, []).append(i)
+        
+        results = [None] * len(images)
+        for indices in groups.values():
+            if len(indices) == 1:
+                results[indices[0]] = self.easyocr_reader.readtext(images[indices[0]])
+                continue
+            batch = self.easyocr_reader.readtext_batched([images[i] for i in indices], batch_size=len(indices))
+            for i, result in zip(indices, batch):
+                results[i] = result
+        
+        return results
     
     async def extract_text(self, content: bytes, content_type: str) -> str:
         """Extract text from image content using OCR."""
@@ -48,26 +318,29 @@ class OCRProcessor:
                 logger.error("No OCR engines available")
                 return ""
             
-            # Convert content to PIL Image
-            image = Image.open(io.BytesIO(content))
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+            # Decode to an RGB array shared by both engines, capped in size
+            image, _ = await self._run_blocking(self._prepare_image, content)
             
             # Try EasyOCR first (generally better results)
+            easyocr_text = ""
             if self.easyocr_available and self.easyocr_reader:
                 try:
-                    text = await self._extract_with_easyocr(image)
-                    if text.strip():
+                    self.easyocr_count += 1
+                    easyocr_text, confidence, regions = await self._extract_with_easyocr(image)
+                    if regions >= _EASYOCR_MIN_REGIONS and confidence >= _EASYOCR_ACCEPT_CONFIDENCE:
                         logger.info("Successfully extracted text using EasyOCR")
-                        return text
+                        return easyocr_text
+                    if easyocr_text and confidence >= _EASYOCR_FALLBACK_CONFIDENCE:
+                        logger.info(f"Extracted text using EasyOCR (mean confidence {confidence:.2f})")
+                        return easyocr_text
                 except Exception as e:
                     logger.warning(f"EasyOCR failed: {e}")
             
-            # Fallback to Tesseract
+            # Fallback to Tesseract when EasyOCR failed or was unsure
             if self.tesseract_available:
                 try:
+                    if self.easyocr_available and self.easyocr_reader:
+                        self.tesseract_fallback_count += 1
                     text = await self._extract_with_tesseract(image)
                     if text.strip():
                         logger.info("Successfully extracted text using Tesseract")
@@ -75,6 +348,10 @@ class OCRProcessor:
                 except Exception as e:
                     logger.warning(f"Tesseract failed: {e}")
             
+            # Keep a low-confidence EasyOCR result over nothing
+            if easyocr_text:
+                return easyocr_text
+            
             logger.warning("No OCR engine could extract text")
             return ""
             
@@ -82,31 +359,48 @@ class OCRProcessor:
             logger.error(f"Error in OCR processing: {str(e)}")
             return ""
     
-    async def _extract_with_easyocr(self, image: Image.Image) -> str:
-        """Extract text using EasyOCR."""
-        # Convert PIL Image to numpy array for EasyOCR
-        import numpy as np
-        image_array = np.array(image)
+    async def extract_text_many(self, pages: List[bytes], content_type: str = "image/png") -> List[str]:
+        """Extract text from many page images at once, such as the pages of a scanned PDF."""
+        # EasyOCR keeps one model per process, so pages share the reader and are batched together
+        if (self.easyocr_available and self.easyocr_reader) or self._page_pool is None:
+            return list(await asyncio.gather(*(self.extract_text(page, content_type) for page in pages)))
+        
+        # Tesseract alone is CPU-bound; spread the pages across the page pool
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._page_pool, _ocr_page, page) for page in pages),
+            return_exceptions=True
+        )
         
+        texts = []
+        for page_num, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.warning(f"Tesseract failed on page {page_num + 1}: {result}")
+                result = ""
+            texts.append(result)
+        return texts
+    
+    async def _extract_with_easyocr(self, image: np.ndarray) -> Tuple[str, float, int]:
+        """Extract text using EasyOCR; returns the text, mean region confidence and regions kept."""
         # Extract text
-        results = self.easyocr_reader.readtext(image_array)
+        results = await self._readtext(image)
         
         # Combine all detected text
         text_parts = []
+        confidences = []
         for (bbox, text, confidence) in results:
+            confidences.append(confidence)
             # Only include text with reasonable confidence
             if confidence > 0.5:
                 text_parts.append(text)
         
-        return ' '.join(text_parts)
+        mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return ' '.join(text_parts), mean_confidence, len(text_parts)
     
-    async def _extract_with_tesseract(self, image: Image.Image) -> str:
+    async def _extract_with_tesseract(self, image: np.ndarray) -> str:
         """Extract text using Tesseract OCR."""
-        # Configure Tesseract for better results
-        custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz .,!?;:-()[]{}"\''
-        
-        # Extract text
-        text = pytesseract.image_to_string(image, config=custom_config)
+        # Extract text on an OCR thread, which reuses its own Tesseract handle
+        text = await self._run_blocking(_tesseract_image_to_string, image)
         
         # Clean up the text
         text = self._clean_ocr_text(text)
@@ -118,21 +412,8 @@ class OCRProcessor:
         if not text:
             return ""
         
-        # Remove excessive whitespace
-        lines = []
-        for line in text.split('\n'):
-            line = line.strip()
-            if line:
-                lines.append(line)
-        
-        # Join lines with proper spacing
-        cleaned_text = ' '.join(lines)
-        
-        # Remove multiple spaces
-        import re
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-        
-        return cleaned_text.strip()
+        # Join lines and remove excessive whitespace in one pass
+        return _WS_RE.sub(' ', text).strip()
     
     async def extract_text_with_coordinates(self, content: bytes, content_type: str) -> list:
         """Extract text with bounding box coordinates (useful for layout analysis)."""
@@ -141,15 +422,10 @@ class OCRProcessor:
                 logger.warning("Coordinate extraction requires EasyOCR")
                 return []
             
-            image = Image.open(io.BytesIO(content))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            import numpy as np
-            image_array = np.array(image)
+            image_array, scale = await self._run_blocking(self._prepare_image, content)
             
             # Extract text with coordinates
-            results = self.easyocr_reader.readtext(image_array)
+            results = await self._readtext(image_array)
             
             # Format results
             text_regions = []
@@ -158,7 +434,8 @@ class OCRProcessor:
                     text_regions.append({
                         'text': text,
                         'confidence': confidence,
-                        'bbox': bbox,  # List of 4 (x, y) coordinates
+                        # List of 4 (x, y) coordinates in the original image
+                        'bbox': [[x / scale, y / scale] for x, y in bbox],
                     })
             
             return text_regions
@@ -173,19 +450,12 @@ class OCRProcessor:
     
     def get_supported_languages(self) -> list:
         """Get list of supported languages."""
-        languages = []
-        
-        if self.tesseract_available:
-            try:
-                # Get Tesseract languages
-                tesseract_langs = pytesseract.get_languages()
-                languages.extend(tesseract_langs)
-            except Exception:
-                pass
-        
-        if self.easyocr_available:
-            # EasyOCR supported languages
-            easyocr_langs = ['en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'ja', 'ko', 'zh']
-            languages.extend(easyocr_langs)
+        if self._supported_languages is None:
+            languages = set()
+            if self.tesseract_available:
+                languages.update(_tesseract_langs())
+            if self.easyocr_available:
+                languages.update(_EASYOCR_SUPPORTED_LANGUAGES)
+            self._supported_languages = sorted(languages)
         
-        return list(set(languages))  # Remove duplicates
+        return list(self._supported_languages)
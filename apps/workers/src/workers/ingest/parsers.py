@@ -2,34 +2,421 @@
 Document and media parsers for the ingest pipeline.
 """
 
+import asyncio
+import codecs
+import hashlib
+import importlib
+import importlib.util
 import io
+import json
 import logging
-from typing import Dict, Any, Optional
+import re
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
-# Document parsing libraries
+# Heavy parsing libraries are imported by _import on first use, so a worker only pays
+# startup time and memory for the formats it actually sees
+_LAZY_LIBRARIES = ("PyPDF2", "docx", "bs4", "markdown", "PIL", "mutagen")
+_missing_libraries = [name for name in _LAZY_LIBRARIES if importlib.util.find_spec(name) is None]
+if _missing_libraries:
+    logging.warning(f"Some parsing libraries not available: {', '.join(_missing_libraries)}")
+
+# PyMuPDF parses PDFs far faster than PyPDF2, which stays as the fallback
+HAS_PYMUPDF = importlib.util.find_spec("fitz") is not None
+
+# selectolax parses HTML in C; BeautifulSoup stays as the fallback
+try:
+    from selectolax.parser import HTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+# markdown-it-py tokenizes Markdown once; Python-Markdown plus BeautifulSoup stays as the fallback
 try:
-    import PyPDF2
-    from docx import Document as DocxDocument
-    from bs4 import BeautifulSoup
-    import markdown
-except ImportError as e:
-    logging.warning(f"Some parsing libraries not available: {e}")
-
-# Media processing libraries
+    from markdown_it import MarkdownIt
+    from mdit_py_plugins.front_matter import front_matter_plugin
+    HAS_MARKDOWN_IT = True
+except ImportError:
+    HAS_MARKDOWN_IT = False
+
+# lxml streams DOCX body XML; python-docx, which builds the whole document tree, stays as the fallback
+try:
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# simdjson decodes large JSON documents several times faster than orjson
 try:
-    from PIL import Image, ExifTags
-    import mutagen
-except ImportError as e:
-    logging.warning(f"Some media libraries not available: {e}")
+    import simdjson
+    HAS_SIMDJSON = True
+except ImportError:
+    HAS_SIMDJSON = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# blake3 hashes content for the parse cache; hashlib's blake2b stays as the fallback
+try:
+    from blake3 import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+
+try:
+    from charset_normalizer import from_bytes
+    HAS_CHARSET_NORMALIZER = True
+except ImportError:
+    HAS_CHARSET_NORMALIZER = False
+
+from ..shared.config import pool_workers
 
 logger = logging.getLogger(__name__)
 
+# PDFs averaging fewer extracted characters per page than this are treated as scanned
+_MIN_TEXT_CHARS_PER_PAGE = 100
+
+# Resolution scanned PDF pages are rendered at for OCR
+_OCR_RENDER_DPI = 200
+
+# A first page with images and fewer extracted characters than this marks a scanned PDF,
+# which is rendered for OCR without extracting text from the remaining pages
+_SCANNED_FIRST_PAGE_MAX_CHARS = 20
+
+# PDFs with at least this many pages are split across the parser pool, in ranges of at least
+# _PDF_MIN_PAGES_PER_TASK pages so dispatch stays cheap next to extraction
+_PARALLEL_PDF_MIN_PAGES = 32
+_PDF_MIN_PAGES_PER_TASK = 8
+
+# Streamed documents other than long PDFs are cut into sections of about this many characters,
+# at paragraph breaks where possible
+_STREAM_SECTION_CHARS = 8000
+
+# Parsed documents kept by content digest, so re-ingesting identical bytes skips the parser
+_PARSE_CACHE_SIZE = 1024
+
+# JSON documents at least this large are decoded with simdjson
+_SIMDJSON_MIN_BYTES = 100 * 1024
+
+# Byte order marks and the codecs that decode them (the utf-16 codec consumes its own BOM)
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Text encodings are detected from this many leading bytes
+_ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# Content types by file extension, for uploads sent without a useful content type
+_SUFFIX_TO_MIME = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.txt': 'text/plain',
+    '.html': 'text/html',
+    '.htm': 'text/html',
+    '.md': 'text/markdown',
+    '.json': 'application/json',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+# Content types that say nothing about the format, including a missing one
+_GENERIC_CONTENT_TYPES = frozenset({'application/octet-stream', 'binary/octet-stream', ''})
+
+# Prefix of content types that may hold text only OCR can recover
+_IMAGE_PREFIX = 'image/'
+
+# Extracted text cleanup: collapse runs of spaces, trim around line breaks, keep at most one blank line
+_WS_RUN = re.compile(r'[ \t\r\f\v]+')
+_LINE_EDGES = re.compile(r' ?\n ?')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+# WordprocessingML tags read when streaming a DOCX body
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_TEXT = _W + 't'
+_W_PARAGRAPH = _W + 'p'
+_W_CELL = _W + 'tc'
+_W_ROW = _W + 'tr'
+_W_TABLE = _W + 'tbl'
+
+# DOCX core properties and the metadata keys they map to
+_DOCX_CORE_PROPERTIES = {
+    '{http://purl.org/dc/elements/1.1/}title': 'title',
+    '{http://purl.org/dc/elements/1.1/}creator': 'author',
+    '{http://purl.org/dc/elements/1.1/}subject': 'subject',
+    '{http://purl.org/dc/terms/}created': 'created',
+    '{http://purl.org/dc/terms/}modified': 'modified',
+}
+
+# <meta name=...> fields copied into HTML metadata
+_HTML_META_FIELDS = ('description', 'keywords')
+
+# Per-thread simdjson parsers; a parser reuses its buffers but holds one document at a time
+_simdjson_local = threading.local()
+
+# Markdown tokenizer, built on first use in each process
+_markdown_it = None
+
+# Parser instances inside pool processes, one per parser class
+_worker_parsers: Dict[type, Any] = {}
+
+
+@lru_cache(maxsize=None)
+def _import(module_name: str) -> Any:
+    """Import a parsing library on first use."""
+    return importlib.import_module(module_name)
+
+
+def _content_digest(content: bytes) -> bytes:
+    """Digest identifying document bytes in the parse cache."""
+    if HAS_BLAKE3:
+        return blake3(content).digest()
+    return hashlib.blake2b(content, digest_size=32).digest()
+
+
+def _html_meta(pairs) -> Dict[str, str]:
+    """Pick the first content of each wanted meta name from (name, content) pairs in one pass."""
+    found = {}
+    for name, content in pairs:
+        if name in _HTML_META_FIELDS and name not in found:
+            found[name] = content or ""
+    return {field: found.get(field, "") for field in _HTML_META_FIELDS}
+
+
+def _docx_text(paragraphs: List[str], tables_text: List[str]) -> str:
+    """Lay out DOCX paragraphs and then table rows in a single join."""
+    parts = []
+    for paragraph in paragraphs:
+        parts.append(paragraph)
+        parts.append("\n\n")
+    if parts:
+        parts.pop()
+    if tables_text:
+        parts.append("\n\n[Tables]\n")
+        for row in tables_text:
+            parts.append(row)
+            parts.append("\n")
+        parts.pop()
+    return "".join(parts)
+
+
+def _run_parser(parser_cls: type, method_name: str, *args) -> Any:
+    """Run one parse method inside a pool process."""
+    parser = _worker_parsers.get(parser_cls)
+    if parser is None:
+        parser = _worker_parsers[parser_cls] = parser_cls()
+    return getattr(parser, method_name)(*args)
+
+
+@lru_cache(maxsize=512)
+def _normalize_content_type(content_type: str) -> str:
+    """Lowercase a content type and drop parameters such as charset."""
+    return content_type.split(';', 1)[0].strip().lower()
+
+
+def _pdf_metadata(doc) -> Dict[str, Any]:
+    """Page count and document info of an open PyMuPDF document."""
+    doc_metadata = doc.metadata or {}
+    return {
+        "pages": doc.page_count,
+        "title": doc_metadata.get('title', ''),
+        "author": doc_metadata.get('author', ''),
+        "subject": doc_metadata.get('subject', ''),
+    }
+
+
+def _pdf_looks_scanned(doc) -> bool:
+    """Whether the first page is images with next to no text, as in a scanned document."""
+    if not doc.page_count:
+        return False
+    first_page = doc[0]
+    return (len(first_page.get_text("text").strip()) < _SCANNED_FIRST_PAGE_MAX_CHARS
+            and bool(first_page.get_images()))
+
+
+def _pdf_info(content: bytes) -> Tuple[Dict[str, Any], bool]:
+    """Page count and document info of a PDF, and whether it looks scanned."""
+    with _import("fitz").open(stream=content, filetype="pdf") as doc:
+        return _pdf_metadata(doc), _pdf_looks_scanned(doc)
+
+
+def _pdf_pages(doc, start: int, stop: int, render: bool = False) -> List[Any]:
+    """Text of pages [start, stop), or their PNG renders when render; None for pages that fail."""
+    results = []
+    for page_num in range(start, stop):
+        try:
+            page = doc[page_num]
+            results.append(page.get_pixmap(dpi=_OCR_RENDER_DPI).tobytes("png") if render else page.get_text("text"))
+        except Exception as e:
+            logger.warning(f"Error {'rendering' if render else 'extracting text from'} page {page_num + 1}: {e}")
+            results.append(None)
+    return results
+
+
+def _pdf_page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split pages into contiguous ranges, one per pool worker but never smaller than _PDF_MIN_PAGES_PER_TASK."""
+    pages_per_task = max(_PDF_MIN_PAGES_PER_TASK, -(-page_count // workers))
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+
+def _pdf_needs_ocr(page_texts: List[Optional[str]]) -> bool:
+    """Whether too little text was extracted for the page count, as in a scanned document."""
+    chars = sum(len(text.strip()) for text in page_texts if text)
+    return chars < _MIN_TEXT_CHARS_PER_PAGE * max(len(page_texts), 1)
+
 
-class DocumentParser:
+def _pdf_result(metadata: Dict[str, Any], page_texts: List[Optional[str]],
+                page_images: List[Optional[bytes]]) -> Dict[str, Any]:
+    """Assemble a PDF parse result from per-page text and renders."""
+    text_content = [
+        f"[Page {page_num + 1}]\n{text}"
+        for page_num, text in enumerate(page_texts) if text and text.strip()
+    ]
+    return {
+        "text": "\n\n".join(text_content),
+        "metadata": metadata,
+        "needs_ocr": _pdf_needs_ocr(page_texts),
+        "page_images": [image for image in page_images if image]
+    }
+
+
+def _text_sections(text: str) -> List[str]:
+    """Cut text into sections of about _STREAM_SECTION_CHARS that concatenate back to text, keeping paragraphs whole where they fit."""
+    # Each paragraph keeps its trailing break, so no separator is lost between sections
+    blocks = text.split("\n\n")
+    sections = []
+    current = ""
+    for block in [block + "\n\n" for block in blocks[:-1]] + blocks[-1:]:
+        if current and len(current) + len(block) > _STREAM_SECTION_CHARS:
+            sections.append(current)
+            current = ""
+        current += block
+    sections.append(current)
+    
+    # Paragraphs longer than a section, such as plain text without blank lines, are cut at fixed size
+    return [
+        section[start:start + _STREAM_SECTION_CHARS]
+        for section in sections
+        for start in range(0, max(len(section), 1), _STREAM_SECTION_CHARS)
+    ]
+
+
+def _json_loads(content: bytes) -> Any:
+    """Decode JSON, with simdjson for large documents and orjson or the stdlib otherwise.
+    
+    Large objects and arrays come back as simdjson proxies, valid until this thread parses again.
+    """
+    if HAS_SIMDJSON and len(content) >= _SIMDJSON_MIN_BYTES:
+        parser = getattr(_simdjson_local, "parser", None)
+        if parser is None:
+            parser = _simdjson_local.parser = simdjson.Parser()
+        return parser.parse(content)
+    if HAS_ORJSON:
+        return orjson.loads(content)
+    return json.loads(content.decode('utf-8', errors='replace'))
+
+
+def _markdown_text(md_content: str) -> Tuple[str, Dict[str, str]]:
+    """Plain text and front-matter metadata of a Markdown document, from one token pass."""
+    global _markdown_it
+    if _markdown_it is None:
+        _markdown_it = MarkdownIt().use(front_matter_plugin)
+    
+    blocks = []
+    metadata = {}
+    for token in _markdown_it.parse(md_content):
+        if token.type == "front_matter":
+            for line in token.content.splitlines():
+                key, sep, value = line.partition(':')
+                if sep and key.strip():
+                    metadata[key.strip().lower()] = value.strip()
+        elif token.type == "inline":
+            parts = []
+            for child in token.children or []:
+                if child.type in ("text", "code_inline", "image"):
+                    # An image's content is its alt text
+                    parts.append(child.content)
+                elif child.type in ("softbreak", "hardbreak"):
+                    parts.append("\n")
+            blocks.append("".join(parts))
+        elif token.type in ("code_block", "fence"):
+            blocks.append(token.content)
+    
+    return _clean_text('\n\n'.join(blocks)), metadata
+
+
+def _detect_encoding(content: bytes) -> str:
+    """Pick a text encoding from the BOM, or from a sample of the content."""
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+    
+    sample = content[:_ENCODING_SAMPLE_BYTES]
+    try:
+        # Not final: the sample may end partway through a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    
+    if HAS_CHARSET_NORMALIZER:
+        match = from_bytes(sample).best()
+        if match:
+            return match.encoding
+    return 'cp1252'
+
+
+def _clean_text(text: str) -> str:
+    """Normalize whitespace in extracted text, keeping paragraph breaks."""
+    text = _LINE_EDGES.sub('\n', _WS_RUN.sub(' ', text))
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+class _PooledParser:
+    """Base for parsers whose synchronous parse methods run in a process pool."""
+    
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or pool_workers()
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    async def initialize(self):
+        """Start the parser process pool."""
+        # Parsing is pure CPU work in PyMuPDF, docx, BeautifulSoup, PIL and mutagen
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+    
+    async def cleanup(self):
+        """Shut down the parser process pool."""
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    async def _run(self, parser_func: Callable[..., Any], *args) -> Any:
+        """Run a parse method off the event loop, in the process pool once it is started."""
+        if self._pool is None:
+            return await asyncio.to_thread(parser_func, *args)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, _run_parser, type(self), parser_func.__name__, *args
+        )
+
+
+class DocumentParser(_PooledParser):
     """Parser for various document formats."""
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
+        super().__init__(max_workers)
         self.supported_types = {
             'application/pdf': self._parse_pdf,
             'application/vnd.openxmlformats-officedocument.wordprocessingml.document': self._parse_docx,
@@ -38,31 +425,33 @@ class DocumentParser:
             'text/markdown': self._parse_markdown,
             'application/json': self._parse_json,
         }
+        self._parsed: "OrderedDict[Tuple[bytes, str], Dict[str, Any]]" = OrderedDict()
     
     async def parse(self, content: bytes, content_type: str, filename: str) -> Dict[str, Any]:
-        """Parse document content based on type."""
+        """Parse document content based on type, collecting the sections of parse_stream into one result."""
         try:
-            # Normalize content type
-            content_type = content_type.lower() if content_type else ""
+            content_type = self._resolve_type(content_type, filename)
             
-            # Try to determine type from filename if content_type is generic
-            if content_type in ['application/octet-stream', 'binary/octet-stream'] or not content_type:
-                content_type = self._guess_type_from_filename(filename)
-            
-            # Get appropriate parser
-            parser_func = self.supported_types.get(content_type)
+            # Identical bytes parse identically; serve repeats from the cache
+            cache_key = (_content_digest(content), content_type)
+            cached = self._parsed.get(cache_key)
+            if cached is not None:
+                self._parsed.move_to_end(cache_key)
+                return dict(cached)
             
-            if not parser_func:
-                logger.warning(f"No parser for content type: {content_type}")
-                return {
-                    "text": "",
-                    "metadata": {"error": f"Unsupported content type: {content_type}"},
-                    "needs_ocr": self._is_image_type(content_type)
-                }
+            sections = [section async for section in self.parse_stream(content, content_type, filename)]
+            result = {key: value for key, value in sections[0].items() if key != "section"}
+            result["text"] = "".join(section["text"] for section in sections)
+            result["needs_ocr"] = any(section.get("needs_ocr") for section in sections)
+            page_images = [image for section in sections for image in section.get("page_images", [])]
+            if page_images:
+                result["page_images"] = page_images
             
-            # Parse content
-            result = await parser_func(content, filename)
-            result["content_type"] = content_type
+            # Cache successful parses; rendered page images are too large to keep around
+            if "error" not in result.get("metadata", {}) and not result.get("page_images"):
+                self._parsed[cache_key] = dict(result)
+                if len(self._parsed) > _PARSE_CACHE_SIZE:
+                    self._parsed.popitem(last=False)
             
             return result
             
@@ -74,36 +463,179 @@ class DocumentParser:
                 "needs_ocr": False
             }
     
+    async def parse_stream(self, content: bytes, content_type: str, filename: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a document as a series of partial parse results so later stages can start early.
+        
+        Each section has the keys of a parse() result plus its "section" index, and section texts
+        concatenate to the full document text. Long text PDFs yield each page as soon as the pool
+        has extracted its page range; other documents are parsed whole and yielded in paragraph
+        batches. A section with needs_ocr set must go through OCR instead, using page_images when
+        present.
+        """
+        content_type = self._resolve_type(content_type, filename)
+        
+        if content_type == 'application/pdf' and HAS_PYMUPDF and self._pool is not None:
+            try:
+                metadata, scanned = await asyncio.to_thread(_pdf_info, content)
+            except Exception as e:
+                logger.warning(f"Could not read PDF info for {filename}, parsing it whole: {e}")
+            else:
+                if not scanned and metadata["pages"] >= _PARALLEL_PDF_MIN_PAGES:
+                    async for section in self._stream_pdf_pages(content, metadata):
+                        yield section
+                    return
+        
+        result = await self._parse_whole(content, content_type, filename)
+        if result.get("needs_ocr"):
+            yield {**result, "section": 0}
+            return
+        
+        for index, text in enumerate(_text_sections(result.get("text", ""))):
+            yield {**result, "text": text, "section": index}
+    
+    async def _parse_whole(self, content: bytes, content_type: str, filename: str) -> Dict[str, Any]:
+        """Parse a whole document of an already resolved content type."""
+        parser_func = self.supported_types.get(content_type)
+        if not parser_func:
+            logger.warning(f"No parser for content type: {content_type}")
+            return {
+                "text": "",
+                "metadata": {"error": f"Unsupported content type: {content_type}"},
+                "needs_ocr": self._is_image_type(content_type)
+            }
+        
+        # Long PDFs are split by page range across the pool
+        if parser_func == self._parse_pdf and HAS_PYMUPDF and self._pool is not None:
+            result = await self._parse_pdf_parallel(content, filename)
+        else:
+            result = await self._run(parser_func, content, filename)
+        result["content_type"] = content_type
+        return result
+    
+    async def _stream_pdf_pages(self, content: bytes, metadata: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each page of a long PDF in order as soon as the pool has extracted its range."""
+        ranges = _pdf_page_ranges(metadata["pages"], self.max_workers)
+        tasks = [
+            asyncio.ensure_future(self._run(self._pdf_page_range, content, start, stop, False))
+            for start, stop in ranges
+        ]
+        
+        page_texts = []
+        separator = ""
+        try:
+            for task in tasks:
+                for text in await task:
+                    page_num = len(page_texts)
+                    page_texts.append(text)
+                    if text and text.strip():
+                        yield {
+                            "text": f"{separator}[Page {page_num + 1}]\n{text}",
+                            "metadata": metadata,
+                            "needs_ocr": False,
+                            "content_type": 'application/pdf',
+                            "section": page_num
+                        }
+                        separator = "\n\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        # Too little text across the whole document means it is scanned after all
+        if _pdf_needs_ocr(page_texts):
+            parts = await asyncio.gather(*(
+                self._run(self._pdf_page_range, content, start, stop, True) for start, stop in ranges
+            ))
+            yield {
+                "text": "",
+                "metadata": metadata,
+                "needs_ocr": True,
+                "page_images": [image for part in parts for image in part if image],
+                "content_type": 'application/pdf',
+                "section": len(page_texts)
+            }
+    
+    def _resolve_type(self, content_type: Optional[str], filename: str) -> str:
+        """Normalized content type, guessed from the filename when it is missing or generic."""
+        content_type = _normalize_content_type(content_type) if content_type else ""
+        if content_type in _GENERIC_CONTENT_TYPES:
+            content_type = self._guess_type_from_filename(filename)
+        return content_type
+    
     def _guess_type_from_filename(self, filename: str) -> str:
         """Guess content type from filename extension."""
         suffix = Path(filename).suffix.lower()
-        
-        type_map = {
-            '.pdf': 'application/pdf',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            '.txt': 'text/plain',
-            '.html': 'text/html',
-            '.htm': 'text/html',
-            '.md': 'text/markdown',
-            '.json': 'application/json',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp',
-        }
-        
-        return type_map.get(suffix, 'application/octet-stream')
+        return _SUFFIX_TO_MIME.get(suffix, 'application/octet-stream')
     
     def _is_image_type(self, content_type: str) -> bool:
         """Check if content type is an image that might need OCR."""
-        return content_type.startswith('image/')
+        return content_type.startswith(_IMAGE_PREFIX)
     
-    async def _parse_pdf(self, content: bytes, filename: str) -> Dict[str, Any]:
+    def _parse_pdf(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse PDF document."""
+        if not HAS_PYMUPDF:
+            return self._parse_pdf_pypdf2(content, filename)
+        
+        try:
+            with _import("fitz").open(stream=content, filetype="pdf") as doc:
+                metadata = _pdf_metadata(doc)
+                
+                # A scanned first page skips text extraction for the rest of the document
+                page_texts = [] if _pdf_looks_scanned(doc) else _pdf_pages(doc, 0, doc.page_count)
+                
+                # Render scanned pages so OCR sees the whole page, not just embedded images
+                page_images = []
+                if _pdf_needs_ocr(page_texts):
+                    page_images = _pdf_pages(doc, 0, doc.page_count, render=True)
+            
+            return _pdf_result(metadata, page_texts, page_images)
+            
+        except Exception as e:
+            logger.error(f"Error parsing PDF {filename}: {str(e)}")
+            return {
+                "text": "",
+                "metadata": {"error": str(e)},
+                "needs_ocr": True  # Fallback to OCR
+            }
+    
+    def _pdf_page_range(self, content: bytes, start: int, stop: int, render: bool) -> List[Any]:
+        """Extract text, or render images when render, for pages [start, stop) of a PDF."""
+        # PyMuPDF documents cannot be pickled, so each pool task reopens the bytes
+        with _import("fitz").open(stream=content, filetype="pdf") as doc:
+            return _pdf_pages(doc, start, stop, render)
+    
+    async def _parse_pdf_parallel(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse a long PDF with its pages split into ranges across the parser pool."""
+        try:
+            metadata, scanned = await asyncio.to_thread(_pdf_info, content)
+            page_count = metadata["pages"]
+            if page_count < _PARALLEL_PDF_MIN_PAGES:
+                return await self._run(self._parse_pdf, content, filename)
+            
+            ranges = _pdf_page_ranges(page_count, self.max_workers)
+            
+            async def pages(render: bool) -> List[Any]:
+                parts = await asyncio.gather(*(
+                    self._run(self._pdf_page_range, content, start, stop, render) for start, stop in ranges
+                ))
+                return [page for part in parts for page in part]
+            
+            page_texts = [] if scanned else await pages(False)
+            page_images = await pages(True) if _pdf_needs_ocr(page_texts) else []
+            return _pdf_result(metadata, page_texts, page_images)
+            
+        except Exception as e:
+            logger.error(f"Error parsing PDF {filename}: {str(e)}")
+            return {
+                "text": "",
+                "metadata": {"error": str(e)},
+                "needs_ocr": True  # Fallback to OCR
+            }
+    
+    def _parse_pdf_pypdf2(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse PDF document with PyPDF2 when PyMuPDF is not installed."""
         try:
             pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            pdf_reader = _import("PyPDF2").PdfReader(pdf_file)
             
             text_content = []
             metadata = {
@@ -124,13 +656,25 @@ class DocumentParser:
             
             full_text = "\n\n".join(text_content)
             
-            # If no text extracted, might need OCR
-            needs_ocr = len(full_text.strip()) < 100
+            # If little text was extracted for the page count, might need OCR
+            needs_ocr = len(full_text.strip()) < _MIN_TEXT_CHARS_PER_PAGE * max(len(pdf_reader.pages), 1)
+            
+            # Scanned pages embed their bitmap as an image; keep the largest one per page for OCR
+            page_images = []
+            if needs_ocr:
+                for page_num, page in enumerate(pdf_reader.pages):
+                    try:
+                        images = page.images
+                        if images:
+                            page_images.append(max(images, key=lambda image: len(image.data)).data)
+                    except Exception as e:
+                        logger.warning(f"Error extracting image from page {page_num + 1}: {e}")
             
             return {
                 "text": full_text,
                 "metadata": metadata,
-                "needs_ocr": needs_ocr
+                "needs_ocr": needs_ocr,
+                "page_images": page_images
             }
             
         except Exception as e:
@@ -141,33 +685,120 @@ class DocumentParser:
                 "needs_ocr": True  # Fallback to OCR
             }
     
-    async def _parse_docx(self, content: bytes, filename: str) -> Dict[str, Any]:
-        """Parse DOCX document."""
+    def _parse_docx(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse DOCX document by streaming its body XML out of the zip."""
+        if not HAS_LXML:
+            return self._parse_docx_python_docx(content, filename)
+        
+        try:
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                with archive.open('word/document.xml') as body:
+                    paragraphs, tables_text, table_count = self._docx_body_text(body)
+                
+                metadata = dict.fromkeys(_DOCX_CORE_PROPERTIES.values(), "")
+                if 'docProps/core.xml' in archive.namelist():
+                    core = etree.fromstring(archive.read('docProps/core.xml'))
+                    for element in core:
+                        key = _DOCX_CORE_PROPERTIES.get(element.tag)
+                        if key and element.text:
+                            metadata[key] = element.text.strip()
+            
+            # Combine all text
+            full_text = _docx_text(paragraphs, tables_text)
+            
+            metadata["paragraphs"] = len(paragraphs)
+            metadata["tables"] = table_count
+            
+            return {
+                "text": full_text,
+                "metadata": metadata,
+                "needs_ocr": False
+            }
+            
+        except Exception as e:
+            logger.error(f"Error parsing DOCX {filename}: {str(e)}")
+            return {
+                "text": "",
+                "metadata": {"error": str(e)},
+                "needs_ocr": False
+            }
+    
+    def _docx_body_text(self, body) -> Tuple[List[str], List[str], int]:
+        """Stream w:t runs into body paragraphs and table rows, clearing elements as they close."""
+        paragraphs = []
+        tables_text = []
+        table_count = 0
+        table_depth = 0
+        runs = []
+        cell_paragraphs = []
+        row_cells = []
+        
+        for event, element in etree.iterparse(body, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                if tag == _W_TABLE:
+                    table_depth += 1
+                continue
+            
+            if tag == _W_TEXT:
+                runs.append(element.text or "")
+                continue
+            
+            if tag == _W_PARAGRAPH:
+                text = "".join(runs)
+                runs = []
+                if table_depth:
+                    cell_paragraphs.append(text)
+                elif text.strip():
+                    paragraphs.append(text)
+            elif tag == _W_CELL:
+                cell_text = "\n".join(cell_paragraphs).strip()
+                cell_paragraphs = []
+                if cell_text:
+                    row_cells.append(cell_text)
+            elif tag == _W_ROW:
+                if row_cells:
+                    tables_text.append(" | ".join(row_cells))
+                row_cells = []
+            elif tag == _W_TABLE:
+                table_depth -= 1
+                if not table_depth:
+                    table_count += 1
+            else:
+                continue
+            
+            element.clear()
+        
+        return paragraphs, tables_text, table_count
+    
+    def _parse_docx_python_docx(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse DOCX document with python-docx."""
         try:
             docx_file = io.BytesIO(content)
-            doc = DocxDocument(docx_file)
+            doc = _import("docx").Document(docx_file)
             
             # Extract text from paragraphs
             paragraphs = []
             for para in doc.paragraphs:
-                if para.text.strip():
-                    paragraphs.append(para.text)
+                text = para.text
+                if text.strip():
+                    paragraphs.append(text)
             
-            # Extract text from tables
+            # Extract text from tables; python-docx rebuilds doc.tables on every access
+            tables = doc.tables
             tables_text = []
-            for table in doc.tables:
+            for table in tables:
                 for row in table.rows:
                     row_text = []
                     for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
+                        cell_text = cell.text.strip()
+                        if cell_text:
+                            row_text.append(cell_text)
                     if row_text:
                         tables_text.append(" | ".join(row_text))
             
             # Combine all text
-            full_text = "\n\n".join(paragraphs)
-            if tables_text:
-                full_text += "\n\n[Tables]\n" + "\n".join(tables_text)
+            full_text = _docx_text(paragraphs, tables_text)
             
             # Extract metadata
             core_props = doc.core_properties
@@ -178,7 +809,7 @@ class DocumentParser:
                 "created": str(core_props.created) if core_props.created else "",
                 "modified": str(core_props.modified) if core_props.modified else "",
                 "paragraphs": len(paragraphs),
-                "tables": len(doc.tables)
+                "tables": len(tables)
             }
             
             return {
@@ -195,26 +826,12 @@ class DocumentParser:
                 "needs_ocr": False
             }
     
-    async def _parse_text(self, content: bytes, filename: str) -> Dict[str, Any]:
+    def _parse_text(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse plain text document."""
         try:
-            # Try different encodings
-            encodings = ['utf-8', 'utf-16', 'latin-1', 'cp1252']
-            text = None
-            encoding_used = None
-            
-            for encoding in encodings:
-                try:
-                    text = content.decode(encoding)
-                    encoding_used = encoding
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if text is None:
-                # Fallback: decode with errors='replace'
-                text = content.decode('utf-8', errors='replace')
-                encoding_used = 'utf-8 (with errors)'
+            # Detect the encoding once, then decode in a single pass
+            encoding_used = _detect_encoding(content)
+            text = content.decode(encoding_used, errors='replace')
             
             metadata = {
                 "encoding": encoding_used,
@@ -236,24 +853,63 @@ class DocumentParser:
                 "needs_ocr": False
             }
     
-    async def _parse_html(self, content: bytes, filename: str) -> Dict[str, Any]:
+    def _parse_html(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse HTML document."""
+        if not HAS_SELECTOLAX:
+            return self._parse_html_bs4(content, filename)
+        
+        try:
+            tree = HTMLParser(content.decode('utf-8', errors='replace'))
+            
+            # Extract metadata
+            title = tree.css_first('title')
+            metadata = {
+                "title": title.text() if title else "",
+                **_html_meta(
+                    (node.attributes.get('name'), node.attributes.get('content'))
+                    for node in tree.css('meta[name]')
+                ),
+            }
+            
+            # Remove script and style elements
+            for node in tree.css('script, style'):
+                node.decompose()
+            
+            # Extract text
+            root = tree.body or tree.root
+            text = root.text(separator='\n') if root else ""
+            
+            return {
+                "text": _clean_text(text),
+                "metadata": metadata,
+                "needs_ocr": False
+            }
+            
+        except Exception as e:
+            logger.error(f"Error parsing HTML {filename}: {str(e)}")
+            return {
+                "text": "",
+                "metadata": {"error": str(e)},
+                "needs_ocr": False
+            }
+    
+    def _parse_html_bs4(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse HTML document with BeautifulSoup when selectolax is not installed."""
         try:
             # Decode content
             html_content = content.decode('utf-8', errors='replace')
             
             # Parse with BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = _import("bs4").BeautifulSoup(html_content, 'html.parser')
             
             # Extract metadata
             title = soup.find('title')
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-            
             metadata = {
                 "title": title.get_text() if title else "",
-                "description": meta_desc.get('content', '') if meta_desc else "",
-                "keywords": meta_keywords.get('content', '') if meta_keywords else "",
+                **_html_meta(
+                    (meta.get('name'), meta.get('content'))
+                    for meta in soup.find_all('meta', attrs={'name': True})
+                ),
             }
             
             # Remove script and style elements
@@ -264,9 +920,7 @@ class DocumentParser:
             text = soup.get_text()
             
             # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
+            text = _clean_text(text)
             
             return {
                 "text": text,
@@ -282,14 +936,36 @@ class DocumentParser:
                 "needs_ocr": False
             }
     
-    async def _parse_markdown(self, content: bytes, filename: str) -> Dict[str, Any]:
+    def _parse_markdown(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse Markdown document."""
+        if not HAS_MARKDOWN_IT:
+            return self._parse_markdown_bs4(content, filename)
+        
+        try:
+            text, metadata = _markdown_text(content.decode('utf-8', errors='replace'))
+            
+            return {
+                "text": text,
+                "metadata": metadata,
+                "needs_ocr": False
+            }
+            
+        except Exception as e:
+            logger.error(f"Error parsing Markdown {filename}: {str(e)}")
+            return {
+                "text": "",
+                "metadata": {"error": str(e)},
+                "needs_ocr": False
+            }
+    
+    def _parse_markdown_bs4(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse Markdown document through HTML when markdown-it-py is not installed."""
         try:
             # Decode content
             md_content = content.decode('utf-8', errors='replace')
             
             # Convert to HTML first to extract metadata
-            md = markdown.Markdown(extensions=['meta'])
+            md = _import("markdown").Markdown(extensions=['meta'])
             html = md.convert(md_content)
             
             # Extract metadata from markdown meta extension
@@ -299,12 +975,11 @@ class DocumentParser:
                     metadata[key] = value[0] if isinstance(value, list) and len(value) == 1 else value
             
             # Use BeautifulSoup to extract clean text from HTML
-            soup = BeautifulSoup(html, 'html.parser')
+            soup = _import("bs4").BeautifulSoup(html, 'html.parser')
             text = soup.get_text()
             
             # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            text = '\n'.join(line for line in lines if line)
+            text = _clean_text(text)
             
             return {
                 "text": text,
@@ -320,21 +995,24 @@ class DocumentParser:
                 "needs_ocr": False
             }
     
-    async def _parse_json(self, content: bytes, filename: str) -> Dict[str, Any]:
+    def _parse_json(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse JSON document."""
         try:
-            import json
-            
-            # Decode and parse JSON
+            # Decoding validates the document; objects and arrays keep their original text,
+            # since re-indenting only adds tokens for the embedder
+            data = _json_loads(content)
             json_content = content.decode('utf-8', errors='replace')
-            data = json.loads(json_content)
-            
-            # Convert JSON to readable text
-            text = json.dumps(data, indent=2, ensure_ascii=False)
+            opening = json_content.lstrip('\ufeff \t\r\n')[:1]
+            if opening in ('{', '['):
+                text = json_content
+                data_type = 'dict' if opening == '{' else 'list'
+            else:
+                text = orjson.dumps(data).decode() if HAS_ORJSON else json.dumps(data, ensure_ascii=False)
+                data_type = type(data).__name__
             
             metadata = {
-                "type": type(data).__name__,
-                "size": len(str(data)) if isinstance(data, (dict, list)) else 1
+                "type": data_type,
+                "size": len(content)
             }
             
             return {
@@ -352,10 +1030,11 @@ class DocumentParser:
             }
 
 
-class MediaParser:
+class MediaParser(_PooledParser):
     """Parser for media files (images, audio, video)."""
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
+        super().__init__(max_workers)
         self.supported_types = {
             'image/jpeg': self._parse_image,
             'image/png': self._parse_image,
@@ -371,7 +1050,7 @@ class MediaParser:
     async def parse(self, content: bytes, content_type: str, filename: str) -> Dict[str, Any]:
         """Parse media content based on type."""
         try:
-            content_type = content_type.lower() if content_type else ""
+            content_type = _normalize_content_type(content_type) if content_type else ""
             
             parser_func = self.supported_types.get(content_type)
             
@@ -381,7 +1060,7 @@ class MediaParser:
                     "metadata": {"error": f"Unsupported media type: {content_type}"}
                 }
             
-            result = await parser_func(content, filename)
+            result = await self._run(parser_func, content, filename)
             result["content_type"] = content_type
             
             return result
@@ -392,26 +1071,27 @@ class MediaParser:
                 "metadata": {"error": str(e)}
             }
     
-    async def _parse_image(self, content: bytes, filename: str) -> Dict[str, Any]:
+    def _parse_image(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse image file and extract metadata."""
         try:
-            image = Image.open(io.BytesIO(content))
-            
-            metadata = {
-                "format": image.format,
-                "mode": image.mode,
-                "size": image.size,
-                "width": image.width,
-                "height": image.height,
-            }
-            
-            # Extract EXIF data if available
-            if hasattr(image, '_getexif') and image._getexif():
-                exif = image._getexif()
+            # BytesIO shares the bytes without copying; the image is only read far enough for headers
+            with _import("PIL.Image").open(io.BytesIO(content)) as image:
+                metadata = {
+                    "format": image.format,
+                    "mode": image.mode,
+                    "size": image.size,
+                    "width": image.width,
+                    "height": image.height,
+                }
+                
+                # Extract EXIF data (base IFD plus the Exif sub-IFD) if available
+                exif = image.getexif()
                 if exif:
-                    for tag_id, value in exif.items():
-                        tag = ExifTags.TAGS.get(tag_id, tag_id)
-                        metadata[f"exif_{tag}"] = str(value)
+                    exif_tags = _import("PIL.ExifTags")
+                    tags = exif_tags.TAGS
+                    entries = {**exif, **exif.get_ifd(exif_tags.IFD.Exif)}
+                    entries.pop(exif_tags.IFD.Exif, None)
+                    metadata["exif"] = {tags.get(tag_id, str(tag_id)): str(value) for tag_id, value in entries.items()}
             
             return {
                 "metadata": metadata
@@ -423,49 +1103,44 @@ class MediaParser:
                 "metadata": {"error": str(e)}
             }
     
-    async def _parse_audio(self, content: bytes, filename: str) -> Dict[str, Any]:
+    def _parse_audio(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse audio file and extract metadata."""
         try:
-            # Save to temporary file for mutagen
-            import tempfile
-            import os
-            
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                temp_file.write(content)
-                temp_path = temp_file.name
+            # mutagen reads tags straight from memory
+            audio_file = _import("mutagen").File(io.BytesIO(content))
+            if audio_file is None:
+                # A few formats are only recognized by file extension; retry from a named file
+                with tempfile.NamedTemporaryFile(suffix=Path(filename).suffix) as temp_file:
+                    temp_file.write(content)
+                    temp_file.flush()
+                    audio_file = _import("mutagen").File(temp_file.name)
             
-            try:
-                audio_file = mutagen.File(temp_path)
-                
-                metadata = {}
-                if audio_file:
-                    # Extract common metadata
-                    metadata.update({
-                        "length": getattr(audio_file.info, 'length', 0),
-                        "bitrate": getattr(audio_file.info, 'bitrate', 0),
-                        "sample_rate": getattr(audio_file.info, 'sample_rate', 0),
-                        "channels": getattr(audio_file.info, 'channels', 0),
-                    })
-                    
-                    # Extract tags
-                    if audio_file.tags:
-                        for key, value in audio_file.tags.items():
-                            metadata[f"tag_{key}"] = str(value[0]) if isinstance(value, list) else str(value)
-                
-                return {
-                    "metadata": metadata
-                }
-                
-            finally:
-                os.unlink(temp_path)
+            metadata = {}
+            if audio_file:
+                # Extract common metadata
+                metadata.update({
+                    "length": getattr(audio_file.info, 'length', 0),
+                    "bitrate": getattr(audio_file.info, 'bitrate', 0),
+                    "sample_rate": getattr(audio_file.info, 'sample_rate', 0),
+                    "channels": getattr(audio_file.info, 'channels', 0),
+                })
                 
+                # Extract tags
+                if audio_file.tags:
+                    for key, value in audio_file.tags.items():
+                        metadata[f"tag_{key}"] = str(value[0]) if isinstance(value, list) else str(value)
+            
+            return {
+                "metadata": metadata
+            }
+            
         except Exception as e:
             logger.error(f"Error parsing audio {filename}: {str(e)}")
             return {
                 "metadata": {"error": str(e)}
             }
     
-    async def _parse_video(self, content: bytes, filename: str) -> Dict[str, Any]:
+    def _parse_video(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse video file and extract metadata."""
         try:
             # Similar to audio parsing but for video
@@ -3,23 +3,72 @@ Core ingestion processor that orchestrates document and media processing.
 """
 
 import asyncio
-import logging
 import hashlib
+import logging
 import mimetypes
+import os
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse
 from uuid import uuid4
 
+import httpx
+
+from .models import IngestRequest
 from .parsers import DocumentParser, MediaParser
 from .ocr import OCRProcessor
 from .transcription import TranscriptionProcessor
+from .near_duplicates import ChunkDeduplicator
 from ..shared.database import Database
 from ..shared.nats_client import NATSClient
-from ..shared.storage import StorageClient
-from ..shared.config import Settings
+from ..shared.storage import MULTIPART_PART_SIZE, StorageClient
+from ..shared.config import Settings, pool_workers
+from ..shared.redis_client import get_redis_client
 
 logger = logging.getLogger(__name__)
 
+# Ingest jobs are persisted on this JetStream stream and pulled by a shared durable consumer
+_INGEST_STREAM = "INGEST"
+_INGEST_SUBJECTS = ["ingest.document", "ingest.media", "ingest.url"]
+_INGEST_DURABLE = "ingest-workers"
+
+# Jobs that fail every delivery are kept on this stream for inspection
+_INGEST_DEAD_LETTER_STREAM = "INGEST_DEAD_LETTER"
+_INGEST_DEAD_LETTER_PREFIX = "ingest.dead"
+
+# Document parser, media parser, OCR page and OCR thread pools can all be busy at once,
+# so they split the process's cores
+_CPU_POOLS = 4
+
+# URL downloads are streamed to storage in chunks of this size
+_URL_CHUNK_SIZE = 1024 * 1024
+
+# Without storage, uploads and URL bodies are held in memory for the job up to this size
+IN_MEMORY_UPLOAD_MAX_BYTES = 64 * 1024 * 1024
+
+# Chunks at least this large are hashed in a worker thread; hashlib releases the GIL while hashing
+_THREAD_HASH_MIN_BYTES = 64 * 1024
+
+# In-memory URL bodies are uploaded in the background by at most this many tasks,
+# each trying this many times with exponential backoff
+_UPLOAD_CONCURRENCY = 16
+_UPLOAD_ATTEMPTS = 3
+
+# Recently ingested content hashes per tenant and site, answered without a database lookup
+_KNOWN_DOCUMENTS_SIZE = 4096
+
+# Connection limits for the shared HTTP client used to fetch URLs
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+
+async def hash_chunk(digest, chunk: bytes) -> None:
+    """Feed a chunk to a running digest, off the event loop when the chunk is large."""
+    if len(chunk) >= _THREAD_HASH_MIN_BYTES:
+        await asyncio.to_thread(digest.update, chunk)
+    else:
+        digest.update(chunk)
+
 
 class IngestProcessor:
     """Main processor for document and media ingestion."""
@@ -31,35 +80,159 @@ class IngestProcessor:
         self.settings = settings
         
         # Initialize processors
-        self.doc_parser = DocumentParser()
-        self.media_parser = MediaParser()
-        self.ocr_processor = OCRProcessor()
-        self.transcription_processor = TranscriptionProcessor()
+        pool_size = pool_workers(_CPU_POOLS)
+        self.doc_parser = DocumentParser(max_workers=pool_size)
+        self.media_parser = MediaParser(max_workers=pool_size)
+        self.ocr_processor = OCRProcessor(
+            max_long_edge=settings.ocr_max_long_edge,
+            enable_easyocr=settings.enable_easyocr,
+            quantize=settings.ocr_quantize,
+            max_workers=pool_size
+        )
+        self.transcription_processor = TranscriptionProcessor(max_parallel=settings.transcription_max_parallel)
+        self.chunk_deduplicator = ChunkDeduplicator(settings.redis_url, get_redis_client())
         
         # Processing status cache
         self.processing_status: Dict[str, Dict[str, Any]] = {}
         
+        # Document IDs by (tenant_id, site_id, content_hash) for recently ingested content
+        self._known_documents: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        
+        # Ingest job handlers by subject; jobs run in-process when JetStream is unavailable
+        self._job_handlers = {
+            "ingest.document": self.process_document,
+            "ingest.media": self.process_media,
+            "ingest.url": self.process_url
+        }
+        self.jetstream_enabled = False
+        self._consumers: List[asyncio.Task] = []
+        
+        # Shared HTTP/2 client so URL fetches reuse connections and TLS sessions
+        self.http: Optional[httpx.AsyncClient] = None
+        self._upload_slots = asyncio.Semaphore(_UPLOAD_CONCURRENCY)
+        
     async def initialize(self):
         """Initialize the processor."""
         logger.info("Initializing ingest processor")
         
+        self.http = httpx.AsyncClient(http2=True, timeout=30, limits=_HTTP_LIMITS, follow_redirects=True)
+        
         # Subscribe to NATS topics
         await self.nats.subscribe("doc.ingest", self._handle_ingest_message)
         await self.nats.subscribe("doc.reprocess", self._handle_reprocess_message)
         
+        # Start parser pools, warm OCR models and start transcription batching before accepting jobs
+        await self.doc_parser.initialize()
+        await self.media_parser.initialize()
+        await self.ocr_processor.initialize()
+        await self.transcription_processor.initialize()
+        
+        # Pull ingest jobs from JetStream so any replica can pick them up
+        self.jetstream_enabled = await self.nats.add_stream(_INGEST_STREAM, _INGEST_SUBJECTS)
+        if self.jetstream_enabled:
+            await self.nats.add_stream(_INGEST_DEAD_LETTER_STREAM, [f"{_INGEST_DEAD_LETTER_PREFIX}.>"])
+            for subject in _INGEST_SUBJECTS:
+                kind = subject.split('.')[-1]
+                for _ in range(self.settings.ingest_workers):
+                    self._consumers.append(await self.nats.pull_subscribe(
+                        subject, f"{_INGEST_DURABLE}-{kind}",
+                        lambda job, subject=subject: self._run_job(subject, job),
+                        batch=1,  # ingest jobs are heavy; concurrency comes from ingest_workers
+                        dead_letter_subject=f"{_INGEST_DEAD_LETTER_PREFIX}.{kind}"
+                    ))
+        
     async def cleanup(self):
         """Cleanup resources."""
         logger.info("Cleaning up ingest processor")
         
-    def _generate_document_id(self, content: bytes, filename: str) -> str:
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers.clear()
+        
+        await self.doc_parser.cleanup()
+        await self.media_parser.cleanup()
+        await self.ocr_processor.cleanup()
+        await self.transcription_processor.cleanup()
+        
+        if self.http:
+            await self.http.aclose()
+            self.http = None
+        
+    async def submit_job(self, subject: str, job: Dict[str, Any], background_tasks,
+                         content: Optional[bytes] = None) -> None:
+        """Queue an ingest job on JetStream, or run it in this process if JetStream is unavailable.
+        
+        Jobs given their content (uploads kept in memory because storage is unavailable) always run
+        in this process, since no other replica could read it.
+        """
+        if self.jetstream_enabled and content is None:
+            await self.nats.js_publish(subject, job)
+        else:
+            if content is not None:
+                job = {**job, "args": {**job.get("args", {}), "content": content}}
+            background_tasks.add_task(self._run_job, subject, job)
+        
+    async def _run_job(self, subject: str, job: Dict[str, Any]):
+        """Run one ingest job: {"request": <IngestRequest fields>, "args": <handler kwargs>}."""
+        await self._job_handlers[subject](IngestRequest(**job["request"]), **job.get("args", {}))
+        
+    def _generate_document_id(self, content_hash: str) -> str:
         """Generate a unique document ID based on content hash."""
-        content_hash = hashlib.sha256(content).hexdigest()[:16]
-        return f"doc_{content_hash}_{uuid4().hex[:8]}"
+        return f"doc_{content_hash[:16]}_{uuid4().hex[:8]}"
+    
+    async def _find_duplicate(self, request, content_hash: str) -> Optional[str]:
+        """ID of a document already ingested with the same content for this tenant and site."""
+        key = (request.tenant_id, request.site_id, content_hash)
+        document_id = self._known_documents.get(key)
+        if document_id is None:
+            document_id = await self.db.get_document_by_content_hash(content_hash, request.tenant_id, request.site_id)
+            if document_id is None:
+                return None
+        self._remember_document(key, document_id)
+        return document_id
+    
+    def _remember_document(self, key: Tuple[str, str, str], document_id: str):
+        """Record an ingested document for duplicate detection."""
+        self._known_documents[key] = document_id
+        self._known_documents.move_to_end(key)
+        if len(self._known_documents) > _KNOWN_DOCUMENTS_SIZE:
+            self._known_documents.popitem(last=False)
+    
+    def _forget_document(self, document_id: str):
+        """Stop treating a document as the ingested copy of its content."""
+        for key in [key for key, known_id in self._known_documents.items() if known_id == document_id]:
+            del self._known_documents[key]
+    
+    async def _deduplicated(self, request, file_key: str, content_hash: str, stored: bool) -> Optional[Dict[str, Any]]:
+        """Result for content that was already ingested, dropping the redundant stored copy; None for new content."""
+        existing_id = await self._find_duplicate(request, content_hash)
+        if existing_id is None:
+            return None
+        
+        logger.info(f"Content {content_hash[:16]} already ingested as {existing_id}, skipping")
+        if stored:
+            await self.storage.delete_file(file_key)
+        return {"document_id": existing_id, "status": "deduped"}
         
-    async def process_document(self, request, content: bytes, filename: str) -> Dict[str, Any]:
-        """Process a document file."""
-        document_id = self._generate_document_id(content, filename)
+    async def process_document(
+        self,
+        request,
+        file_key: str,
+        filename: str,
+        content_hash: str,
+        file_size: int,
+        content: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        """Process a document file stored under file_key, or its content when already in memory."""
+        # Identical content already ingested for this site skips the whole pipeline
+        duplicate = await self._deduplicated(request, file_key, content_hash, stored=content is None)
+        if duplicate:
+            return duplicate
+        
+        document_id = self._generate_document_id(content_hash)
         start_time = datetime.utcnow()
+        document_created = False
         
         try:
             logger.info(f"Processing document {document_id}: {filename}")
@@ -75,9 +248,9 @@ class IngestProcessor:
             # Determine content type
             content_type = request.content_type or mimetypes.guess_type(filename)[0]
             
-            # Store original file
-            file_key = f"documents/{request.tenant_id}/{document_id}/{filename}"
-            await self.storage.upload_file(file_key, content, content_type)
+            # The original file was stored on upload; fetch it only now that it is needed
+            if content is None:
+                content = await self.storage.download_file(file_key)
             
             # Parse document content
             parsed_content = await self.doc_parser.parse(content, content_type, filename)
@@ -85,7 +258,16 @@ class IngestProcessor:
             # OCR if needed (for images or scanned PDFs)
             if parsed_content.get("needs_ocr", False):
                 self.processing_status[document_id]["stage"] = "ocr"
-                ocr_text = await self.ocr_processor.extract_text(content, content_type)
+                page_images = parsed_content.get("page_images")
+                if page_images:
+                    # OCR every page of a scanned document in one batch
+                    page_texts = await self.ocr_processor.extract_text_many(page_images)
+                    ocr_text = "\n\n".join(
+                        f"[Page {page_num + 1}]\n{text}"
+                        for page_num, text in enumerate(page_texts) if text
+                    )
+                else:
+                    ocr_text = await self.ocr_processor.extract_text(content, content_type)
                 parsed_content["text"] = ocr_text
                 
             # Create document record
@@ -94,13 +276,14 @@ class IngestProcessor:
                 "tenant_id": request.tenant_id,
                 "site_id": request.site_id,
                 "title": request.title,
+                "content_hash": content_hash,
                 "content": parsed_content.get("text", ""),
                 "content_type": content_type,
                 "source_url": request.source_url,
                 "metadata": {
                     **request.metadata,
                     "filename": filename,
-                    "file_size": len(content),
+                    "file_size": file_size,
                     "file_key": file_key,
                     "parsed_metadata": parsed_content.get("metadata", {}),
                     "processing_time_ms": 0  # Will be updated
@@ -109,6 +292,7 @@ class IngestProcessor:
             
             # Save to database
             await self.db.create_document(document_data)
+            document_created = True
             
             # Chunk content for embeddings
             self.processing_status[document_id]["stage"] = "chunking"
@@ -118,12 +302,8 @@ class IngestProcessor:
                 request.tenant_id
             )
             
-            # Publish to embedding worker
-            await self.nats.publish("index.upsert", {
-                "document_id": document_id,
-                "tenant_id": request.tenant_id,
-                "chunks": chunks
-            })
+            # Store chunks and publish to embedding worker
+            chunks = await self._publish_chunks(request, document_id, content_hash, chunks)
             
             # Update processing status
             processing_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
@@ -145,6 +325,7 @@ class IngestProcessor:
                 }
             })
             
+            self._remember_document((request.tenant_id, request.site_id, content_hash), document_id)
             logger.info(f"Document {document_id} processed successfully in {processing_time}ms")
             
             return {
@@ -167,12 +348,30 @@ class IngestProcessor:
                 "filename": filename
             }
             
+            # A redelivered job starts over, so drop what this attempt stored
+            if document_created:
+                await self._discard_document(document_id, request.tenant_id)
+            
             raise e
             
-    async def process_media(self, request, content: bytes, filename: str) -> Dict[str, Any]:
-        """Process a media file."""
-        document_id = self._generate_document_id(content, filename)
+    async def process_media(
+        self,
+        request,
+        file_key: str,
+        filename: str,
+        content_hash: str,
+        file_size: int,
+        content: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        """Process a media file stored under file_key, or its content when already in memory."""
+        # Identical content already ingested for this site skips the whole pipeline
+        duplicate = await self._deduplicated(request, file_key, content_hash, stored=content is None)
+        if duplicate:
+            return duplicate
+        
+        document_id = self._generate_document_id(content_hash)
         start_time = datetime.utcnow()
+        document_created = False
         
         try:
             logger.info(f"Processing media {document_id}: {filename}")
@@ -189,9 +388,9 @@ class IngestProcessor:
             content_type = request.content_type or mimetypes.guess_type(filename)[0]
             media_type = request.metadata.get("media_type", "unknown")
             
-            # Store original file
-            file_key = f"media/{request.tenant_id}/{document_id}/{filename}"
-            await self.storage.upload_file(file_key, content, content_type)
+            # The original file was stored on upload; fetch it only now that it is needed
+            if content is None:
+                content = await self.storage.download_file(file_key)
             
             # Parse media content
             parsed_content = await self.media_parser.parse(content, content_type, filename)
@@ -215,13 +414,14 @@ class IngestProcessor:
                 "tenant_id": request.tenant_id,
                 "site_id": request.site_id,
                 "title": request.title,
+                "content_hash": content_hash,
                 "content": extracted_text,
                 "content_type": content_type,
                 "source_url": request.source_url,
                 "metadata": {
                     **request.metadata,
                     "filename": filename,
-                    "file_size": len(content),
+                    "file_size": file_size,
                     "file_key": file_key,
                     "media_type": media_type,
                     "parsed_metadata": parsed_content.get("metadata", {}),
@@ -231,6 +431,7 @@ class IngestProcessor:
             
             # Save to database
             await self.db.create_document(document_data)
+            document_created = True
             
             # Chunk content if we have text
             chunks = []
@@ -242,12 +443,8 @@ class IngestProcessor:
                     request.tenant_id
                 )
                 
-                # Publish to embedding worker
-                await self.nats.publish("index.upsert", {
-                    "document_id": document_id,
-                    "tenant_id": request.tenant_id,
-                    "chunks": chunks
-                })
+                # Store chunks and publish to embedding worker
+                chunks = await self._publish_chunks(request, document_id, content_hash, chunks)
             
             # Update processing status
             processing_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
@@ -261,6 +458,7 @@ class IngestProcessor:
                 "filename": filename
             }
             
+            self._remember_document((request.tenant_id, request.site_id, content_hash), document_id)
             logger.info(f"Media {document_id} processed successfully in {processing_time}ms")
             
             return {
@@ -283,13 +481,105 @@ class IngestProcessor:
                 "filename": filename
             }
             
+            # A redelivered job starts over, so drop what this attempt stored
+            if document_created:
+                await self._discard_document(document_id, request.tenant_id)
+            
             raise e
             
     async def process_url(self, request) -> Dict[str, Any]:
-        """Process content from a URL."""
-        # Implementation for URL processing
-        # This would fetch content from the URL and process it
-        pass
+        """Fetch a URL into storage and process it as media or a document."""
+        try:
+            logger.info(f"Fetching {request.source_url}")
+            
+            async with self.http.stream("GET", request.source_url) as response:
+                response.raise_for_status()
+                content_type = request.content_type or response.headers.get("content-type", "").split(";")[0].strip() or None
+                filename = os.path.basename(urlparse(str(response.url)).path) or "index.html"
+                file_key = f"urls/{request.tenant_id}/{uuid4().hex}/{filename}"
+                digest = hashlib.sha256()
+                size = 0
+                stream = response.aiter_bytes(_URL_CHUNK_SIZE)
+                
+                # Bodies that fit in one storage part stay in memory, so processing can start
+                # while they upload in the background; without storage every body stays in memory
+                content = None
+                buffer = bytearray()
+                async for chunk in stream:
+                    await hash_chunk(digest, chunk)
+                    size += len(chunk)
+                    buffer += chunk
+                    if not self.storage.available:
+                        if len(buffer) > IN_MEMORY_UPLOAD_MAX_BYTES:
+                            raise ValueError(f"Storage is not configured; URL bodies over {IN_MEMORY_UPLOAD_MAX_BYTES} bytes need S3")
+                    elif len(buffer) > MULTIPART_PART_SIZE:
+                        break
+                else:
+                    content = bytes(buffer)
+                
+                if content is None:
+                    async def chunks():
+                        nonlocal size
+                        yield bytes(buffer)
+                        async for chunk in stream:
+                            await hash_chunk(digest, chunk)
+                            size += len(chunk)
+                            yield chunk
+                    
+                    # Pipe the rest of a large body to storage without holding it in memory
+                    await self.storage.upload_stream(file_key, chunks(), content_type)
+                
+        except Exception as e:
+            logger.error(f"Error fetching URL {request.source_url}: {str(e)}")
+            raise e
+        
+        # Known content is not uploaded again; streamed bodies are already stored and dropped by process_*
+        content_hash = digest.hexdigest()
+        if content is not None:
+            duplicate = await self._deduplicated(request, file_key, content_hash, stored=False)
+            if duplicate:
+                return duplicate
+        
+        upload = None
+        if content is not None:
+            upload = asyncio.create_task(self._upload_with_retry(file_key, content, content_type))
+        
+        try:
+            request = request.copy(update={"content_type": content_type})
+            media_type = content_type.split("/")[0] if content_type else ""
+            if media_type in ("image", "audio", "video"):
+                request = request.copy(update={"metadata": {**request.metadata, "media_type": media_type}})
+                result = await self.process_media(request, file_key, filename, content_hash, size, content)
+            else:
+                result = await self.process_document(request, file_key, filename, content_hash, size, content)
+        except Exception:
+            # Report the processing failure, not the upload's
+            if upload:
+                await asyncio.gather(upload, return_exceptions=True)
+            raise
+        
+        # The stored original must exist before the job counts as done
+        if upload:
+            try:
+                await upload
+            except Exception as e:
+                logger.error(f"Error storing {file_key}: {str(e)}")
+                if result.get("status") != "deduped":
+                    await self._discard_document(result["document_id"], request.tenant_id)
+                raise e
+        return result
+    
+    async def _upload_with_retry(self, file_key: str, content: bytes, content_type: Optional[str]) -> str:
+        """Upload content to storage, retrying failures with exponential backoff."""
+        async with self._upload_slots:
+            for attempt in range(_UPLOAD_ATTEMPTS):
+                try:
+                    return await self.storage.upload_file(file_key, content, content_type)
+                except Exception as e:
+                    if attempt == _UPLOAD_ATTEMPTS - 1:
+                        raise e
+                    logger.warning(f"Upload of {file_key} failed (attempt {attempt + 1}), retrying: {e}")
+                    await asyncio.sleep(2 ** attempt)
         
     async def _chunk_content(self, text: str, document_id: str, tenant_id: str) -> List[Dict[str, Any]]:
         """Chunk text content for embedding."""
@@ -331,9 +621,38 @@ class IngestProcessor:
             
             start = end - chunk_overlap
             chunk_index += 1
-            
+        
+        return chunks
+        
+    async def _publish_chunks(self, request, document_id: str, content_hash: str,
+                              chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store the chunks that are not boilerplate of the site, then hand them to the embedding worker."""
+        chunks, pending = await self.chunk_deduplicator.filter_chunks(
+            chunks, document_id, content_hash, request.tenant_id, request.site_id
+        )
+        
+        # Rows exist before the embedding worker sees the message; its create_embeddings upserts the vectors into them
+        await self.db.create_chunks_bulk(chunks)
+        
+        # Chunks become duplicates for later documents only once they are stored
+        await self.chunk_deduplicator.index_chunks(pending, document_id, request.tenant_id, request.site_id)
+        
+        await self.nats.publish("index.upsert", {
+            "document_id": document_id,
+            "tenant_id": request.tenant_id,
+            "chunks": chunks
+        })
         return chunks
         
+    async def _discard_document(self, document_id: str, tenant_id: str):
+        """Remove the rows and chunk index entries of a failed ingest attempt; best effort."""
+        self._forget_document(document_id)
+        try:
+            await self.db.delete_document(document_id, tenant_id)
+            await self.chunk_deduplicator.remove_document(document_id)
+        except Exception as e:
+            logger.warning(f"Could not discard failed document {document_id}: {str(e)}")
+        
     async def get_processing_status(self, document_id: str) -> Dict[str, Any]:
         """Get the processing status of a document."""
         return self.processing_status.get(document_id, {"status": "not_found"})
@@ -343,6 +662,10 @@ class IngestProcessor:
         # Delete from database
         await self.db.delete_document(document_id, tenant_id)
         
+        # Deleted content may be ingested again
+        self._forget_document(document_id)
+        await self.chunk_deduplicator.remove_document(document_id)
+        
         # Delete from storage
         # This would delete the stored files
         
@@ -2,18 +2,32 @@
 Audio/Video transcription processor for extracting text from media files.
 """
 
+import asyncio
 import io
 import logging
 import tempfile
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
+
+import numpy as np
+
+# faster-whisper runs Whisper on CTranslate2 with INT8 weights; openai-whisper stays as the fallback
+try:
+    import ctranslate2
+    from faster_whisper import WhisperModel, decode_audio
+    from faster_whisper.tokenizer import Tokenizer
+    from faster_whisper.vad import VadOptions, collect_chunks, get_speech_timestamps
+    HAS_FASTER_WHISPER = True
+except ImportError:
+    HAS_FASTER_WHISPER = False
 
 try:
     import whisper
     HAS_WHISPER = True
 except ImportError:
     HAS_WHISPER = False
-    logging.warning("OpenAI Whisper not available. Install openai-whisper for transcription.")
+    if not HAS_FASTER_WHISPER:
+        logging.warning("Whisper not available. Install faster-whisper for transcription.")
 
 try:
     import openai
@@ -24,25 +38,67 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Whisper model size; medium balances speed and accuracy
+_WHISPER_MODEL_SIZE = "medium"
+
+# Whisper decodes 30-second windows of 16 kHz audio; clips that fit one window can be batched
+_WHISPER_WINDOW_SAMPLES = 30 * 16000
+
+# Concurrent short clips are batched up to this size, waiting at most this long to fill a batch
+_WHISPER_MAX_BATCH = 8
+_WHISPER_MAX_WAIT_SECONDS = 0.02
+
+
+def _speech_only(audio: np.ndarray) -> np.ndarray:
+    """Keep only the speech in decoded audio, using the Silero VAD behind transcribe(vad_filter=True)."""
+    timestamps = get_speech_timestamps(audio, VadOptions())
+    if not timestamps:
+        return audio[:0]
+    return collect_chunks(audio, timestamps)
+
 
 class TranscriptionProcessor:
     """Processor for transcribing audio and video content to text."""
     
-    def __init__(self):
-        self.whisper_available = HAS_WHISPER
+    def __init__(self, max_parallel: int = 1):
+        self.whisper_available = HAS_FASTER_WHISPER or HAS_WHISPER
         self.openai_api_available = HAS_OPENAI_API
         self.whisper_model = None
         
+        # Whisper runs in worker threads; this bounds how many share the model (and GPU memory) at once
+        self._whisper_slots = asyncio.Semaphore(max_parallel)
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        
         # Initialize local Whisper model if available
         if self.whisper_available:
             try:
-                # Load a medium-sized model for good balance of speed/accuracy
-                self.whisper_model = whisper.load_model("medium")
+                if HAS_FASTER_WHISPER:
+                    # INT8 weights with FP16 activations on GPU, INT8 throughout on CPU
+                    device = "cuda" if ctranslate2.get_cuda_device_count() else "cpu"
+                    compute_type = "int8_float16" if device == "cuda" else "int8"
+                    self.whisper_model = WhisperModel(_WHISPER_MODEL_SIZE, device=device, compute_type=compute_type)
+                else:
+                    self.whisper_model = whisper.load_model(_WHISPER_MODEL_SIZE)
                 logger.info("Whisper model loaded successfully")
             except Exception as e:
                 logger.warning(f"Failed to load Whisper model: {e}")
                 self.whisper_available = False
     
+    async def initialize(self):
+        """Start batching short clips when faster-whisper is loaded."""
+        if HAS_FASTER_WHISPER and self.whisper_model is not None:
+            self._queue = asyncio.Queue()
+            self._batch_task = asyncio.create_task(self._batch_loop())
+    
+    async def cleanup(self):
+        """Stop the Whisper batching loop."""
+        if self._batch_task:
+            self._batch_task.cancel()
+            await asyncio.gather(self._batch_task, return_exceptions=True)
+            self._batch_task = None
+            self._queue = None
+    
     async def transcribe(self, content: bytes, content_type: str, language: Optional[str] = None) -> str:
         """Transcribe audio/video content to text."""
         try:
@@ -114,7 +170,20 @@ class TranscriptionProcessor:
             if language:
                 options['language'] = language
             
-            result = self.whisper_model.transcribe(file_path, **options)
+            # Clips that fit one window are batched with other clips queued at the same time
+            if self._queue is not None:
+                audio = await asyncio.to_thread(decode_audio, file_path)
+                if len(audio) <= _WHISPER_WINDOW_SAMPLES:
+                    # Batched clips skip transcribe(), so apply its VAD here; Whisper hallucinates text on silence
+                    speech = await asyncio.to_thread(_speech_only, audio)
+                    if not len(speech):
+                        return ""
+                    future = asyncio.get_running_loop().create_future()
+                    await self._queue.put((speech, language, future))
+                    return (await future).strip()
+                result = await self._run_whisper(audio, **options)
+            else:
+                result = await self._run_whisper(file_path, **options)
             
             # Extract text
             text = result.get('text', '').strip()
@@ -129,6 +198,94 @@ class TranscriptionProcessor:
             logger.error(f"Whisper transcription error: {str(e)}")
             raise e
     
+    async def _run_whisper(self, audio: Union[str, np.ndarray], **options) -> Dict[str, Any]:
+        """Run Whisper off the event loop, holding a model slot for the duration."""
+        async with self._whisper_slots:
+            return await asyncio.to_thread(self._whisper_transcribe, audio, **options)
+    
+    def _whisper_transcribe(self, audio: Union[str, np.ndarray], **options) -> Dict[str, Any]:
+        """Transcribe a file or decoded audio, returning openai-whisper's result shape from either backend."""
+        if not HAS_FASTER_WHISPER:
+            return self.whisper_model.transcribe(audio, **options)
+        
+        # Segments are generated lazily; decoding happens while they are collected
+        segments, info = self.whisper_model.transcribe(audio, vad_filter=True, **options)
+        result_segments = []
+        for segment in segments:
+            segment_data = {'start': segment.start, 'end': segment.end, 'text': segment.text}
+            if segment.words:
+                segment_data['words'] = [
+                    {'start': word.start, 'end': word.end, 'word': word.word, 'probability': word.probability}
+                    for word in segment.words
+                ]
+            result_segments.append(segment_data)
+        
+        return {
+            "text": "".join(segment['text'] for segment in result_segments),
+            "language": info.language,
+            "segments": result_segments
+        }
+    
+    async def _batch_loop(self):
+        """Drain queued clips into batches of up to _WHISPER_MAX_BATCH and transcribe them together."""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + _WHISPER_MAX_WAIT_SECONDS
+            while len(items) < _WHISPER_MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                async with self._whisper_slots:
+                    texts = await asyncio.to_thread(
+                        self._transcribe_batch,
+                        [audio for audio, _, _ in items],
+                        [language for _, language, _ in items]
+                    )
+                for (_, _, future), text in zip(items, texts):
+                    if not future.done():
+                        future.set_result(text)
+            except Exception as e:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    def _transcribe_batch(self, clips: List[np.ndarray], languages: List[Optional[str]]) -> List[str]:
+        """Transcribe clips of up to one window as a single padded CTranslate2 batch."""
+        model = self.whisper_model
+        extractor = model.feature_extractor
+        features = np.stack([
+            extractor(np.pad(clip, (0, _WHISPER_WINDOW_SAMPLES - len(clip))))[:, :extractor.nb_max_frames]
+            for clip in clips
+        ])
+        features = ctranslate2.StorageView.from_array(np.ascontiguousarray(features))
+        
+        # Clips without a requested language share one detection pass; results look like "<|en|>"
+        if not model.model.is_multilingual:
+            languages = ["en"] * len(clips)
+        elif any(language is None for language in languages):
+            detected = model.model.detect_language(features)
+            languages = [language or detected[i][0][0][2:-2] for i, language in enumerate(languages)]
+        
+        tokenizers = [
+            Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+            for language in languages
+        ]
+        results = model.model.generate(
+            features,
+            [tokenizer.sot_sequence + [tokenizer.no_timestamps] for tokenizer in tokenizers],
+            beam_size=5,
+            max_length=448,
+            suppress_blank=True
+        )
+        return [tokenizer.decode(result.sequences_ids[0]) for tokenizer, result in zip(tokenizers, results)]
+    
     async def _transcribe_with_openai_api(self, file_path: str, language: Optional[str] = None) -> str:
         """Transcribe using OpenAI Whisper API."""
         try:
@@ -140,12 +297,16 @@ class TranscriptionProcessor:
                 return ""
             
             # Open file and transcribe
-            with open(file_path, 'rb') as audio_file:
-                transcript = openai.Audio.transcribe(
-                    model="whisper-1",
-                    file=audio_file,
-                    language=language
-                )
+            # The client is synchronous, so the upload runs in a worker thread
+            def transcribe_file():
+                with open(file_path, 'rb') as audio_file:
+                    return openai.Audio.transcribe(
+                        model="whisper-1",
+                        file=audio_file,
+                        language=language
+                    )
+            
+            transcript = await asyncio.to_thread(transcribe_file)
             
             return transcript.get('text', '').strip()
             
@@ -167,7 +328,7 @@ class TranscriptionProcessor:
                 if language:
                     options['language'] = language
                 
-                result = self.whisper_model.transcribe(temp_path, **options)
+                result = await self._run_whisper(temp_path, **options)
                 
                 # Extract segments with timestamps
                 segments = []
@@ -231,6 +392,24 @@ class TranscriptionProcessor:
             'ar', 'hi', 'tr', 'pl', 'nl', 'sv', 'da', 'no', 'fi'
         ]
     
+    def _language_probs(self, file_path: str) -> Dict[str, float]:
+        """Spoken language probabilities for the first 30 seconds of audio."""
+        if HAS_FASTER_WHISPER:
+            # Language is detected up front; the lazy segments are never decoded
+            _, info = self.whisper_model.transcribe(file_path)
+            return dict(info.all_language_probs or [(info.language, info.language_probability)])
+        
+        # Load audio and detect language
+        audio = whisper.load_audio(file_path)
+        audio = whisper.pad_or_trim(audio)
+        
+        # Make log-Mel spectrogram and move to the same device as the model
+        mel = whisper.log_mel_spectrogram(audio).to(self.whisper_model.device)
+        
+        # Detect the spoken language
+        _, probs = self.whisper_model.detect_language(mel)
+        return probs
+    
     async def detect_language(self, content: bytes, content_type: str) -> Optional[str]:
         """Detect the language of audio content."""
         try:
@@ -240,15 +419,8 @@ class TranscriptionProcessor:
             temp_path = await self._save_to_temp_file(content, content_type)
             
             try:
-                # Load audio and detect language
-                audio = whisper.load_audio(temp_path)
-                audio = whisper.pad_or_trim(audio)
-                
-                # Make log-Mel spectrogram and move to the same device as the model
-                mel = whisper.log_mel_spectrogram(audio).to(self.whisper_model.device)
-                
-                # Detect the spoken language
-                _, probs = self.whisper_model.detect_language(mel)
+                async with self._whisper_slots:
+                    probs = await asyncio.to_thread(self._language_probs, temp_path)
                 detected_language = max(probs, key=probs.get)
                 
                 logger.info(f"Detected language: {detected_language} (confidence: {probs[detected_language]:.2f})")
@@ -17,6 +17,7 @@ from ..shared.database import get_database
 from ..shared.nats_client import get_nats_client
 from ..shared.storage import get_storage_client
 from ..shared.config import get_settings
+from ..shared.app_factory import run_worker_app
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -279,5 +280,4 @@ async def delete_anchor(anchor_id: str, tenant_id: str):
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8004)
+    run_worker_app("workers.overlay.main:app", port=8004)
@@ -18,6 +18,7 @@ from ..shared.database import get_database
 from ..shared.nats_client import get_nats_client
 from ..shared.storage import get_storage_client
 from ..shared.config import get_settings
+from ..shared.app_factory import run_worker_app
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -278,5 +279,4 @@ async def generate_embeddings(
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8002)
+    run_worker_app("workers.rag.main:app", port=8002)
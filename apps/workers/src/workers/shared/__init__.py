@@ -6,6 +6,7 @@ from .config import get_settings
 from .database import get_database, Database
 from .nats_client import get_nats_client, NATSClient
 from .storage import get_storage_client, StorageClient
+from .redis_client import get_redis_client, RedisClient
 
 __all__ = [
     "get_settings",
@@ -15,4 +16,6 @@ __all__ = [
     "NATSClient",
     "get_storage_client",
     "StorageClient",
+    "get_redis_client",
+    "RedisClient",
 ]
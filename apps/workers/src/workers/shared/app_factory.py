@@ -0,0 +1,104 @@
+"""
+FastAPI application factory shared by the worker services.
+"""
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+
+from .config import Settings, get_settings
+from .database import get_database
+from .nats_client import get_nats_client
+from .redis_client import get_redis_client
+from .storage import get_storage_client
+
+logger = logging.getLogger(__name__)
+
+
+def create_worker_app(
+    *,
+    name: str,
+    title: str,
+    description: str,
+    processor_cls: type,
+    on_startup: Optional[Callable[[Any, Settings], Awaitable[None]]] = None
+) -> FastAPI:
+    """Build a worker app that owns one processor for its lifetime.
+    
+    The processor is built from the shared database, NATS and storage clients,
+    initialized on startup, and cleaned up on shutdown. It is kept on
+    app.state.processor and handed to on_startup along with the settings so the
+    worker can keep its own reference and set up worker-specific state.
+    """
+    service = f"{name}-worker"
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        settings = get_settings()
+        db = await get_database()
+        nats = await get_nats_client()
+        storage = get_storage_client()
+        redis = get_redis_client()
+        
+        processor = processor_cls(db, nats, storage, settings)
+        await processor.initialize()
+        app.state.processor = processor
+        if on_startup:
+            await on_startup(processor, settings)
+        
+        logger.info(f"{name.capitalize()} worker started successfully")
+        yield
+        
+        await processor.cleanup()
+        await redis.disconnect()
+        logger.info(f"{name.capitalize()} worker stopped")
+    
+    app = FastAPI(
+        title=f"AI VR Tour Guide - {title}",
+        description=description,
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse
+    )
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[origin.strip() for origin in get_settings().cors_origins.split(",") if origin.strip()],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    @app.get("/health")
+    async def health_check():
+        """Health check endpoint."""
+        return {"status": "healthy", "service": service}
+    
+    return app
+
+
+def run_worker_app(app_path: str, port: int, processes: Optional[int] = None, **options):
+    """Serve a worker app with uvicorn.
+    
+    Runs WEB_CONCURRENCY processes if set, else processes, else one per core. Services that load
+    large models pass processes=1 so each model is loaded once and in-process state stays shared.
+    """
+    import uvicorn
+    workers = int(os.environ.get("WEB_CONCURRENCY", processes or os.cpu_count() or 1))
+    
+    # Server processes inherit this and divide the cores among their CPU pools (see pool_workers)
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run(
+        app_path,
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        **options
+    )
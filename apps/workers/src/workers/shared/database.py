@@ -4,11 +4,12 @@ Database connection and operations for workers.
 
 import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime
 
 try:
     import asyncpg
+    from sqlalchemy import text
     from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
     from sqlalchemy.orm import sessionmaker
     HAS_DATABASE = True
@@ -18,21 +19,57 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Chunk rows per multi-row INSERT; 1000 rows of 4 columns stay well under Postgres' 32767 bind parameters
+_CHUNK_INSERT_ROWS = 1000
+
 
 class Database:
     """Database connection manager."""
     
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, pool_size: int = 5, max_overflow: int = 15,
+                 pool_timeout: float = 2.0, command_timeout: float = 30.0, pgbouncer: bool = False):
         self.database_url = database_url
+        self.pool_size = pool_size
         self.engine = None
         self.session_factory = None
         
         if HAS_DATABASE:
-            self.engine = create_async_engine(database_url, echo=False)
+            connect_args = {"command_timeout": command_timeout}
+            if pgbouncer:
+                # Transaction pooling hands each statement to any server connection,
+                # so prepared statements cannot be cached per connection
+                connect_args["statement_cache_size"] = 0
+                connect_args["prepared_statement_cache_size"] = 0
+            
+            self.engine = create_async_engine(
+                database_url,
+                echo=False,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_pre_ping=True,
+                connect_args=connect_args
+            )
             self.session_factory = sessionmaker(
                 self.engine, class_=AsyncSession, expire_on_commit=False
             )
     
+    async def warm(self):
+        """Open pool_size connections up front so the first requests skip connection setup."""
+        if not self.engine:
+            return
+        
+        async def ping():
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        
+        # Hold all connections at once so each ping checks out a distinct one
+        try:
+            await asyncio.gather(*(ping() for _ in range(self.pool_size)))
+            logger.info(f"Warmed {self.pool_size} database connections")
+        except Exception as e:
+            logger.warning(f"Failed to warm database pool: {str(e)}")
+    
     async def create_document(self, document_data: Dict[str, Any]) -> str:
         """Create a new document record."""
         if not HAS_DATABASE:
@@ -45,8 +82,8 @@ class Database:
                 query = """
                 INSERT INTO content.documents (
                     id, tenant_id, site_id, title, content, content_type, 
-                    source_url, metadata, created_at, updated_at
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                    source_url, content_hash, metadata, created_at, updated_at
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
                 """
                 
                 now = datetime.utcnow()
@@ -58,6 +95,7 @@ class Database:
                     document_data["content"],
                     document_data["content_type"],
                     document_data.get("source_url"),
+                    document_data.get("content_hash"),
                     document_data.get("metadata", {}),
                     now,
                     now
@@ -188,18 +226,133 @@ class Database:
             logger.error(f"Error getting document: {str(e)}")
             raise e
     
+    async def get_document_by_content_hash(self, content_hash: str, tenant_id: str,
+                                           site_id: Optional[str]) -> Optional[str]:
+        """Get the ID of a document with the given content hash in a tenant's site."""
+        if not HAS_DATABASE:
+            return None
+        
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    """
+                    SELECT id FROM content.documents
+                    WHERE tenant_id = $1 AND site_id IS NOT DISTINCT FROM $2 AND content_hash = $3
+                    LIMIT 1
+                    """,
+                    [tenant_id, site_id, content_hash]
+                )
+                
+                row = result.fetchone()
+                return row[0] if row else None
+                
+        except Exception as e:
+            logger.error(f"Error looking up document by content hash: {str(e)}")
+            raise e
+    
+    async def stream_site_chunks(
+        self, site_id: str, tenant_id: str, batch_size: int = 4096
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream a site's document chunks in batches via a server-side cursor."""
+        if not HAS_DATABASE:
+            logger.warning("Database not available")
+            return
+        
+        try:
+            async with self.session_factory() as session:
+                result = await session.stream(
+                    """
+                    SELECT e.document_id, e.chunk_index, e.content, e.metadata,
+                           d.title, d.content_type
+                    FROM content.document_embeddings e
+                    JOIN content.documents d ON d.id = e.document_id
+                    WHERE d.site_id = $1 AND d.tenant_id = $2
+                    ORDER BY e.document_id, e.chunk_index
+                    """,
+                    [site_id, tenant_id]
+                )
+                
+                async for rows in result.partitions(batch_size):
+                    yield [
+                        {
+                            "document_id": row[0],
+                            "chunk_index": row[1],
+                            "content": row[2],
+                            "metadata": row[3] or {},
+                            "title": row[4],
+                            "content_type": row[5]
+                        }
+                        for row in rows
+                    ]
+                    
+        except Exception as e:
+            logger.error(f"Error streaming site chunks: {str(e)}")
+            raise e
+    
+    async def create_chunks_bulk(self, chunks: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Insert document chunks with multi-row INSERTs, skipping chunks that already exist."""
+        if not HAS_DATABASE:
+            logger.warning("Database not available, skipping chunk creation")
+            return {"inserted": 0, "skipped": 0}
+        
+        # Rows are always written in the same order so concurrent batches cannot deadlock
+        rows = sorted(chunks, key=lambda chunk: (chunk["document_id"], chunk["chunk_index"]))
+        
+        try:
+            async with self.session_factory() as session:
+                inserted = 0
+                
+                for start in range(0, len(rows), _CHUNK_INSERT_ROWS):
+                    batch = rows[start:start + _CHUNK_INSERT_ROWS]
+                    values = ", ".join(
+                        f"(${i * 4 + 1}, ${i * 4 + 2}, ${i * 4 + 3}, ${i * 4 + 4})" for i in range(len(batch))
+                    )
+                    params = []
+                    for chunk in batch:
+                        params.extend([
+                            chunk["document_id"],
+                            chunk["chunk_index"],
+                            chunk["content"],
+                            chunk.get("metadata", {})
+                        ])
+                    
+                    # Retried messages re-insert the same chunks, which the unique index turns into no-ops
+                    result = await session.execute(
+                        f"""
+                        INSERT INTO content.document_embeddings (
+                            document_id, chunk_index, content, metadata
+                        ) VALUES {values}
+                        ON CONFLICT (document_id, chunk_index) DO NOTHING
+                        """,
+                        params
+                    )
+                    inserted += result.rowcount
+                
+                await session.commit()
+                logger.info(f"Created {inserted} chunks ({len(rows) - inserted} already present)")
+                return {"inserted": inserted, "skipped": len(rows) - inserted}
+                
+        except Exception as e:
+            logger.error(f"Error creating chunks: {str(e)}")
+            raise e
+    
     async def create_embeddings(self, embeddings: List[Dict[str, Any]]) -> int:
-        """Create document embedding records."""
+        """Create document embedding records, or fill in the vectors of chunks already stored by create_chunks_bulk."""
         if not HAS_DATABASE:
             logger.warning("Database not available, skipping embeddings creation")
             return 0
         
         try:
             async with self.session_factory() as session:
+                # Chunk rows usually exist already, so conflicts update them in place; "id" is optional
                 query = """
                 INSERT INTO content.document_embeddings (
                     id, document_id, chunk_index, content, embedding, metadata, created_at
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+                ) VALUES (COALESCE($1::uuid, uuid_generate_v4()), $2, $3, $4, $5, $6, $7)
+                ON CONFLICT (document_id, chunk_index) DO UPDATE SET
+                    content = EXCLUDED.content,
+                    embedding = EXCLUDED.embedding,
+                    metadata = EXCLUDED.metadata
                 """
                 
                 now = datetime.utcnow()
@@ -207,7 +360,7 @@ class Database:
                 
                 for emb in embeddings:
                     await session.execute(query, [
-                        emb["id"],
+                        emb.get("id"),
                         emb["document_id"],
                         emb["chunk_index"],
                         emb["content"],
@@ -218,7 +371,7 @@ class Database:
                     count += 1
                 
                 await session.commit()
-                logger.info(f"Created {count} embeddings")
+                logger.info(f"Stored {count} embeddings")
                 return count
                 
         except Exception as e:
@@ -242,6 +395,14 @@ async def get_database() -> Database:
     if _database is None:
         from .config import get_settings
         settings = get_settings()
-        _database = Database(settings.database_url)
+        _database = Database(
+            settings.database_url,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            command_timeout=settings.database_command_timeout,
+            pgbouncer=settings.database_pgbouncer
+        )
+        await _database.warm()
     
     return _database
@@ -5,11 +5,19 @@ NATS client for inter-service communication.
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, List, Optional
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 try:
     import nats
     from nats.aio.client import Client as NATS
+    from nats.errors import TimeoutError as NATSTimeoutError
+    from nats.js.api import AckPolicy, ConsumerConfig
     HAS_NATS = True
 except ImportError:
     HAS_NATS = False
@@ -17,6 +25,32 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Pulled messages not acked within this many seconds are redelivered; long jobs extend it with heartbeats
+_ACK_WAIT_SECONDS = 60
+_HEARTBEAT_SECONDS = 20
+
+# Failed messages are redelivered after a growing delay, up to this many deliveries in total
+_MAX_DELIVER = 5
+_NAK_DELAY_SECONDS = 10
+
+# Seconds to wait before fetching again after an unexpected fetch error
+_FETCH_RETRY_SECONDS = 1
+
+
+def _serialize(payload: Dict[str, Any]) -> bytes:
+    """Encode a message payload as UTF-8 JSON, using orjson when available."""
+    # Subscribers (including the API service) decode JSON, so the wire format stays JSON
+    if HAS_ORJSON:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=str).encode()
+
+
+def _deserialize(raw: bytes) -> Dict[str, Any]:
+    """Decode a UTF-8 JSON message payload."""
+    if HAS_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw.decode())
+
 
 class NATSClient:
     """NATS client wrapper."""
@@ -24,6 +58,7 @@ class NATSClient:
     def __init__(self, nats_url: str):
         self.nats_url = nats_url
         self.nc: Optional[NATS] = None
+        self.js = None
         self.subscriptions = {}
     
     async def connect(self):
@@ -34,6 +69,7 @@ class NATSClient:
         
         try:
             self.nc = await nats.connect(self.nats_url)
+            self.js = self.nc.jetstream()
             logger.info(f"Connected to NATS at {self.nats_url}")
         except Exception as e:
             logger.error(f"Failed to connect to NATS: {str(e)}")
@@ -52,15 +88,31 @@ class NATSClient:
             return
         
         try:
-            message = json.dumps(data).encode()
+            message = _serialize(data)
             await self.nc.publish(subject, message)
             logger.debug(f"Published message to {subject}")
         except Exception as e:
             logger.error(f"Error publishing to {subject}: {str(e)}")
             raise e
     
-    async def subscribe(self, subject: str, callback: Callable[[Dict[str, Any]], None]):
-        """Subscribe to a subject with a callback."""
+    async def publish_many(self, subject: str, payloads: List[Dict[str, Any]]):
+        """Publish several messages to a subject and flush them to the server together."""
+        if not self.nc:
+            logger.warning(f"NATS not connected, skipping publish to {subject}")
+            return
+        
+        try:
+            # Publishes only fill the client's write buffer; one flush sends them all
+            for data in payloads:
+                await self.nc.publish(subject, _serialize(data))
+            await self.nc.flush(timeout=1)
+            logger.debug(f"Published {len(payloads)} messages to {subject}")
+        except Exception as e:
+            logger.error(f"Error publishing to {subject}: {str(e)}")
+            raise e
+    
+    async def subscribe(self, subject: str, callback: Callable[[Dict[str, Any]], None], queue: Optional[str] = None):
+        """Subscribe to a subject with a callback; subscribers sharing a queue group each get a share of the messages."""
         if not self.nc:
             logger.warning(f"NATS not connected, skipping subscription to {subject}")
             return
@@ -68,12 +120,12 @@ class NATSClient:
         try:
             async def message_handler(msg):
                 try:
-                    data = json.loads(msg.data.decode())
+                    data = _deserialize(msg.data)
                     await callback(data)
                 except Exception as e:
                     logger.error(f"Error handling message from {subject}: {str(e)}")
             
-            sub = await self.nc.subscribe(subject, cb=message_handler)
+            sub = await self.nc.subscribe(subject, queue=queue or "", cb=message_handler)
             self.subscriptions[subject] = sub
             logger.info(f"Subscribed to {subject}")
             
@@ -81,6 +133,115 @@ class NATSClient:
             logger.error(f"Error subscribing to {subject}: {str(e)}")
             raise e
     
+    async def add_stream(self, name: str, subjects: List[str]) -> bool:
+        """Create a JetStream stream, or update its subjects; False when JetStream is unavailable."""
+        if not self.js:
+            logger.warning(f"JetStream not available, skipping stream {name}")
+            return False
+        
+        try:
+            try:
+                await self.js.add_stream(name=name, subjects=subjects)
+            except Exception:
+                await self.js.update_stream(name=name, subjects=subjects)
+            logger.info(f"JetStream stream {name} ready for {subjects}")
+            return True
+        except Exception as e:
+            logger.error(f"Error creating stream {name}: {str(e)}")
+            raise e
+    
+    async def js_publish(self, subject: str, data: Dict[str, Any]):
+        """Publish a message to a JetStream subject and wait for the server's ack."""
+        if not self.js:
+            raise RuntimeError(f"JetStream not available, cannot publish to {subject}")
+        
+        try:
+            await self.js.publish(subject, _serialize(data))
+            logger.debug(f"Published JetStream message to {subject}")
+        except Exception as e:
+            logger.error(f"Error publishing to {subject}: {str(e)}")
+            raise e
+    
+    async def pull_subscribe(
+        self,
+        subject: str,
+        durable: str,
+        callback: Callable[[Dict[str, Any]], None],
+        batch: int = 16,
+        timeout: float = 5.0,
+        dead_letter_subject: Optional[str] = None
+    ) -> Optional[asyncio.Task]:
+        """Consume a JetStream subject in batches; acks handled messages and naks failed ones for delayed redelivery.
+        
+        Messages in a fetched batch are handled concurrently, so batch also bounds the
+        consumer's concurrency. Messages failing their last delivery are published to
+        dead_letter_subject, when given, and terminated.
+        """
+        if not self.js:
+            logger.warning(f"JetStream not available, skipping pull subscription to {subject}")
+            return None
+        
+        config = ConsumerConfig(
+            durable_name=durable,
+            ack_policy=AckPolicy.EXPLICIT,
+            ack_wait=_ACK_WAIT_SECONDS,
+            max_deliver=_MAX_DELIVER
+        )
+        psub = await self.js.pull_subscribe(subject, durable, config=config)
+        
+        async def heartbeat(msg):
+            # Keeps a long-running message from being redelivered while it is still being handled
+            while True:
+                await asyncio.sleep(_HEARTBEAT_SECONDS)
+                await msg.in_progress()
+        
+        async def handle(msg):
+            beating = asyncio.create_task(heartbeat(msg))
+            try:
+                await callback(_deserialize(msg.data))
+            except Exception as e:
+                beating.cancel()
+                await settle_failed(msg, e)
+                return
+            
+            beating.cancel()
+            await msg.ack()
+        
+        async def settle_failed(msg, error: Exception):
+            deliveries = msg.metadata.num_delivered
+            logger.error(f"Error handling message from {subject} (delivery {deliveries}): {str(error)}")
+            try:
+                if deliveries < _MAX_DELIVER:
+                    await msg.nak(delay=_NAK_DELAY_SECONDS * deliveries)
+                    return
+                
+                if dead_letter_subject:
+                    await self.js_publish(dead_letter_subject, {
+                        "subject": subject,
+                        "data": msg.data.decode(errors="replace"),
+                        "error": str(error)
+                    })
+                await msg.term()
+                logger.error(f"Gave up on message from {subject} after {deliveries} deliveries")
+            except Exception as e:
+                logger.error(f"Error settling message from {subject}: {str(e)}")
+        
+        async def consume():
+            while True:
+                try:
+                    msgs = await psub.fetch(batch, timeout=timeout)
+                except NATSTimeoutError:
+                    continue
+                except Exception as e:
+                    logger.error(f"Error fetching from {subject}: {str(e)}")
+                    await asyncio.sleep(_FETCH_RETRY_SECONDS)
+                    continue
+                
+                await asyncio.gather(*(handle(msg) for msg in msgs))
+        
+        logger.info(f"Pull-subscribed to {subject} as {durable}")
+        return asyncio.create_task(consume())
+    
     async def request(self, subject: str, data: Dict[str, Any], timeout: float = 5.0) -> Dict[str, Any]:
         """Send a request and wait for response."""
         if not self.nc:
@@ -88,9 +249,9 @@ class NATSClient:
             return {}
         
         try:
-            message = json.dumps(data).encode()
+            message = _serialize(data)
             response = await self.nc.request(subject, message, timeout=timeout)
-            return json.loads(response.data.decode())
+            return _deserialize(response.data)
         except Exception as e:
             logger.error(f"Error making request to {subject}: {str(e)}")
             raise e
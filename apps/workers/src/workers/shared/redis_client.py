@@ -0,0 +1,192 @@
+"""
+Redis client for state shared across worker replicas.
+"""
+
+import json
+import logging
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+try:
+    import redis.asyncio as aioredis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+    logging.warning("Redis client not available")
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> str:
+    """Encode datetimes as ISO 8601 and anything else as its string form."""
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class RedisClient:
+    """Async Redis wrapper storing JSON-encoded hash fields."""
+    
+    def __init__(self, redis_url: str, max_connections: int = 32):
+        self.redis_url = redis_url
+        self.client = None
+        
+        if HAS_REDIS:
+            # Connections are opened lazily from the pool on first use
+            pool = aioredis.ConnectionPool.from_url(redis_url, max_connections=max_connections)
+            self.client = aioredis.Redis(connection_pool=pool)
+    
+    async def disconnect(self):
+        """Close pooled connections."""
+        if self.client:
+            await self.client.close()
+            logger.info("Disconnected from Redis")
+    
+    async def set_hash(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None, replace: bool = False):
+        """Set hash fields (dropping existing ones if replace) and refresh the TTL in one round trip."""
+        if not self.client:
+            return
+        
+        try:
+            async with self.client.pipeline(transaction=replace) as pipe:
+                if replace:
+                    pipe.delete(key)
+                pipe.hset(key, mapping={field: json.dumps(value, default=_json_default) for field, value in mapping.items()})
+                if ttl:
+                    pipe.expire(key, ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error writing {key} to Redis: {str(e)}")
+            raise e
+    
+    async def get_hash(self, key: str) -> Dict[str, Any]:
+        """Get all hash fields; empty if the key does not exist."""
+        if not self.client:
+            return {}
+        
+        try:
+            fields = await self.client.hgetall(key)
+            return {field.decode(): json.loads(value) for field, value in fields.items()}
+        except Exception as e:
+            logger.error(f"Error reading {key} from Redis: {str(e)}")
+            raise e
+    
+    async def cached(self, key: str, ttl: int, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the JSON value cached at key, or load, cache for ttl seconds and return it.
+        
+        Redis errors are logged and fall through to the loader so the cache never fails a request.
+        """
+        if not self.client:
+            return await loader()
+        
+        try:
+            value = await self.client.get(key)
+            if value is not None:
+                return json.loads(value)
+        except Exception as e:
+            logger.warning(f"Error reading cached {key} from Redis: {str(e)}")
+        
+        result = await loader()
+        try:
+            await self.client.set(key, json.dumps(result, default=_json_default), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Error caching {key} in Redis: {str(e)}")
+        return result
+    
+    async def cached_field(self, key: str, field: str, ttl: int, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Like cached, but stores the value as a field of the hash at key so the whole hash can be dropped with one DEL.
+        
+        The hash expires ttl seconds after its first field is written, so no field outlives ttl.
+        """
+        if not self.client:
+            return await loader()
+        
+        try:
+            value = await self.client.hget(key, field)
+            if value is not None:
+                return json.loads(value)
+        except Exception as e:
+            logger.warning(f"Error reading cached {key}[{field}] from Redis: {str(e)}")
+        
+        result = await loader()
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, field, json.dumps(result, default=_json_default))
+                pipe.expire(key, ttl, nx=True)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error caching {key}[{field}] in Redis: {str(e)}")
+        return result
+    
+    async def delete(self, *keys: str):
+        """Delete one or more keys."""
+        if not self.client or not keys:
+            return
+        
+        try:
+            await self.client.delete(*keys)
+        except Exception as e:
+            logger.error(f"Error deleting {', '.join(keys)} from Redis: {str(e)}")
+            raise e
+    
+    async def set_if_absent(self, key: str, value: str) -> bool:
+        """Set a key only if it does not exist; True when this call set it (always True without Redis)."""
+        if not self.client:
+            return True
+        
+        try:
+            return bool(await self.client.set(key, value, nx=True))
+        except Exception as e:
+            logger.error(f"Error setting {key} in Redis: {str(e)}")
+            raise e
+    
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """Get string values for several keys in one round trip; None for missing keys."""
+        if not self.client or not keys:
+            return [None] * len(keys)
+        
+        try:
+            values = await self.client.mget(keys)
+            return [value.decode() if value is not None else None for value in values]
+        except Exception as e:
+            logger.error(f"Error reading {len(keys)} keys from Redis: {str(e)}")
+            raise e
+    
+    async def add_members(self, key: str, members: List[str]):
+        """Add members to a set."""
+        if not self.client or not members:
+            return
+        
+        try:
+            await self.client.sadd(key, *members)
+        except Exception as e:
+            logger.error(f"Error adding to {key} in Redis: {str(e)}")
+            raise e
+    
+    async def pop_members(self, key: str) -> List[str]:
+        """Read and delete a set in one transaction."""
+        if not self.client:
+            return []
+        
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.smembers(key)
+                pipe.delete(key)
+                members, _ = await pipe.execute()
+            return [member.decode() for member in members]
+        except Exception as e:
+            logger.error(f"Error reading {key} from Redis: {str(e)}")
+            raise e
+
+
+# Global Redis client instance
+_redis_client: Optional[RedisClient] = None
+
+
+def get_redis_client() -> RedisClient:
+    """Get Redis client instance."""
+    global _redis_client
+    
+    if _redis_client is None:
+        from .config import get_settings
+        settings = get_settings()
+        _redis_client = RedisClient(settings.redis_url)
+    
+    return _redis_client
@@ -2,11 +2,14 @@
 Storage client for file operations.
 """
 
+import asyncio
 import logging
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterable, AsyncIterator, Optional, Union
 
 try:
     import boto3
+    from botocore.config import Config
     from botocore.exceptions import ClientError
     HAS_BOTO3 = True
 except ImportError:
@@ -15,6 +18,40 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Payloads larger than one part go through multipart upload (S3's minimum part is 5 MiB)
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+
+class MultipartUpload:
+    """Writer for an in-progress S3 multipart upload."""
+    
+    def __init__(self, s3_client, bucket: str, key: str, upload_id: Optional[str]):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = upload_id
+        self.parts = []
+        self.url = f"s3://{bucket}/{key}" if s3_client else f"mock://{bucket}/{key}"
+        
+    async def write_part(self, data: Union[bytes, bytearray, memoryview]):
+        """Upload one part; every part except the last must be at least 5 MiB."""
+        part_number = len(self.parts) + 1
+        if not self.s3_client:
+            self.parts.append({"PartNumber": part_number})
+            return
+        
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        response = await asyncio.to_thread(
+            self.s3_client.upload_part,
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
 
 class StorageClient:
     """S3-compatible storage client."""
@@ -34,8 +71,10 @@ class StorageClient:
                     region_name=region
                 )
                 
-                # Configure client
-                config = {}
+                # Configure client; keep a pool of warm connections for concurrent uploads
+                config = {
+                    'config': Config(max_pool_connections=64, tcp_keepalive=True)
+                }
                 if endpoint:
                     config['endpoint_url'] = endpoint
                 
@@ -45,8 +84,22 @@ class StorageClient:
             except Exception as e:
                 logger.error(f"Failed to initialize storage client: {str(e)}")
     
-    async def upload_file(self, key: str, content: bytes, content_type: Optional[str] = None) -> str:
-        """Upload file content to storage."""
+    @property
+    def available(self) -> bool:
+        """Whether S3 is configured; without it uploads are skipped and downloads fail."""
+        return self.s3_client is not None
+    
+    async def upload_file(self, key: str, content: Union[bytes, bytearray, memoryview],
+                          content_type: Optional[str] = None,
+                          content_encoding: Optional[str] = None) -> str:
+        """Upload file content to storage, in parts when larger than one part."""
+        if len(content) > MULTIPART_PART_SIZE:
+            view = memoryview(content)
+            async with self.upload_multipart(key, content_type, content_encoding) as upload:
+                for offset in range(0, len(view), MULTIPART_PART_SIZE):
+                    await upload.write_part(view[offset:offset + MULTIPART_PART_SIZE])
+            return upload.url
+        
         if not self.s3_client:
             logger.warning(f"Storage not available, skipping upload of {key}")
             return f"mock://{self.bucket}/{key}"
@@ -55,9 +108,16 @@ class StorageClient:
             extra_args = {}
             if content_type:
                 extra_args['ContentType'] = content_type
+            if content_encoding:
+                extra_args['ContentEncoding'] = content_encoding
             
-            # Upload file
-            self.s3_client.put_object(
+            # botocore only takes bytes/bytearray bodies; unwrap whole-buffer views without copying
+            if isinstance(content, memoryview):
+                content = content.obj if content.nbytes == len(content.obj) else content.tobytes()
+            
+            # Upload file without blocking the event loop
+            await asyncio.to_thread(
+                self.s3_client.put_object,
                 Bucket=self.bucket,
                 Key=key,
                 Body=content,
@@ -71,15 +131,84 @@ class StorageClient:
             logger.error(f"Error uploading file {key}: {str(e)}")
             raise e
     
+    @asynccontextmanager
+    async def upload_multipart(self, key: str, content_type: Optional[str] = None,
+                               content_encoding: Optional[str] = None) -> AsyncIterator[MultipartUpload]:
+        """Upload a large file part by part; aborts the upload if the block raises."""
+        if not self.s3_client:
+            logger.warning(f"Storage not available, skipping multipart upload of {key}")
+            yield MultipartUpload(None, self.bucket, key, None)
+            return
+        
+        extra_args = {}
+        if content_type:
+            extra_args['ContentType'] = content_type
+        if content_encoding:
+            extra_args['ContentEncoding'] = content_encoding
+        
+        upload_id = (await asyncio.to_thread(
+            self.s3_client.create_multipart_upload,
+            Bucket=self.bucket, Key=key, **extra_args
+        ))["UploadId"]
+        upload = MultipartUpload(self.s3_client, self.bucket, key, upload_id)
+        
+        try:
+            yield upload
+            await asyncio.to_thread(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": upload.parts}
+            )
+            logger.info(f"Uploaded file {key} to {self.bucket} in {len(upload.parts)} parts")
+            
+        except Exception as e:
+            logger.error(f"Error in multipart upload of {key}: {str(e)}")
+            await asyncio.to_thread(
+                self.s3_client.abort_multipart_upload,
+                Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+            raise e
+    
+    async def upload_stream(self, key: str, chunks: AsyncIterable[bytes],
+                            content_type: Optional[str] = None) -> str:
+        """Upload content arriving in chunks without holding more than one part in memory."""
+        buffer = bytearray()
+        stream = chunks.__aiter__()
+        
+        # Small payloads end before filling one part and go up in a single request
+        async for chunk in stream:
+            buffer += chunk
+            if len(buffer) >= MULTIPART_PART_SIZE:
+                break
+        else:
+            return await self.upload_file(key, buffer, content_type)
+        
+        async with self.upload_multipart(key, content_type) as upload:
+            while True:
+                while len(buffer) >= MULTIPART_PART_SIZE:
+                    await upload.write_part(buffer[:MULTIPART_PART_SIZE])
+                    del buffer[:MULTIPART_PART_SIZE]
+                chunk = await anext(stream, None)
+                if chunk is None:
+                    break
+                buffer += chunk
+
+            # Only the last part may be smaller than the minimum part size
+            if buffer:
+                await upload.write_part(buffer)
+        return upload.url
+    
     async def download_file(self, key: str) -> bytes:
         """Download file content from storage."""
         if not self.s3_client:
-            logger.warning(f"Storage not available, cannot download {key}")
-            return b""
+            # Nothing was stored, so returning empty content would silently ingest nothing
+            raise RuntimeError(f"Storage not available, cannot download {key}")
         
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
-            content = response['Body'].read()
+            response = await asyncio.to_thread(self.s3_client.get_object, Bucket=self.bucket, Key=key)
+            content = await asyncio.to_thread(response['Body'].read)
             logger.info(f"Downloaded file {key} from {self.bucket}")
             return content
             
@@ -17,6 +17,7 @@ from ..shared.database import get_database
 from ..shared.nats_client import get_nats_client
 from ..shared.storage import get_storage_client
 from ..shared.config import get_settings
+from ..shared.app_factory import run_worker_app
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -99,5 +100,4 @@ async def generate_report(
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8008)
+    run_worker_app("workers.telemetry.main:app", port=8008)
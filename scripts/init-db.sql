@@ -62,6 +62,7 @@ CREATE TABLE IF NOT EXISTS content.documents (
     content TEXT,
     content_type VARCHAR(100),
     source_url TEXT,
+    content_hash VARCHAR(64), -- SHA-256 of the original file, for deduplicating re-uploads
     metadata JSONB DEFAULT '{}',
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
@@ -84,7 +85,9 @@ CREATE INDEX IF NOT EXISTS idx_users_email ON auth.users(email);
 CREATE INDEX IF NOT EXISTS idx_sites_tenant_id ON content.sites(tenant_id);
 CREATE INDEX IF NOT EXISTS idx_documents_tenant_id ON content.documents(tenant_id);
 CREATE INDEX IF NOT EXISTS idx_documents_site_id ON content.documents(site_id);
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON content.documents(tenant_id, content_hash);
 CREATE INDEX IF NOT EXISTS idx_document_embeddings_document_id ON content.document_embeddings(document_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_document_embeddings_chunk ON content.document_embeddings(document_id, chunk_index);
 
 -- Create vector similarity index (using HNSW for better performance)
 CREATE INDEX IF NOT EXISTS idx_document_embeddings_vector 